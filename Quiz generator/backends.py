@@ -0,0 +1,169 @@
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class BackendError(Exception):
+    """No backend produced a usable response"""
+
+
+_SECTION_RE = re.compile(r"^#{1,3}\s*(Basic\s*Concepts|Advanced\s*Concepts|Current\s*Trends)\b",
+                         re.IGNORECASE | re.MULTILINE)
+
+
+def looks_like_quiz(text):
+    """Cheap structural check used to reject malformed hedged responses"""
+    if not text:
+        return False
+    sections = {re.sub(r"\s+", " ", s).title() for s in _SECTION_RE.findall(text)}
+    markers = re.findall(r"\bCORRECT\b|\[(?:RIGHT|ANSWER)\]", text, re.IGNORECASE)
+    return len(sections) == 3 and len(markers) >= 3
+
+
+class BackendStats:
+    """EWMA latency and error rate plus a window of recent latencies for p95.
+
+    The error rate halves every `half_life` seconds without a new sample, so a
+    backend that was briefly down gets probed again instead of staying excluded.
+    """
+
+    def __init__(self, alpha=0.2, window=100, half_life=60.0, clock=time.monotonic):
+        self.alpha = alpha
+        self.half_life = half_life
+        self.clock = clock
+        self.latency = None
+        self.error_rate = 0.0
+        # When error_rate was last brought up to date; decay runs from here
+        self.updated = None
+        self.calls = 0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            now = self.clock()
+            self.calls += 1
+            if ok:
+                self.recent.append(seconds)
+                self.latency = seconds if self.latency is None else (
+                    self.alpha * seconds + (1 - self.alpha) * self.latency)
+            self.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self._decayed(now)
+            self.updated = now
+
+    def _decayed(self, now=None):
+        if self.updated is None:
+            return self.error_rate
+        now = self.clock() if now is None else now
+        return self.error_rate * 0.5 ** ((now - self.updated) / self.half_life)
+
+    def current_error_rate(self):
+        with self._lock:
+            return self._decayed()
+
+    def p95(self, min_samples=5):
+        with self._lock:
+            if len(self.recent) < min_samples:
+                return None
+            ordered = sorted(self.recent)
+            return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def snapshot(self):
+        with self._lock:
+            return {"ewma_latency": self.latency, "error_rate": self._decayed(), "calls": self.calls}
+
+
+class Router:
+    """Registry of named backends with latency-aware "auto" routing and hedging.
+
+    A backend is a callable `(prompt, request_class, system) -> str` that raises
+    on failure. "auto" picks the healthy backend with the lowest EWMA latency
+    (untried backends first); with hedging enabled a duplicate request goes to
+    the next-best backend once the primary exceeds its p95 latency, and the
+    first response that passes `validate` wins.
+    """
+
+    def __init__(self, alpha=0.2, max_error_rate=0.5, hedge=True, max_workers=32, half_life=60.0):
+        self.alpha = alpha
+        self.half_life = half_life
+        self.max_error_rate = max_error_rate
+        self.hedge = hedge
+        self._backends = {}
+        self._stats = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="router")
+
+    def register(self, name, fn):
+        self._backends[name] = fn
+        self._stats.setdefault(name, BackendStats(self.alpha, half_life=self.half_life))
+
+    def names(self):
+        return list(self._backends)
+
+    def stats(self):
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    def ranked(self):
+        """Backends ordered by preference: healthy first, then by EWMA latency"""
+        def key(name):
+            stats = self._stats[name]
+            error_rate = stats.current_error_rate()
+            if stats.latency is not None:
+                latency = stats.latency
+            else:
+                # Untried backends are explored first; ones that never succeeded go last
+                latency = 0.0 if stats.calls == 0 else float("inf")
+            return (error_rate >= self.max_error_rate, latency, error_rate)
+        return sorted(self._backends, key=key)
+
+    def call(self, name, prompt, request_class="quiz", system=None, validate=None, **backend_kwargs):
+        """Call one backend by name, recording latency and errors.
+
+        Extra keyword arguments (e.g. `on_text` for streaming) go to the backend.
+        """
+        if name not in self._backends:
+            raise BackendError(f"Unknown backend: {name}")
+        start = time.perf_counter()
+        try:
+            text = self._backends[name](prompt, request_class, system, **backend_kwargs)
+        except Exception:
+            self._stats[name].record(time.perf_counter() - start, ok=False)
+            raise
+        ok = validate is None or validate(text)
+        self._stats[name].record(time.perf_counter() - start, ok=ok)
+        if not ok:
+            raise BackendError(f"{name} returned an invalid response")
+        return text
+
+    def route(self, prompt, request_class="quiz", system=None, validate=None):
+        """Serve an "auto" request; returns (backend name, text)"""
+        ranked = self.ranked()
+        if not ranked:
+            raise BackendError("No backends registered")
+        primary = ranked[0]
+        pending = {self._executor.submit(self.call, primary, prompt, request_class, system, validate): primary}
+
+        hedge_after = self._stats[primary].p95() if self.hedge and len(ranked) > 1 else None
+        fallbacks = ranked[1:]
+        errors = []
+        timeout = hedge_after
+        while pending:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Primary is slower than its p95: hedge with the next backend
+                name = fallbacks.pop(0)
+                pending[self._executor.submit(self.call, name, prompt, request_class, system, validate)] = name
+                timeout = None
+                continue
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    return name, future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {str(e)}")
+            if not pending and fallbacks:
+                # Every in-flight attempt failed; fall through to the next backend
+                name = fallbacks.pop(0)
+                pending[self._executor.submit(self.call, name, prompt, request_class, system, validate)] = name
+            timeout = None
+        raise BackendError("; ".join(errors))
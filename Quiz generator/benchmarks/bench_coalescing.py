@@ -0,0 +1,109 @@
+"""Thundering-herd load test for single-flight quiz generation.
+
+    python benchmarks/bench_coalescing.py --users 50 --latency 0.5 --cancel 5
+
+A classroom of `--users` submits the same quiz at once against a fake backend
+with `--latency` seconds per call (limited to `--backend-slots` concurrent
+generations, like a single local model). `--cancel` of the users give up
+half-way; the shared job must still finish for everyone else.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalescing import CoalescedCallCancelled, SingleFlight, coalescing_key
+from fake_ollama import CANNED_QUIZ
+
+
+class FakeBackend:
+    def __init__(self, latency, slots):
+        self.latency = latency
+        self.calls = 0
+        self._slots = threading.Semaphore(slots)
+        self._lock = threading.Lock()
+
+    def generate_and_parse(self, model_name, prompt):
+        with self._lock:
+            self.calls += 1
+        with self._slots:
+            time.sleep(random.uniform(0.8, 1.2) * self.latency)
+        return CANNED_QUIZ, {"questions": CANNED_QUIZ.count("Q1:")}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def herd(users, call, cancel=0, cancel_after=None):
+    """Release `users` threads at once; returns (latencies, cancelled count)"""
+    barrier = threading.Barrier(users)
+    latencies, cancelled = [], []
+    lock = threading.Lock()
+
+    def user(n):
+        event = threading.Event()
+        if n < cancel:
+            threading.Timer(cancel_after, event.set).start()
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            call(event)
+        except CoalescedCallCancelled:
+            with lock:
+                cancelled.append(n)
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, len(cancelled)
+
+
+def report(label, backend, latencies, cancelled):
+    print(f"{label:>13}: backend calls={backend.calls:<4} completed={len(latencies):<4} cancelled={cancelled:<3}"
+          f" p50={statistics.median(latencies):.2f}s p95={percentile(latencies, 95):.2f}s"
+          f" max={max(latencies):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--backend-slots", type=int, default=4)
+    parser.add_argument("--cancel", type=int, default=5)
+    args = parser.parse_args()
+
+    prompt = "Topic: Python OOP\nDifficulty: Intermediate\nStyle: Mixed\nQuestions per section: 3"
+
+    backend = FakeBackend(args.latency, args.backend_slots)
+    latencies, _ = herd(args.users, lambda event: backend.generate_and_parse("llama3:instruct", prompt))
+    report("uncoalesced", backend, latencies, 0)
+
+    backend = FakeBackend(args.latency, args.backend_slots)
+    flights = SingleFlight()
+    # Whitespace differences between clients still map to the same flight
+    keys = [coalescing_key("llama3:instruct", prompt), coalescing_key("llama3:instruct", prompt + "\n ")]
+    latencies, cancelled = herd(
+        args.users,
+        lambda event: flights.do(random.choice(keys), backend.generate_and_parse, "llama3:instruct", prompt,
+                                 cancel_event=event),
+        cancel=args.cancel,
+        cancel_after=args.latency / 2,
+    )
+    report("single-flight", backend, latencies, cancelled)
+    print(f"{'':>13}  flight stats: {flights.stats()}")
+
+
+if __name__ == "__main__":
+    main()
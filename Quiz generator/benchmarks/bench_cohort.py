@@ -0,0 +1,98 @@
+"""Cohort grading speed: vectorized CohortReport against looping score_quiz per student.
+
+    python benchmarks/bench_cohort.py [--students 100000] [--questions-per-section 5] [--json]
+
+Submissions are simulated from per-question difficulties and student
+abilities (with some questions left unanswered). "grade" covers the whole
+report from a submissions matrix: scores, section scores, difficulty,
+discrimination and option pick rates; "frames" adds the chart DataFrames and
+the JSON summary. "from dicts" times building the matrix from user_answers
+dicts, which is what per-user sessions produce.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# profiling lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from cohort import UNANSWERED, AnswerKey, CohortReport
+from mcq_parser import SECTIONS
+from scoring import score_quiz
+
+
+def make_quiz(per_section, rng):
+    return {section: [{"question": f"{section} question {i}", "options": ["w", "x", "y", "z"],
+                       "correct": int(rng.integers(4)), "explanation": ""} for i in range(1, per_section + 1)]
+            for section in SECTIONS}
+
+
+def simulate(key, students, rng, skip_rate=0.03):
+    ability = rng.normal(size=(students, 1))
+    easiness = rng.normal(size=(1, len(key)))
+    right = rng.random((students, len(key))) < 1 / (1 + np.exp(-(ability + easiness)))
+    # A wrong answer is one of the other three options, uniformly
+    wrong = (key.correct + rng.integers(1, 4, size=(students, len(key)))) % 4
+    answers = np.where(right, key.correct, wrong).astype(np.int8)
+    answers[rng.random(answers.shape) < skip_rate] = UNANSWERED
+    return answers
+
+
+def best_of(fn, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--questions-per-section", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mcqs = make_quiz(args.questions_per_section, rng)
+    key = AnswerKey(mcqs)
+    answers = simulate(key, args.students, rng)
+    dicts = [{qid: (None if choice == UNANSWERED else int(choice)) for qid, choice in zip(key.question_ids, row)}
+             for row in answers]
+
+    def frames():
+        report = CohortReport(key, answers)
+        report.section_frame()
+        report.question_frame()
+        report.distribution_frame()
+        report.as_dict()
+
+    result = {
+        "students": args.students,
+        "questions": len(key),
+        "grade_s": round(best_of(lambda: CohortReport(key, answers)), 4),
+        "grade_and_frames_s": round(best_of(frames), 4),
+        "from_dicts_s": round(best_of(lambda: key.submissions(dicts), 1), 4),
+        "score_quiz_loop_s": round(best_of(lambda: [score_quiz(mcqs, d) for d in dicts], 1), 4),
+    }
+    result["speedup_vs_loop"] = round(result["score_quiz_loop_s"] / result["grade_s"], 1)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['students']} students x {result['questions']} questions")
+    print(f"  grade (vectorized)      {result['grade_s'] * 1000:>9.1f}ms")
+    print(f"  grade + frames + json   {result['grade_and_frames_s'] * 1000:>9.1f}ms")
+    print(f"  matrix from dicts       {result['from_dicts_s'] * 1000:>9.1f}ms")
+    print(f"  score_quiz per student  {result['score_quiz_loop_s'] * 1000:>9.1f}ms  "
+          f"({result['speedup_vs_loop']}x slower than vectorized grading)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Cold vs. warm Ollama latency with and without the keep-alive pool.
+
+    python benchmarks/bench_keepalive.py --load-delay 1.5 --calls 5
+
+Runs against the local fake Ollama server, so no real model is needed.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama import FakeOllama
+from ollama_manager import OllamaManager
+
+
+MESSAGES = [{"role": "user", "content": "Generate a quiz about Python OOP"}]
+
+
+def run(manager, fake, calls, idle, keep_pool_warm):
+    """Issue `calls` requests separated by idle periods.
+
+    Without the pool every idle period ends with the model evicted; with it the
+    background pinger loads the model up front and keeps it resident.
+    """
+    if keep_pool_warm:
+        manager.start()
+        time.sleep(fake.load_delay + 0.2)
+    for _ in range(calls):
+        if not keep_pool_warm:
+            fake.evict_all()
+        manager.chat("llama3:instruct", MESSAGES, request_class="quiz")
+        time.sleep(idle)
+    manager.stop()
+    return manager.latency_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--load-delay", type=float, default=1.0)
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--idle", type=float, default=0.1)
+    args = parser.parse_args()
+
+    fake = FakeOllama(load_delay=args.load_delay).start()
+    try:
+        for label, warm in (("no keep-alive", False), ("warm pool", True)):
+            manager = OllamaManager(host=fake.host, ping_interval=args.idle)
+            stats = run(manager, fake, args.calls, args.idle, warm)
+            print(f"{label:>14}: " + ", ".join(
+                f"{kind} n={s['count']} mean={s['mean'] * 1000:.0f}ms" for kind, s in stats.items()
+            ))
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Input-token savings of prompt_builder against the original prompt templates.
+
+    python benchmarks/bench_prompts.py [--json]
+
+"total" counts system + user tokens per call; "uncached" counts only the part a
+prefix-caching backend still has to prefill once the system prompt is cached.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_builder import (ANALYSIS_SYSTEM_PROMPT, QUIZ_SYSTEM_PROMPT, THEMES_SYSTEM_PROMPT,
+                            build_analysis_prompt, build_mcq_prompt, build_themes_prompt,
+                            estimate_tokens)
+
+
+LEGACY_SYSTEM = "You are an expert quiz generator who crafts perfect MCQs with clear explanations."
+
+SECTIONS = ["Basic Concepts", "Advanced Concepts", "Current Trends"]
+
+
+def legacy_mcq_prompt(topic, difficulty, count, style, include_diagrams):
+    # Verbatim copy of the original get_mcq_prompt template
+    return f"""
+    Generate a multiple choice quiz about {topic} with these specifications:
+    - Difficulty level: {difficulty}
+    - Question style: {style}
+    - Questions per section: {count}
+    - Include diagram-based questions: {'Yes' if include_diagrams else 'No'}
+
+    Create questions in these categories:
+    1. Basic Concepts
+    2. Advanced Concepts
+    3. Current Trends
+
+    For each category, provide exactly {count} questions following this exact format:
+
+    ### [Category Name]
+    Q1: [Question text]?
+    a) Option 1
+    b) Option 2 [CORRECT]
+    c) Option 3
+    d) Option 4
+    Explanation: [Detailed explanation of the correct answer]
+
+    Important requirements:
+    - Each question must have exactly 4 options
+    - Mark the correct answer with [CORRECT]
+    - Provide clear, technical explanations
+    - Questions should match the {difficulty} difficulty level
+    - Use {style}-style questions
+    {'- Include at least one diagram description per section' if include_diagrams else ''}
+
+    Example for {topic} ({difficulty} level):
+
+    ### Basic Concepts
+    Q1: What is the primary purpose of a constructor in OOP?
+    a) To destroy objects [CORRECT]
+    b) To initialize object properties
+    c) To perform arithmetic operations
+    d) To handle exceptions
+    Explanation: Constructors are special methods called when an object is created...
+    """
+
+
+def legacy_analysis_prompt(wrong_answers, topic):
+    return f"""
+    Analyze these incorrect answers from a {topic} quiz:
+    {wrong_answers}
+
+    Identify 3-5 specific technical areas that need improvement, focusing on:
+    - Core concepts that were misunderstood
+    - Patterns in the mistakes
+    - Fundamental knowledge gaps
+
+    For each area provide:
+    1. The specific concept/topic
+    2. Why it's important for {topic}
+    3. Recommended study materials
+    4. Related concepts to review
+
+    Format your response as follows:
+
+    🔍 Detailed Analysis for {topic}:
+
+    🎯 Focus Area 1: [Concept Name]
+    • Importance: [Why this matters]
+    • Resources: [Books/Courses/Articles]
+    • Related: [Related topics]
+
+    🎯 Focus Area 2: [Concept Name]
+    • Importance: [Why this matters]
+    • Resources: [Books/Courses/Articles]
+    • Related: [Related topics]
+    """
+
+
+def legacy_themes_prompt(wrong_answers, topic):
+    return f"""
+    Analyze these wrong answers about {topic}:
+    {wrong_answers}
+
+    Identify the 3-5 most common technical themes/concepts that were misunderstood.
+    Return ONLY a Python dictionary with concepts as keys and counts as values.
+    Example: {{"Object-oriented programming": 3, "Database normalization": 2}}
+    """
+
+
+def sample_wrong_answers(n):
+    """Wrong answers shaped like analyze_wrong_answers output, with realistic lengths"""
+    return [
+        {
+            "section": SECTIONS[i % 3],
+            "question": f"In a distributed database, which property is sacrificed first when partition {i} occurs under the CAP theorem?",
+            "user_answer": "Partition tolerance, because replicas stop accepting writes",
+            "correct_answer": "Consistency or availability, depending on the chosen trade-off",
+            "explanation": ("The CAP theorem states that during a network partition a system must choose between "
+                            "consistency and availability. Partition tolerance is not optional for distributed "
+                            "systems, so designers decide whether to reject requests or serve possibly stale data. ") * 2,
+        }
+        for i in range(n)
+    ]
+
+
+def measure(label, legacy_system, legacy_user, system, user):
+    legacy_total = estimate_tokens(legacy_system) + estimate_tokens(legacy_user)
+    total = estimate_tokens(system) + estimate_tokens(user)
+    uncached = estimate_tokens(user)
+    return {
+        "case": label,
+        "legacy_tokens": legacy_total,
+        "total_tokens": total,
+        "uncached_tokens": uncached,
+        "saved_total_pct": round(100 * (1 - total / legacy_total), 1),
+        "saved_uncached_pct": round(100 * (1 - uncached / legacy_total), 1),
+    }
+
+
+def run():
+    rows = []
+    for count in (1, 3, 10):
+        settings = ("Python object oriented programming", "Intermediate", count, "Mixed", False)
+        rows.append(measure(f"quiz count={count}", LEGACY_SYSTEM, legacy_mcq_prompt(*settings),
+                            QUIZ_SYSTEM_PROMPT, build_mcq_prompt(*settings)))
+    for wrong in (3, 9, 30):
+        answers = sample_wrong_answers(wrong)
+        rows.append(measure(f"analysis wrong={wrong}", LEGACY_SYSTEM, legacy_analysis_prompt(answers, "Databases"),
+                            ANALYSIS_SYSTEM_PROMPT, build_analysis_prompt(answers, "Databases")))
+        rows.append(measure(f"themes wrong={wrong}", LEGACY_SYSTEM, legacy_themes_prompt(answers, "Databases"),
+                            THEMES_SYSTEM_PROMPT, build_themes_prompt(answers, "Databases")))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    rows = run()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'case':<20}{'legacy':>8}{'total':>8}{'uncached':>10}{'saved':>8}{'saved*':>8}")
+    for r in rows:
+        print(f"{r['case']:<20}{r['legacy_tokens']:>8}{r['total_tokens']:>8}{r['uncached_tokens']:>10}"
+              f"{r['saved_total_pct']:>7}%{r['saved_uncached_pct']:>7}%")
+    print("saved* = savings once the system prompt prefix is cached")
+
+
+if __name__ == "__main__":
+    main()
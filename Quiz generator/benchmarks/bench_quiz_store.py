@@ -0,0 +1,156 @@
+"""Per-session memory with quizzes held in session state against the shared quiz_store.
+
+    python benchmarks/bench_quiz_store.py [--sessions 1000 10000] [--distinct 50] [--history 20] [--json]
+
+Each simulated session has a finished quiz and a history of past results.
+Sessions draw their quiz from --distinct quizzes with Zipf-like popularity,
+as when many users get the same cached quiz. "inline" is the old layout
+(a deep copy of the mcqs dict, a user_answers dict and a list of history
+dicts); "store" keeps a QuizHandle, packed answers and history tuples, plus
+the store's single copy of each quiz. Memory is what tracemalloc sees
+allocated for the sessions (and store), divided by the session count.
+"""
+import argparse
+import copy
+import datetime
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# profiling lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from mcq_parser import SECTIONS
+from quiz_store import QuizStore, pack_answers, unpack_answers
+
+WORDS = ("process thread memory cache index query schema lock latency throughput tree graph hash queue stack "
+         "network packet socket kernel compiler parser runtime object class method interface module").split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_quiz(rng, per_section):
+    return {section: [{
+        'question': sentence(rng, 16) + "?",
+        'options': [sentence(rng, 5) for _ in range(4)],
+        'correct': rng.randrange(4),
+        'explanation': sentence(rng, 30) + ".",
+        'user_answer': None,
+        'section': section,
+    } for _ in range(per_section)] for section in SECTIONS}
+
+
+def answers_for(rng, mcqs):
+    return {f"{section}_{i}": rng.randrange(4) for section, questions in mcqs.items()
+            for i in range(1, len(questions) + 1)}
+
+
+def history_for(rng, length):
+    start = datetime.datetime(2026, 1, 1)
+    return [(f"Topic {rng.randrange(100)}", start + datetime.timedelta(hours=h), rng.randrange(16), 15,
+             rng.random()) for h in range(length)]
+
+
+def inline_session(quiz, answers, history):
+    return {
+        "current_mcqs": copy.deepcopy(quiz),
+        "user_answers": dict(answers),
+        "quiz_history": [{'topic': t, 'date': d, 'score': s, 'total': n, 'percentage': p}
+                         for t, d, s, n, p in history],
+    }
+
+
+def store_session(store, quiz, answers, history):
+    return {
+        "current_quiz": store.put(copy.deepcopy(quiz)),
+        "user_answers": pack_answers(quiz, answers),
+        "quiz_history": deque(history, maxlen=50),
+    }
+
+
+def measure(build):
+    """(result, bytes allocated by build() and still alive, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def run(sessions, distinct, history, per_section, seed=0):
+    rng = random.Random(seed)
+    quizzes = [make_quiz(rng, per_section) for _ in range(distinct)]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    picks = rng.choices(range(distinct), weights, k=sessions)
+    inputs = [(quizzes[q], answers_for(rng, quizzes[q]), history_for(rng, history)) for q in picks]
+
+    inline, inline_bytes, inline_s = measure(lambda: [inline_session(*args) for args in inputs])
+    del inline
+
+    def build_store():
+        store = QuizStore(max_unreferenced=distinct)
+        return store, [store_session(store, *args) for args in inputs]
+
+    (store, sessions_state), store_bytes, store_s = measure(build_store)
+
+    start = time.perf_counter()
+    for state in sessions_state[:1000]:
+        mcqs = store.get(state["current_quiz"])
+        unpack_answers(mcqs, state["user_answers"])
+    read_us = (time.perf_counter() - start) / min(len(sessions_state), 1000) * 1e6
+
+    stats = store.stats()
+    del sessions_state, state
+    evictable = store.stats()
+
+    return {
+        "sessions": sessions,
+        "distinct_quizzes": distinct,
+        "stored_quizzes": stats["quizzes"],
+        "inline_kib_per_session": round(inline_bytes / sessions / 1024, 2),
+        "store_kib_per_session": round(store_bytes / sessions / 1024, 2),
+        "reduction": round(inline_bytes / store_bytes, 1),
+        "inline_total_mib": round(inline_bytes / 2**20, 1),
+        "store_total_mib": round(store_bytes / 2**20, 1),
+        "inline_build_s": round(inline_s, 3),
+        "store_build_s": round(store_s, 3),
+        "read_us": round(read_us, 1),
+        "unreferenced_after_sessions_end": evictable["unreferenced"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--distinct", type=int, default=50, help="distinct quizzes shared by the sessions")
+    parser.add_argument("--history", type=int, default=20, help="past results per session")
+    parser.add_argument("--questions-per-section", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rows = [run(n, args.distinct, args.history, args.questions_per_section) for n in args.sessions]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'sessions':>9} {'quizzes':>8} {'inline KiB/s':>13} {'store KiB/s':>12} {'reduction':>10} "
+          f"{'inline MiB':>11} {'store MiB':>10} {'read us':>8}")
+    for r in rows:
+        print(f"{r['sessions']:>9} {r['stored_quizzes']:>8} {r['inline_kib_per_session']:>13} "
+              f"{r['store_kib_per_session']:>12} {str(r['reduction']) + 'x':>10} {r['inline_total_mib']:>11} "
+              f"{r['store_total_mib']:>10} {r['read_us']:>8}")
+
+
+if __name__ == "__main__":
+    main()
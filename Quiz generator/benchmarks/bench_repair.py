@@ -0,0 +1,91 @@
+"""Tokens and seconds saved by targeted repair compared with regenerating the whole quiz.
+
+    python benchmarks/bench_repair.py [--ms-per-token 15] [--json]
+
+Every adversarial recording is salvaged against a fake backend whose latency
+grows with the tokens it reads and writes; full regeneration is charged the
+same way for the original prompt and response.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# profiling lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from prompt_builder import QUIZ_SYSTEM_PROMPT, build_mcq_prompt, estimate_tokens
+from repair import salvage_quiz
+from run_suite import load_recordings
+
+
+# {n} keeps every repaired question distinct, as a real model's would be
+FIXED_QUESTION = """Q1: Which statement about Python descriptors is accurate ({n})?
+a) They only work on instances
+b) They customise attribute access on the owning class [CORRECT]
+c) They replace metaclasses
+d) They are a Python 2 feature
+Explanation: Objects defining __get__/__set__ on a class control how its attributes are looked up and set."""
+
+
+def fake_latency(input_tokens, output_tokens, ms_per_token, prefill_ratio=0.1):
+    # Decoding dominates; prefill is a fraction of the per-token cost
+    return (output_tokens + prefill_ratio * input_tokens) * ms_per_token / 1000
+
+
+def run(ms_per_token, count=3):
+    prompt = build_mcq_prompt("Python OOP", "Intermediate", count, "Mixed", False)
+    rows = []
+    for name, text in load_recordings().items():
+        if not name.startswith("adv_"):
+            continue
+        full_seconds = fake_latency(estimate_tokens(QUIZ_SYSTEM_PROMPT + prompt), estimate_tokens(text), ms_per_token)
+
+        numbers = itertools.count(1)
+
+        def generate(repair_prompt, system):
+            time.sleep(fake_latency(estimate_tokens(system + repair_prompt), estimate_tokens(FIXED_QUESTION),
+                                    ms_per_token))
+            return FIXED_QUESTION.format(n=next(numbers))
+
+        try:
+            mcqs, report = salvage_quiz(text, generate, "Python OOP", count=count, original_prompt=prompt,
+                                        original_seconds=full_seconds)
+        except Exception as e:
+            rows.append({"recording": name, "error": str(e)})
+            continue
+        row = {"recording": name, "salvaged": mcqs is not None}
+        row.update(report.as_dict())
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ms-per-token", type=float, default=15.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rows = run(args.ms_per_token)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'recording':<22}{'kept':>5}{'fixed':>6}{'calls':>6}{'tokens':>8}{'full':>7}{'saved':>7}"
+          f"{'secs':>7}{'full':>7}{'saved':>7}")
+    for r in rows:
+        if "error" in r:
+            print(f"{r['recording']:<22} error: {r['error']}")
+            continue
+        if not r["salvaged"] and not r["kept"]:
+            print(f"{r['recording']:<22} nothing to salvage -> full regeneration")
+            continue
+        print(f"{r['recording']:<22}{r['kept']:>5}{r['repaired']:>6}{r['repair_calls']:>6}{r['repair_tokens']:>8}"
+              f"{r['full_regeneration_tokens']:>7}{r['tokens_saved']:>7}{r['repair_seconds']:>7.2f}"
+              f"{r['full_regeneration_seconds']:>7.2f}{r['seconds_saved']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
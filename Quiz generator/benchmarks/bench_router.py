@@ -0,0 +1,120 @@
+"""Latency of fixed backend choice vs. "auto" routing with and without hedging.
+
+    python benchmarks/bench_router.py --requests 200 --concurrency 8 [--json]
+
+Uses local fake backends with injected latency distributions, error rates and
+malformed outputs; nothing leaves the machine.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import Router, looks_like_quiz
+from fake_ollama import CANNED_QUIZ
+
+
+class FakeBackend:
+    """Lognormal latency around `median` with a `tail_p` chance of a `tail` stall"""
+
+    def __init__(self, median, sigma=0.3, tail_p=0.0, tail=0.0, error_p=0.0, garbage_p=0.0):
+        self.median, self.sigma = median, sigma
+        self.tail_p, self.tail = tail_p, tail
+        self.error_p, self.garbage_p = error_p, garbage_p
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, request_class, system):
+        with self._lock:
+            self.calls += 1
+        delay = random.lognormvariate(0, self.sigma) * self.median
+        if random.random() < self.tail_p:
+            delay += self.tail
+        time.sleep(delay)
+        if random.random() < self.error_p:
+            raise RuntimeError("injected backend error")
+        if random.random() < self.garbage_p:
+            return "Sure! Here are some questions about your topic..."
+        return CANNED_QUIZ
+
+
+def make_backends(scale):
+    return {
+        "steady": FakeBackend(0.20 * scale, sigma=0.15),
+        "fast-tail": FakeBackend(0.10 * scale, tail_p=0.04, tail=1.0 * scale, garbage_p=0.03),
+        "flaky": FakeBackend(0.08 * scale, error_p=0.4),
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(label, backends, requests, concurrency, mode, hedge):
+    router = Router(hedge=hedge)
+    for name, fn in backends.items():
+        router.register(name, fn)
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            if mode == "auto":
+                router.route("prompt", validate=looks_like_quiz)
+            else:
+                router.call(mode, "prompt", validate=looks_like_quiz)
+        except Exception:
+            with lock:
+                failures += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    return {
+        "case": label,
+        "ok": len(latencies),
+        "failed": failures,
+        "p50": statistics.median(latencies) if latencies else None,
+        "p95": percentile(latencies, 95) if latencies else None,
+        "p99": percentile(latencies, 99) if latencies else None,
+        "backend_calls": {name: fn.calls for name, fn in backends.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scale", type=float, default=0.2, help="multiply all injected latencies")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(0)
+    rows = [
+        run("fixed steady", make_backends(args.scale), args.requests, args.concurrency, "steady", False),
+        run("fixed fast-tail", make_backends(args.scale), args.requests, args.concurrency, "fast-tail", False),
+        run("auto", make_backends(args.scale), args.requests, args.concurrency, "auto", False),
+        run("auto + hedge", make_backends(args.scale), args.requests, args.concurrency, "auto", True),
+    ]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for r in rows:
+        timing = "  ".join(f"{p}={r[p] * 1000:6.0f}ms" for p in ("p50", "p95", "p99") if r[p] is not None)
+        print(f"{r['case']:<16} ok={r['ok']:<4} failed={r['failed']:<3} {timing}  calls={r['backend_calls']}")
+
+
+if __name__ == "__main__":
+    main()
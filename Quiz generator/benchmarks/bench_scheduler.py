@@ -0,0 +1,140 @@
+"""Interactive latency under a bulk backlog: FIFO worker pool vs. the fair-share scheduler.
+
+    python benchmarks/bench_scheduler.py [--workers 4] [--bulk-jobs 300] [--duration 3] [--json]
+
+Simulated mixed load against a backend that serves `--workers` requests at a
+time: two bulk tenants dump their whole backlog at t=0 while interactive users
+(quiz generation) and results-page analysis keep arriving as Poisson streams.
+Reports per-class latency percentiles (submit -> result), how long the bulk
+backlog took to drain, and admission rejections.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import AdmissionRejected, Scheduler
+
+# Median seconds of backend work per class
+SERVICE = {"interactive": 0.04, "analysis": 0.03, "bulk": 0.04}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def workload(bulk_jobs, duration, interactive_rate, analysis_rate, users, seed=0):
+    """(arrival, class, tenant, service seconds), sorted by arrival"""
+    rng = random.Random(seed)
+
+    def service(cls):
+        return SERVICE[cls] * rng.lognormvariate(0, 0.3)
+
+    jobs = [(0.0, "bulk", f"batch-{n % 2}", service("bulk")) for n in range(bulk_jobs)]
+    for cls, rate in (("interactive", interactive_rate), ("analysis", analysis_rate)):
+        t = rng.expovariate(rate)
+        while t < duration:
+            jobs.append((t, cls, f"user-{rng.randrange(users)}", service(cls)))
+            t += rng.expovariate(rate)
+    return sorted(jobs)
+
+
+def simulate(jobs, submit):
+    """Replay arrivals in real time; submit(cls, tenant, seconds) returns a Future or raises"""
+    latencies = {cls: [] for cls in SERVICE}
+    rejected = {cls: 0 for cls in SERVICE}
+    lock = threading.Lock()
+    futures = []
+    start = time.perf_counter()
+    bulk_done = [0.0]
+
+    def record(cls, submitted):
+        def done(future):
+            finished = time.perf_counter()
+            with lock:
+                latencies[cls].append(finished - submitted)
+                if cls == "bulk":
+                    bulk_done[0] = max(bulk_done[0], finished - start)
+        return done
+
+    for arrival, cls, tenant, seconds in jobs:
+        delay = arrival - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+        submitted = time.perf_counter()
+        try:
+            future = submit(cls, tenant, seconds)
+        except AdmissionRejected:
+            rejected[cls] += 1
+            continue
+        future.add_done_callback(record(cls, submitted))
+        futures.append(future)
+    for future in futures:
+        future.result()
+
+    summary = {}
+    for cls, values in latencies.items():
+        if not values:
+            continue
+        summary[cls] = {
+            "requests": len(values),
+            "rejected": rejected[cls],
+            "p50_ms": round(statistics.median(values) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+        }
+    summary["bulk_drain_s"] = round(bulk_done[0], 2)
+    return summary
+
+
+def run(workers, bulk_jobs, duration, interactive_rate, analysis_rate, users):
+    jobs = workload(bulk_jobs, duration, interactive_rate, analysis_rate, users)
+    results = {}
+
+    # What asyncio.to_thread in front of a backend with `workers` slots amounts to
+    pool = ThreadPoolExecutor(max_workers=workers)
+    results["fifo"] = simulate(jobs, lambda cls, tenant, seconds: pool.submit(time.sleep, seconds))
+    pool.shutdown()
+
+    scheduler = Scheduler(workers=workers, initial_service=SERVICE["bulk"])
+    results["scheduler"] = simulate(
+        jobs, lambda cls, tenant, seconds: scheduler.submit(time.sleep, seconds, priority=cls, tenant=tenant))
+    results["scheduler_stats"] = scheduler.stats()
+    scheduler.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--bulk-jobs", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds of interactive/analysis arrivals")
+    parser.add_argument("--interactive-rate", type=float, default=20.0, help="interactive requests per second")
+    parser.add_argument("--analysis-rate", type=float, default=10.0, help="analysis requests per second")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.workers, args.bulk_jobs, args.duration, args.interactive_rate, args.analysis_rate, args.users)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for mode in ("fifo", "scheduler"):
+        print(f"{mode} (bulk backlog drained in {results[mode]['bulk_drain_s']}s)")
+        for cls in SERVICE:
+            r = results[mode].get(cls)
+            if r:
+                print(f"  {cls:<12} n={r['requests']:<4} rejected={r['rejected']:<3} p50={r['p50_ms']:>8}ms "
+                      f"p95={r['p95_ms']:>8}ms p99={r['p99_ms']:>8}ms")
+
+
+if __name__ == "__main__":
+    main()
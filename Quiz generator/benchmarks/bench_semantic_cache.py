@@ -0,0 +1,127 @@
+"""Hit rate, false-hit rate and lookup latency of the semantic quiz cache across thresholds.
+
+    python benchmarks/bench_semantic_cache.py [--requests 1000] [--thresholds 0.6 0.7 0.8 0.9] [--json]
+
+Replays a skewed stream of topics as users type them: each concept has several
+phrasings, and some concepts are near neighbours that must NOT share a quiz
+("Python OOP" vs "Java OOP"), including long topics that differ in a single
+word ("design patterns in Java" vs "in Python"). A hit counts as false when the cached topic
+belongs to a different concept. The exact-key baseline only hits when the
+typed topic matches character for character.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache
+
+VARIANTS = {
+    "python_oop": ["Python OOP", "object oriented programming in Python", "OOP in python", "python oops",
+                   "Python object-oriented programming"],
+    "java_oop": ["Java OOP", "object oriented programming in Java", "OOP with Java"],
+    "python_decorators": ["Python decorators", "decorators in python", "python decorator"],
+    "ml": ["Machine Learning", "ML", "machine-learning basics", "intro to machine learning"],
+    "dl": ["Deep Learning", "DL", "deep learning fundamentals"],
+    "networks": ["Computer Networks", "computer networking", "CN"],
+    "vision": ["Computer Vision", "CV basics"],
+    "db_design": ["Database Design", "database designs", "designing databases"],
+    "sql_joins": ["SQL joins", "joins in SQL", "SQL JOIN"],
+    "sql_indexes": ["SQL indexes", "indexes in SQL", "SQL indexing"],
+    "os": ["Operating Systems", "OS", "operating system concepts"],
+    "os_scheduling": ["OS scheduling", "CPU scheduling in operating systems"],
+    "k8s": ["Kubernetes", "k8s basics", "Intro to Kubernetes"],
+    "dsa": ["Data Structures and Algorithms", "DSA", "data structures & algorithms"],
+    "ww1": ["World War 1", "world war I", "WW1"],
+    "ww2": ["World War 2", "world war II", "WW2", "Second World War"],
+    "photosynthesis": ["Photosynthesis", "photosynthesis in plants"],
+    "react_hooks": ["React hooks", "hooks in React"],
+    "react_components": ["React components", "components in React"],
+    "linear_regression": ["linear regression", "Linear Regression basics"],
+    "linear_algebra": ["linear algebra", "Linear Algebra fundamentals"],
+    "java_patterns": ["Object oriented design patterns in Java", "OOP design patterns in Java",
+                      "Java object-oriented design pattern"],
+    "python_patterns": ["Object oriented design patterns in Python", "OOP design patterns in Python"],
+    "french_revolution": ["French Revolution causes", "causes of the French Revolution"],
+    "russian_revolution": ["Russian Revolution causes", "causes of the Russian Revolution"],
+    "sql_db_design": ["Relational database design in SQL", "SQL relational database designing"],
+    "nosql_db_design": ["Relational database design in NoSQL"],
+}
+CONCEPT = {topic: concept for concept, topics in VARIANTS.items() for topic in topics}
+SETTINGS = [
+    {"model": "llama3:instruct", "difficulty": difficulty, "count": 3, "style": "Mixed", "diagrams": False}
+    for difficulty in ("Beginner", "Intermediate", "Advanced")
+]
+
+
+def stream(requests, seed=0):
+    rng = random.Random(seed)
+    concepts = list(VARIANTS)
+    # Zipf-ish popularity: a few topics dominate, like real traffic
+    weights = [1 / (rank + 1) for rank in range(len(concepts))]
+    for _ in range(requests):
+        concept = rng.choices(concepts, weights)[0]
+        yield rng.choice(VARIANTS[concept]), rng.choice(SETTINGS)
+
+
+def run(threshold, requests):
+    judge = lambda topic, cached_topic: CONCEPT[topic] == CONCEPT[cached_topic]
+    cache = SemanticCache(threshold=threshold, audit_rate=1.0, judge=judge, seed=0)
+    exact, exact_hits, false_hits, recovered = set(), 0, 0, 0
+    start = time.perf_counter()
+    for topic, settings in stream(requests):
+        key = (topic, tuple(sorted(settings.items())))
+        exact_hit = key in exact
+        exact_hits += exact_hit
+        exact.add(key)
+        hit = cache.lookup(topic, settings)
+        if hit is None:
+            cache.store(topic, settings, {"quiz": topic})
+        elif CONCEPT[hit[2]] != CONCEPT[topic]:
+            false_hits += 1
+        elif not exact_hit:
+            recovered += 1
+    elapsed = time.perf_counter() - start
+    stats = cache.stats()
+    return {
+        "threshold": threshold,
+        "requests": requests,
+        "exact_hit_rate": round(exact_hits / requests, 3),
+        "semantic_hit_rate": round(stats["hit_rate"], 3),
+        # Share of exact-key misses the semantic cache answered correctly
+        "exact_misses_recovered": round(recovered / (requests - exact_hits), 3),
+        "false_hit_rate": round(false_hits / stats["hits"], 4) if stats["hits"] else 0.0,
+        "audited": stats["audited"],
+        "lookup_p50_us": stats["lookup_p50_us"],
+        "lookup_p99_us": stats["lookup_p99_us"],
+        "seconds": round(elapsed, 3),
+        "false_hit_examples": sorted({(a["topic"], a["cached_topic"]) for a in cache.audits if a["false_hit"]})[:5],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rows = [run(threshold, args.requests) for threshold in args.thresholds]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'threshold':>9}{'exact hit':>11}{'semantic hit':>14}{'misses saved':>14}{'false hit':>11}"
+          f"{'p50 us':>9}{'p99 us':>9}")
+    for r in rows:
+        print(f"{r['threshold']:>9}{r['exact_hit_rate']:>11.1%}{r['semantic_hit_rate']:>14.1%}"
+              f"{r['exact_misses_recovered']:>14.1%}{r['false_hit_rate']:>11.2%}{r['lookup_p50_us']:>9}{r['lookup_p99_us']:>9}")
+        for topic, cached in r["false_hit_examples"]:
+            print(f"{'':>11}false hit: {topic!r} served {cached!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Minimal stand-in for the Ollama HTTP API used by the benchmarks.
+
+Implements /api/chat, /api/generate (both also with "stream": true) and
+/api/ps. Models are "loaded" on first
+use (paying `load_delay` seconds) and evicted after their keep_alive window.
+Like Ollama, a request whose runner options (num_ctx, num_thread) differ from
+the loaded runner's reloads the model. That is enough to reproduce cold vs.
+warm behaviour locally.
+"""
+import datetime
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CANNED_QUIZ = """### Basic Concepts
+Q1: What does a constructor do?
+a) Destroys objects
+b) Initializes object state [CORRECT]
+c) Performs arithmetic
+d) Handles exceptions
+Explanation: A constructor runs when the object is created and sets up its attributes.
+
+### Advanced Concepts
+Q1: What does the MRO determine?
+a) Memory layout
+b) Attribute lookup order across base classes [CORRECT]
+c) Garbage collection timing
+d) Bytecode optimisation level
+Explanation: The method resolution order is the order in which base classes are searched.
+
+### Current Trends
+Q1: Which feature added structural pattern matching?
+a) PEP 8
+b) PEP 484
+c) PEP 634 [CORRECT]
+d) PEP 20
+Explanation: PEP 634 specifies the match statement introduced in Python 3.10.
+"""
+
+
+def parse_keep_alive(value, default=300.0):
+    """Ollama keep_alive ('30m', '10s', seconds, -1 for forever) -> seconds"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)\s*([smh]?)", str(value).strip())
+    if not match:
+        return default
+    amount = float(match.group(1))
+    if amount < 0:
+        return float("inf")
+    return amount * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+# Ollama's runner defaults, used when a request leaves the option unset
+DEFAULT_RUNNER = {"num_ctx": 2048, "num_thread": None}
+
+
+def runner_key(options):
+    """The options a loaded runner is built with; a request asking for others reloads it"""
+    options = options or {}
+    return tuple(options.get(name, default) for name, default in DEFAULT_RUNNER.items())
+
+
+class FakeOllama:
+    def __init__(self, load_delay=1.0, token_delay=0.0005, response_text=CANNED_QUIZ, port=0):
+        self.load_delay = load_delay
+        self.token_delay = token_delay
+        self.response_text = response_text
+        self.requests = []
+        self.loads = 0
+        self._expires = {}
+        self._runners = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def evict_all(self):
+        with self._lock:
+            self._expires.clear()
+
+    def _touch(self, model, keep_alive, options=None):
+        """Load the model if needed (not resident, or resident with other runner options); returns the load time"""
+        now = time.monotonic()
+        runner = runner_key(options)
+        with self._lock:
+            loaded = self._expires.get(model, 0) > now and self._runners.get(model) == runner
+            if not loaded:
+                self.loads += 1
+        load = 0.0 if loaded else self.load_delay
+        if load:
+            time.sleep(load)
+        with self._lock:
+            self._expires[model] = time.monotonic() + parse_keep_alive(keep_alive)
+            self._runners[model] = runner
+        return load
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, model, text, load, start):
+                # NDJSON chunks, one line of the response at a time, then a final "done" record
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                key = "message" if self.path == "/api/chat" else "response"
+                for line in text.splitlines(keepends=True):
+                    time.sleep(len(line.split()) * fake.token_delay)
+                    piece = {"role": "assistant", "content": line} if key == "message" else line
+                    self.wfile.write(json.dumps({"model": model, key: piece, "done": False}).encode() + b"\n")
+                    self.wfile.flush()
+                final = {"model": model, "done": True, "done_reason": "stop",
+                         "total_duration": int((time.perf_counter() - start) * 1e9),
+                         "load_duration": int(load * 1e9), "eval_count": len(text.split()),
+                         key: {"role": "assistant", "content": ""} if key == "message" else ""}
+                self.wfile.write(json.dumps(final).encode() + b"\n")
+
+            def do_GET(self):
+                if self.path != "/api/ps":
+                    self.send_error(404)
+                    return
+                now = time.monotonic()
+                with fake._lock:
+                    models = [{"name": m, "model": m} for m, exp in fake._expires.items() if exp > now]
+                self._send({"models": models})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                fake.requests.append((self.path, body))
+                model = body.get("model", "")
+                start = time.perf_counter()
+                load = fake._touch(model, body.get("keep_alive"), body.get("options"))
+
+                if body.get("stream") and self.path in ("/api/chat", "/api/generate"):
+                    self._stream(model, fake.response_text, load, start)
+                    return
+
+                text = ""
+                if self.path == "/api/chat" or body.get("prompt"):
+                    text = fake.response_text
+                    n_predict = (body.get("options") or {}).get("num_predict")
+                    tokens = len(text.split())
+                    if n_predict:
+                        tokens = min(tokens, n_predict)
+                    time.sleep(tokens * fake.token_delay)
+
+                payload = {
+                    "model": model,
+                    "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "done": True,
+                    "done_reason": "stop" if text else "load",
+                    "total_duration": int((time.perf_counter() - start) * 1e9),
+                    "load_duration": int(load * 1e9),
+                    "eval_count": len(text.split()),
+                }
+                if self.path == "/api/chat":
+                    payload["message"] = {"role": "assistant", "content": text}
+                elif self.path == "/api/generate":
+                    payload["response"] = text
+                else:
+                    self.send_error(404)
+                    return
+                self._send(payload)
+
+        return Handler
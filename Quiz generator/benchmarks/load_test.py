@@ -0,0 +1,165 @@
+"""Load test for service.py: requests/sec and latency percentiles.
+
+    python benchmarks/load_test.py --spawn --service-workers 2 --concurrency 16 --requests 200
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --endpoint stream --json
+
+With --spawn the script starts a fake Ollama server (benchmarks/fake_ollama.py)
+and `service.py` pointed at it, so it runs without a GPU or network access;
+otherwise it targets an already running service. Topics are unique per request
+and the semantic cache is bypassed unless --cache is given, so every request
+reaches the backend. For the SSE endpoint it also reports time to first
+question.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import service_client
+from fake_ollama import FakeOllama
+
+TOPICS = ["Python OOP", "Database normalization", "Computer networks", "Cell biology", "Contract law",
+          "Linear algebra", "Operating systems", "Thermodynamics"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/healthz", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError(f"Service at {url} did not come up within {timeout}s")
+
+
+def spawn(port, service_workers, token_delay, llm_workers):
+    fake = FakeOllama(load_delay=0.0, token_delay=token_delay).start()
+    env = dict(os.environ, OLLAMA_HOST=fake.host, LLM_WORKERS=str(llm_workers))
+    # The Gemini client refuses to construct without a key; the load test never calls it
+    env.setdefault("GOOGLE_API_KEY", "unused")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(HERE), "service.py"), "--port", str(port),
+         "--workers", str(service_workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return fake, process
+
+
+def one_request(url, endpoint, n, use_cache):
+    payload = {"topic": f"{TOPICS[n % len(TOPICS)]} {n}", "count": 1, "tenant": f"load-{n % 32}",
+               "use_cache": use_cache}
+    start = time.perf_counter()
+    first = []
+    if endpoint == "stream":
+        service_client.stream_quiz(payload, base_url=url,
+                                   on_question=lambda *_: first or first.append(time.perf_counter() - start))
+    else:
+        service_client.post("/v1/quiz", payload, base_url=url)
+    return time.perf_counter() - start, (first[0] if first else None)
+
+
+def run(url, endpoint, requests, concurrency, use_cache):
+    latencies, first_question, errors = [], [], []
+    lock = threading.Lock()
+
+    def worker(n):
+        try:
+            latency, first = one_request(url, endpoint, n, use_cache)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            latencies.append(latency)
+            if first is not None:
+                first_question.append(first)
+
+    one_request(url, endpoint, -1, use_cache)  # warm-up
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "endpoint": endpoint,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+    }
+    if latencies:
+        result.update({
+            "p50_ms": round(statistics.median(latencies) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        })
+    if first_question:
+        result.update({
+            "first_question_p50_ms": round(statistics.median(first_question) * 1000, 1),
+            "first_question_p99_ms": round(percentile(first_question, 99) * 1000, 1),
+        })
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a fake Ollama and the service locally")
+    parser.add_argument("--port", type=int, default=8765, help="port for the spawned service")
+    parser.add_argument("--service-workers", type=int, default=2)
+    parser.add_argument("--llm-workers", type=int, default=8, help="LLM_WORKERS for the spawned service")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="fake Ollama seconds per token")
+    parser.add_argument("--endpoint", choices=["quiz", "stream", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cache", action="store_true", help="let requests hit the semantic cache")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    fake = process = None
+    url = args.url
+    if args.spawn:
+        url = f"http://127.0.0.1:{args.port}"
+        fake, process = spawn(args.port, args.service_workers, args.token_delay, args.llm_workers)
+    try:
+        wait_until_up(url)
+        endpoints = ["quiz", "stream"] if args.endpoint == "both" else [args.endpoint]
+        rows = [run(url, endpoint, args.requests, args.concurrency, args.cache) for endpoint in endpoints]
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        if fake:
+            fake.stop()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for r in rows:
+        line = (f"{r['endpoint']:<7} {r['requests_per_sec']:>7} req/s  p50 {r.get('p50_ms')}ms  "
+                f"p95 {r.get('p95_ms')}ms  p99 {r.get('p99_ms')}ms  errors {r['errors']}")
+        if "first_question_p50_ms" in r:
+            line += f"  first question p50 {r['first_question_p50_ms']}ms p99 {r['first_question_p99_ms']}ms"
+        print(line)
+        if r["errors"]:
+            print(f"        first error: {r['first_error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Reproducible benchmark suite for the quiz generation pipeline.
+
+    python benchmarks/run_suite.py --output results.json
+    python benchmarks/run_suite.py --compare results.json   # diff against a previous run
+
+Replays the recorded model responses in benchmarks/recordings (well-formed
+`good_*` and deliberately broken `adv_*` ones) through the parser, question
+validation, scoring and prompt builders, then drives a fake backend with
+configurable latency through prompt -> backend -> parse -> score. Reports
+throughput, latency percentiles and peak memory as JSON so runs on different
+commits can be compared. --compare reports every recording whose parse outcome
+changed and every benchmark whose throughput or p95 latency got worse by more
+than --max-regression percent, and exits non-zero if there are any.
+
+The app parses through repair.salvage_quiz, which adds re-asking for
+broken questions on top of mcq_parser.extract_mcqs; the suite measures the
+latter.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+# profiling lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(HERE)))
+
+from backends import Router, looks_like_quiz
+from mcq_parser import extract_mcqs, question_problem
+from prompt_builder import build_analysis_prompt, build_mcq_prompt
+from scoring import collect_wrong_answers, score_quiz
+
+
+def load_recordings():
+    recordings = {}
+    for path in sorted(glob.glob(os.path.join(HERE, "recordings", "*.txt"))):
+        with open(path, newline="") as f:
+            recordings[os.path.basename(path)[:-4]] = f.read()
+    return recordings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(name, fn, iterations, items_per_call=1):
+    """Time `fn` per call, then measure peak traced memory on a separate pass"""
+    fn()  # warm-up
+    timings = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "items_per_sec": round(iterations * items_per_call / elapsed, 1),
+        "p50_us": round(statistics.median(timings) * 1e6, 1),
+        "p95_us": round(percentile(timings, 95) * 1e6, 1),
+        "p99_us": round(percentile(timings, 99) * 1e6, 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def parse_outcomes(recordings):
+    """What the parser makes of each recording; changes here are regressions (or fixes)"""
+    outcomes = {}
+    for name, text in recordings.items():
+        try:
+            mcqs, rejected = extract_mcqs(text)
+        except Exception as e:
+            outcomes[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        outcomes[name] = {
+            "valid": {section: len(questions) for section, questions in mcqs.items()},
+            "rejected": sorted(problem for _, problem, _ in rejected),
+            "usable": all(mcqs.values()),
+        }
+    return outcomes
+
+
+def random_answers(mcqs, rng, accuracy=0.7):
+    answers = {}
+    for section, questions in mcqs.items():
+        for i, q in enumerate(questions, 1):
+            answers[f"{section}_{i}"] = q["correct"] if rng.random() < accuracy else rng.randrange(4)
+    return answers
+
+
+def component_benchmarks(recordings, iterations):
+    results = []
+    for name, text in recordings.items():
+        results.append(measure(f"parse/{name}", lambda text=text: _safe_extract(text), iterations))
+
+    parsed = [extract_mcqs(text) for name, text in recordings.items() if name.startswith("good_")]
+    questions = [q for mcqs, rejected in parsed for qs in mcqs.values() for q in qs]
+    questions += [q for _, rejected in parsed for q, _, _ in rejected]
+    results.append(measure("validate/all_questions", lambda: [question_problem(q) for q in questions],
+                           iterations, items_per_call=len(questions)))
+
+    big, _ = extract_mcqs(recordings["good_llama3_10_per_section"])
+    rng = random.Random(0)
+    answer_sets = [random_answers(big, rng) for _ in range(64)]
+    results.append(measure("score/30_questions",
+                           lambda: [score_quiz(big, answers) for answers in answer_sets],
+                           iterations, items_per_call=len(answer_sets)))
+
+    results.append(measure("prompt/mcq",
+                           lambda: build_mcq_prompt("Python OOP", "Advanced", 5, "Mixed", True), iterations))
+    wrong = collect_wrong_answers(big, answer_sets[0]) * 3
+    results.append(measure(f"prompt/analysis_{len(wrong)}_wrong",
+                           lambda: build_analysis_prompt(wrong, "Python OOP"), iterations))
+    return results
+
+
+def _safe_extract(text):
+    try:
+        return extract_mcqs(text)
+    except Exception:
+        return None
+
+
+def flow_benchmark(recordings, requests, concurrency, latency, jitter):
+    """prompt -> router -> fake backend -> parse -> score, under concurrency"""
+    replies = [text for name, text in recordings.items() if name.startswith("good_")]
+    broken = [text for name, text in recordings.items() if name.startswith("adv_")]
+    rng = random.Random(1)
+    lock = threading.Lock()
+
+    def fake_backend(prompt, request_class, system):
+        with lock:
+            delay = max(0.0, rng.gauss(latency, latency * jitter))
+            text = rng.choice(broken if rng.random() < 0.2 else replies)
+        time.sleep(delay)
+        return text
+
+    router = Router(hedge=False)
+    router.register("fake", fake_backend)
+    timings, outcomes = [], {"ok": 0, "invalid": 0, "unparseable": 0}
+
+    def one(n):
+        t0 = time.perf_counter()
+        prompt = build_mcq_prompt(f"Topic {n % 7}", "Intermediate", 3, "Mixed", False)
+        try:
+            text = router.call("fake", prompt, validate=looks_like_quiz)
+        except Exception:
+            kind = "invalid"
+        else:
+            mcqs = _safe_extract(text)
+            if mcqs and all(mcqs[0].values()):
+                score_quiz(mcqs[0], random_answers(mcqs[0], random.Random(n)))
+                kind = "ok"
+            else:
+                kind = "unparseable"
+        with lock:
+            timings.append(time.perf_counter() - t0)
+            outcomes[kind] += 1
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": f"flow/latency_{latency * 1000:.0f}ms_x{concurrency}",
+        "iterations": requests,
+        "items_per_sec": round(requests / elapsed, 1),
+        "p50_us": round(statistics.median(timings) * 1e6, 1),
+        "p95_us": round(percentile(timings, 95) * 1e6, 1),
+        "p99_us": round(percentile(timings, 99) * 1e6, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "outcomes": outcomes,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path, max_regression):
+    """Print the differences from a previous run; returns the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path}:")
+    regressions = 0
+
+    old_outcomes = baseline.get("outcomes", {})
+    for name, outcome in current["outcomes"].items():
+        old = old_outcomes.get(name)
+        if old is not None and old != outcome:
+            regressions += 1
+            print(f"  OUTCOME {name:<32} {_outcome_summary(old)} -> {_outcome_summary(outcome)}")
+
+    old_benchmarks = {r["name"]: r for r in baseline["benchmarks"]}
+    for r in current["benchmarks"]:
+        old = old_benchmarks.get(r["name"])
+        if not old:
+            continue
+        throughput = 100 * (r["items_per_sec"] / old["items_per_sec"] - 1) if old["items_per_sec"] else 0
+        p95 = 100 * (r["p95_us"] / old["p95_us"] - 1) if old["p95_us"] else 0
+        changed = old.get("outcomes") != r.get("outcomes")
+        worse = throughput < -max_regression or p95 > max_regression or changed
+        regressions += worse
+        print(f"  {'WORSE' if worse else '':<8}{r['name']:<40} {old['items_per_sec']:>12} -> {r['items_per_sec']:>12} "
+              f"items/s ({throughput:+.1f}%)  p95 {old['p95_us']} -> {r['p95_us']} us ({p95:+.1f}%)")
+        if changed:
+            print(f"  {'':<8}{'outcomes':<40} {old.get('outcomes')} -> {r.get('outcomes')}")
+    return regressions
+
+
+def _outcome_summary(outcome):
+    if "error" in outcome:
+        return outcome["error"]
+    return (f"valid={list(outcome['valid'].values())} rejected={len(outcome['rejected'])}"
+            f"{'' if outcome['usable'] else ' UNUSABLE'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="fake backend latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.3, help="latency stddev as a fraction of --latency")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.add_argument("--max-regression", type=float, default=25.0,
+                        help="percent of throughput lost or p95 latency added that --compare counts as a regression")
+    args = parser.parse_args()
+
+    recordings = load_recordings()
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "args": vars(args),
+        },
+        "outcomes": parse_outcomes(recordings),
+        "benchmarks": component_benchmarks(recordings, args.iterations),
+    }
+    results["benchmarks"].append(
+        flow_benchmark(recordings, args.requests, args.concurrency, args.latency, args.jitter))
+
+    for name, outcome in results["outcomes"].items():
+        print(f"  {name:<32} {_outcome_summary(outcome)}")
+    print()
+    print(f"  {'benchmark':<40}{'items/s':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'peak KiB':>10}")
+    for r in results["benchmarks"]:
+        print(f"  {r['name']:<40}{r['items_per_sec']:>12}{r['p50_us']:>10}{r['p95_us']:>10}{r['p99_us']:>10}{r['peak_kib']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_regression)
+        if regressions:
+            print(f"\n{regressions} regression(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
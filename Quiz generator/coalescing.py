@@ -0,0 +1,88 @@
+import contextvars
+import copy
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+
+class CoalescedCallCancelled(Exception):
+    """Raised to a caller that stopped waiting; the shared job keeps running"""
+
+
+def coalescing_key(model_name, prompt, system=None):
+    """Key on the model and the whitespace/case-normalized prompt"""
+    normalized = re.sub(r"\s+", " ", f"{system or ''}\x00{prompt}").strip().casefold()
+    return hashlib.sha256(f"{model_name}\x00{normalized}".encode()).hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one job per key; concurrent callers share its result.
+
+    Jobs run on a dedicated pool rather than in the first caller's thread, so a
+    caller that gives up (cancel event or timeout) never takes the job down with
+    it. Every caller receives its own deep copy of the result.
+
+    The pool must never be what queues work: a job that waits in it is invisible
+    to the Scheduler's fair queuing and wait estimates. So it is sized to one
+    thread per concurrent key (threads are only started as needed) and jobs
+    should do their waiting in the Scheduler.
+    """
+
+    def __init__(self, max_workers=256, poll_interval=0.05):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="singleflight")
+        # Re-entrant: the done-callback fires inline when a job finishes first
+        self._lock = threading.RLock()
+        self._flights = {}
+        self._poll_interval = poll_interval
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "cancelled": 0}
+
+    def do(self, key, fn, *args, cancel_event=None, timeout=None, **kwargs):
+        """Return fn(*args, **kwargs), joining an in-flight call for `key` if any"""
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._flights.get(key)
+            if future is None:
+                self._stats["executions"] += 1
+                # The job runs in the first caller's context (request-scoped state such as profiling)
+                future = self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+                self._flights[key] = future
+                future.add_done_callback(lambda f, key=key: self._forget(key, f))
+            else:
+                self._stats["coalesced"] += 1
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                self._cancelled()
+                raise CoalescedCallCancelled(key)
+            wait = self._poll_interval if cancel_event is not None else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._cancelled()
+                    raise CoalescedCallCancelled(key)
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                return copy.deepcopy(future.result(timeout=wait))
+            except FutureTimeout:
+                continue
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _cancelled(self):
+        with self._lock:
+            self._stats["cancelled"] += 1
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
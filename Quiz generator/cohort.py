@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+# Marks an unanswered question in a submissions matrix
+UNANSWERED = -1
+OPTIONS = 4
+
+
+class AnswerKey:
+    """A quiz flattened into arrays: one column per question, in section order"""
+
+    def __init__(self, mcqs):
+        self.sections = list(mcqs)
+        self.question_ids = [f"{section}_{i}" for section, questions in mcqs.items()
+                             for i in range(1, len(questions) + 1)]
+        self.questions = [q['question'] for questions in mcqs.values() for q in questions]
+        self.correct = np.array([q['correct'] for questions in mcqs.values() for q in questions], dtype=np.int8)
+        sizes = [len(questions) for questions in mcqs.values()]
+        self.section_of = np.repeat(np.arange(len(sizes)), sizes)
+        self.section_sizes = np.array(sizes)
+        # First column of each section, for np.add.reduceat; empty sections are skipped
+        self._starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))[self.section_sizes > 0]
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def submissions(self, user_answers_list):
+        """(students, questions) int8 matrix from user_answers dicts keyed like score_quiz's"""
+        ids = self.question_ids
+        flat = np.fromiter(
+            (UNANSWERED if (choice := answers.get(qid)) is None else choice
+             for answers in user_answers_list for qid in ids),
+            dtype=np.int8,
+        )
+        return flat.reshape(-1, len(ids))
+
+
+class CohortReport:
+    """Grades for a whole cohort, computed in one vectorized pass over the submissions matrix.
+
+    `answers` is (students, questions) with option indices 0-3 or UNANSWERED.
+    """
+
+    def __init__(self, key, answers):
+        answers = np.asarray(answers, dtype=np.int8)
+        if answers.ndim != 2 or answers.shape[1] != len(key):
+            raise ValueError(f"Expected a (students, {len(key)}) answers matrix, got {answers.shape}")
+        if answers.size and (answers.min() < UNANSWERED or answers.max() >= OPTIONS):
+            raise ValueError(f"Answers must be option indices 0-{OPTIONS - 1} or {UNANSWERED} (unanswered)")
+        self.key = key
+        self.students = answers.shape[0]
+        correct = answers == key.correct
+        self.totals = correct.sum(axis=1, dtype=np.int32)
+        section_correct = np.zeros((self.students, len(key.sections)), dtype=np.int32)
+        if len(key):
+            section_correct[:, key.section_sizes > 0] = np.add.reduceat(correct, key._starts, axis=1,
+                                                                         dtype=np.int32)
+        self.section_correct = section_correct
+        # Share of students picking each option (last column: unanswered), in one bincount
+        offsets = np.arange(len(key)) * (OPTIONS + 1)
+        picks = np.bincount((answers.astype(np.int32) % (OPTIONS + 1) + offsets).ravel(),
+                            minlength=len(key) * (OPTIONS + 1))
+        self.option_rates = picks.reshape(len(key), OPTIONS + 1) / max(self.students, 1)
+        # Classical difficulty: share answering correctly (lower = harder)
+        self.difficulty = correct.mean(axis=0) if self.students else np.zeros(len(key))
+        self.discrimination = self._discrimination(correct)
+
+    def _discrimination(self, correct):
+        """Correlation between getting each question right and the score on the other questions"""
+        if self.students < 2:
+            return np.full(len(self.key), np.nan)
+        items = correct.astype(np.float32)
+        rest = self.totals[:, None].astype(np.float32) - items
+        items -= items.mean(axis=0)
+        rest -= rest.mean(axis=0)
+        denominator = np.sqrt((items ** 2).sum(axis=0) * (rest ** 2).sum(axis=0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(denominator > 0, (items * rest).sum(axis=0) / denominator, np.nan)
+
+    def distractor_rates(self):
+        """(questions, 3) share picking each wrong option, ordered as in the question"""
+        wrong = np.ones((len(self.key), OPTIONS), dtype=bool)
+        wrong[np.arange(len(self.key)), self.key.correct] = False
+        return self.option_rates[:, :OPTIONS][wrong].reshape(len(self.key), OPTIONS - 1)
+
+    def section_distribution(self, section):
+        """Students per number of correct answers (0..section size) in one section"""
+        s = self.key.sections.index(section)
+        return np.bincount(self.section_correct[:, s], minlength=self.key.section_sizes[s] + 1)
+
+    def score_distribution(self):
+        return np.bincount(self.totals, minlength=len(self.key) + 1)
+
+    def section_frame(self):
+        """Mean correct/incorrect per student by section, shaped for the results page's section bar chart"""
+        mean_correct = self.section_correct.mean(axis=0) if self.students else np.zeros(len(self.key.sections))
+        return pd.DataFrame({
+            "Section": self.key.sections,
+            "Correct": mean_correct,
+            "Incorrect": self.key.section_sizes - mean_correct,
+        })
+
+    def question_frame(self):
+        """One row per question: section, difficulty, discrimination and each option's pick rate"""
+        frame = pd.DataFrame({
+            "Question": self.key.question_ids,
+            "Section": np.array(self.key.sections, dtype=object)[self.key.section_of] if len(self.key) else [],
+            "Text": self.key.questions,
+            "Difficulty": self.difficulty,
+            "Discrimination": self.discrimination,
+            "Correct option": self.key.correct,
+        })
+        for option in range(OPTIONS):
+            frame[f"Option {'abcd'[option]}"] = self.option_rates[:, option]
+        frame["Unanswered"] = self.option_rates[:, OPTIONS]
+        return frame
+
+    def distribution_frame(self):
+        """Long-format (Section, Correct answers, Students) for a grouped bar chart"""
+        rows = [{"Section": section, "Correct answers": n, "Students": int(count)}
+                for section in self.key.sections
+                for n, count in enumerate(self.section_distribution(section))]
+        return pd.DataFrame(rows, columns=["Section", "Correct answers", "Students"])
+
+    def as_dict(self):
+        scores = self.totals / len(self.key) if len(self.key) else np.zeros(self.students)
+        return {
+            "students": self.students,
+            "questions": len(self.key),
+            "mean_score": float(scores.mean()) if self.students else None,
+            "median_score": float(np.median(scores)) if self.students else None,
+            "score_distribution": self.score_distribution().tolist(),
+            "sections": {
+                section: {
+                    "mean_correct": float(self.section_correct[:, s].mean()) if self.students else None,
+                    "total": int(self.key.section_sizes[s]),
+                    "distribution": self.section_distribution(section).tolist(),
+                }
+                for s, section in enumerate(self.key.sections)
+            },
+            "questions_detail": [
+                {
+                    "id": qid,
+                    "difficulty": float(self.difficulty[q]),
+                    "discrimination": None if np.isnan(self.discrimination[q]) else float(self.discrimination[q]),
+                    "option_rates": self.option_rates[q, :OPTIONS].round(4).tolist(),
+                    "unanswered_rate": float(self.option_rates[q, OPTIONS]),
+                }
+                for q, qid in enumerate(self.key.question_ids)
+            ],
+        }
+
+
+def grade_cohort(mcqs, submissions):
+    """CohortReport for a quiz and either a submissions matrix or a list of user_answers dicts"""
+    key = AnswerKey(mcqs)
+    if not isinstance(submissions, np.ndarray):
+        submissions = key.submissions(submissions)
+    return CohortReport(key, submissions)
@@ -1,11 +1,18 @@
 import streamlit as st
-from model import init_llama, get_mcq_prompt, get_model_response
+from model import init_llama, get_mcq_prompt
+from mcq_parser import question_problem
+from scheduler import AdmissionRejected
+from scoring import collect_wrong_answers, score_quiz
+from cohort import grade_cohort
+from quiz_store import pack_answers
+from profiling import profiled
+import pipeline
+import service_client
+import collections
 import datetime
-import re
 import pandas as pd
 import plotly.express as px
 from streamlit_extras.badges import badge
-import time
 import asyncio
 
 
@@ -13,216 +20,37 @@ import asyncio
 
 def validate_question(q):
     """Enhanced question validation with detailed checks"""
-    if not isinstance(q, dict):
-        st.error("Invalid question format: Not a dictionary")
-        return False
-    if not q.get('question', '').strip():
-        st.error("Invalid question: Missing question text")
-        return False
-    if len(q.get('options', [])) != 4:
-        st.error(f"Invalid question: Expected 4 options, got {len(q.get('options', []))}")
-        return False
-    if q.get('correct') is None or not 0 <= q['correct'] < 4:
-        st.error(f"Invalid question: Correct answer index out of range (0-3), got {q.get('correct')}")
-        return False
-    if not q.get('explanation', '').strip():
-        st.error("Invalid question: Missing explanation")
-        return False
-    if any(not opt.strip() for opt in q['options']):
-        st.error("Invalid question: Empty option found")
+    problem = question_problem(q)
+    if problem:
+        st.error(problem)
         return False
     return True
 
-def parse_mcqs(text):
-    """Robust parser with multiple format support and detailed error handling"""
-    mcqs = {
-        "Basic Concepts": [],
-        "Advanced Concepts": [],
-        "Current Trends": []
-    }
-    
-    current_section = None
-    current_question = None
-    option_letters = ['a', 'b', 'c', 'd']
-    
-    try:
-        # Normalize text
-        text = re.sub(r'\r\n', '\n', text)
-        text = re.sub(r'`{3}.*?`{3}', '', text, flags=re.DOTALL)
-        text = re.sub(r'^\s*-\s*', '', text, flags=re.MULTILINE)
-        
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        # Add progress tracking for parsing
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        total_lines = len(lines)
-        
-        for idx, line in enumerate(lines):
-            # Update progress every 50 lines
-            if idx % 50 == 0:
-                progress = idx / total_lines
-                progress_bar.progress(progress)
-                status_text.text(f"Processing questions... {int(progress*100)}%")
-            
-            # Section detection
-            section_match = re.match(
-                r'^#{1,3}\s*(Basic\s*Concepts|Advanced\s*Concepts|Current\s*Trends)\b', 
-                line, re.IGNORECASE
-            )
-            if section_match:
-                current_section = section_match.group(1).title()
-                continue
-                
-            if not current_section:
-                continue
-                
-            # Question detection
-            question_match = re.match(
-                r'^(?:Q\s*\d+[:.)]|Question\s*\d+:?|\[Q\d+\])\s*(.+)', 
-                line, re.IGNORECASE
-            )
-            if question_match:
-                if current_question and validate_question(current_question):
-                    mcqs[current_section].append(current_question)
-                    
-                current_question = {
-                    'question': question_match.group(1).strip(),
-                    'options': [],
-                    'correct': None,
-                    'explanation': '',
-                    'user_answer': None,
-                    'section': current_section
-                }
-                continue
-                
-            # Option detection
-            option_match = re.match(
-                r'^\s*([a-dA-D]|[1-4])[).\s]\s*(.*?)(?:\s*\[?\b(?:CORRECT|RIGHT|ANSWER)\b\]?)?\s*$', 
-                line, re.IGNORECASE
-            )
-            if option_match and current_question and len(current_question['options']) < 4:
-                option_text = option_match.group(2).strip()
-                is_correct = bool(re.search(r'\[?\b(?:CORRECT|RIGHT|ANSWER)\b\]?', line, re.IGNORECASE))
-                
-                if option_text:
-                    current_question['options'].append(option_text)
-                    if is_correct:
-                        current_question['correct'] = len(current_question['options']) - 1
-                continue
-                
-            # Explanation detection
-            explanation_match = re.match(
-                r'^(?:Explanation|Exp|Reason|Answer)[:.]?\s*(.+)', 
-                line, re.IGNORECASE
-            )
-            if explanation_match and current_question:
-                current_question['explanation'] = explanation_match.group(1).strip()
-                continue
-                
-            # Append to explanation if we're in a question context
-            if current_question and current_question.get('explanation'):
-                current_question['explanation'] += '\n' + line
-    
-        # Add the last question if valid
-        if current_question and validate_question(current_question):
-            mcqs[current_section].append(current_question)
-        
-        # Validate all sections have questions
-        for section, questions in mcqs.items():
-            if not questions:
-                st.error(f"Section '{section}' has no valid questions")
-                progress_bar.empty()
-                status_text.empty()
-                return None
-                
-        progress_bar.progress(1.0)
-        status_text.success("Questions parsed successfully!")
-        time.sleep(0.5)
-        progress_bar.empty()
-        status_text.empty()
-        
-        return mcqs
-        
-    except Exception as e:
-        st.error(f"Parsing error: {str(e)}")
-        return None
-
 def analyze_wrong_answers(mcqs, user_answers, topic,model_name ):
     """Enhanced analysis of incorrect answers with personalized feedback"""
-    wrong_answers = []
-    
-    # Collect all wrong answers with context
-    for section, questions in mcqs.items():
-        for i, q in enumerate(questions, 1):
-            user_choice = user_answers.get(f"{section}_{i}")
-            if user_choice is not None and user_choice != q['correct']:
-                wrong_answers.append({
-                    'section': section,
-                    'question': q['question'],
-                    'user_answer': q['options'][user_choice] if user_choice is not None else "Not attempted",
-                    'correct_answer': q['options'][q['correct']],
-                    'explanation': q['explanation']
-                })
-    
-    if not wrong_answers:
-        return {"analysis": "🎉 Excellent! You answered all questions correctly.", "wrong_answers": []}
-    
-    # Prepare prompt for detailed analysis
-    prompt = f"""
-    Analyze these incorrect answers from a {topic} quiz:
-    {wrong_answers}
-    
-    Identify 3-5 specific technical areas that need improvement, focusing on:
-    - Core concepts that were misunderstood
-    - Patterns in the mistakes
-    - Fundamental knowledge gaps
-    
-    For each area provide:
-    1. The specific concept/topic
-    2. Why it's important for {topic}
-    3. Recommended study materials
-    4. Related concepts to review
-    
-    Format your response as follows:
-    
-    🔍 Detailed Analysis for {topic}:
-    
-    🎯 Focus Area 1: [Concept Name]
-    • Importance: [Why this matters]
-    • Resources: [Books/Courses/Articles]
-    • Related: [Related topics]
-    
-    🎯 Focus Area 2: [Concept Name]
-    • Importance: [Why this matters]
-    • Resources: [Books/Courses/Articles]
-    • Related: [Related topics]
-    """
-    
+    tenant = st.session_state.get("tenant_id", "anonymous")
     try:
-        analysis = get_model_response(model_name, prompt)
-        return {"analysis": analysis, "wrong_answers": wrong_answers}
+        if service_client.SERVICE_URL:
+            return service_client.analyze(mcqs, user_answers, topic, model_name, tenant)
+        return pipeline.analyze_answers(mcqs, user_answers, topic, model_name, tenant)
+    except AdmissionRejected as e:
+        wait = f"in about {e.retry_after:.0f} seconds" if e.retry_after is not None else "in a moment"
+        return {"analysis": f"⏳ The analysis is busy: {e.reason}. Please try again {wait}.",
+                "wrong_answers": collect_wrong_answers(mcqs, user_answers)}
     except Exception as e:
-        return {"analysis": f"⚠️ Could not generate analysis: {str(e)}", "wrong_answers": wrong_answers}
+        return {"analysis": f"⚠️ Could not generate analysis: {str(e)}",
+                "wrong_answers": collect_wrong_answers(mcqs, user_answers)}
 
 def identify_common_themes(wrong_answers, topic, model_name):
     """Identify common themes in wrong answers for visualization"""
     if not wrong_answers:
         return {}
-    
-    prompt = f"""
-    Analyze these wrong answers about {topic}:
-    {wrong_answers}
-    
-    Identify the 3-5 most common technical themes/concepts that were misunderstood.
-    Return ONLY a Python dictionary with concepts as keys and counts as values.
-    Example: {{"Object-oriented programming": 3, "Database normalization": 2}}
-    """
-    
+    tenant = st.session_state.get("tenant_id", "anonymous")
     try:
-        response = get_model_response(model_name, prompt)
-        return eval(response)
-    except:
+        if service_client.SERVICE_URL:
+            return service_client.themes(wrong_answers, topic, model_name, tenant)
+        return pipeline.common_themes(wrong_answers, topic, model_name, tenant)
+    except Exception:
         return {}
 
 # ----------------------
@@ -333,26 +161,75 @@ def display_quiz(mcqs):
             st.warning(f"⚠️ Please answer all {total_questions} questions. You've answered {len(user_answers)}.")
         else:
             st.session_state['show_results'] = True
-            st.session_state['user_answers'] = user_answers
+            st.session_state['user_answers'] = pack_answers(mcqs, user_answers)
+            st.session_state['result_recorded'] = False
             st.rerun()
 
+# Quiz history is kept per session as (topic, date, score, total, percentage) tuples, newest last
+HISTORY_COLUMNS = ['topic', 'date', 'score', 'total', 'percentage']
+HISTORY_LIMIT = 50
+
+def history_frame(history):
+    return pd.DataFrame(list(history), columns=HISTORY_COLUMNS)
+
+def section_score_chart(df_scores, title, value_label="Number of Questions"):
+    """Grouped Correct/Incorrect bars per section, for one user or a cohort's averages"""
+    return px.bar(df_scores, x="Section", y=["Correct", "Incorrect"],
+                  title=title,
+                  labels={"value": value_label},
+                  color_discrete_map={"Correct": "#4CAF50", "Incorrect": "#F44336"},
+                  barmode='group')
+
+def show_cohort_report(mcqs, submissions):
+    """Class-level results for many students' answers to the same quiz"""
+    try:
+        report = grade_cohort(mcqs, submissions)
+    except (ValueError, TypeError, AttributeError, OverflowError) as e:
+        st.error(f"Couldn't grade these submissions: {str(e)}")
+        return
+    if not report.students:
+        st.warning("No submissions to grade.")
+        return
+    summary = report.as_dict()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Students", f"{report.students:,}")
+    with col2:
+        st.metric("Mean Score", f"{summary['mean_score']:.0%}")
+    with col3:
+        st.metric("Median Score", f"{summary['median_score']:.0%}")
+
+    st.plotly_chart(section_score_chart(report.section_frame(), "Average Score by Section",
+                                        "Questions per Student"), use_container_width=True)
+
+    fig = px.bar(report.distribution_frame(), x="Correct answers", y="Students", color="Section",
+                 title="Score Distribution per Section", barmode='group')
+    st.plotly_chart(fig, use_container_width=True)
+
+    questions = report.question_frame()
+    fig = px.bar(questions, x="Question", y="Difficulty", color="Section",
+                 title="Share of Students Answering Each Question Correctly",
+                 hover_data=["Text", "Discrimination"])
+    fig.update_yaxes(tickformat=".0%", range=[0, 1])
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Distractors that draw more students than the correct answer usually point at a misconception
+    options = questions.melt(id_vars=["Question"], value_vars=["Option a", "Option b", "Option c", "Option d",
+                                                               "Unanswered"],
+                             var_name="Choice", value_name="Share")
+    fig = px.bar(options, x="Question", y="Share", color="Choice", title="Option Selection Rates")
+    fig.update_yaxes(tickformat=".0%")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(questions, hide_index=True, use_container_width=True)
+
+@profiled("show_results_page")
 def show_results_page(mcqs, user_answers, topic, model_name):
     """Enhanced results page with beautiful visualizations and detailed analysis"""
     try:
         # Calculate scores
-        section_scores = {}
-        for section, questions in mcqs.items():
-            correct = sum(1 for i, q in enumerate(questions, 1) 
-                     if user_answers.get(f"{section}_{i}") == q['correct'])
-            section_scores[section] = {
-                'correct': correct,
-                'total': len(questions),
-                'percentage': correct/len(questions) if len(questions) > 0 else 0
-            }
-        
-        total_correct = sum(s['correct'] for s in section_scores.values())
-        total_questions = sum(s['total'] for s in section_scores.values())
-        overall_score = total_correct / total_questions if total_questions > 0 else 0
+        section_scores, total_correct, total_questions, overall_score = score_quiz(mcqs, user_answers)
         
         # Performance summary
         st.title("📊 Quiz Results", anchor=False)
@@ -382,17 +259,12 @@ def show_results_page(mcqs, user_answers, topic, model_name):
                 {"Section": s, "Correct": score['correct'], "Incorrect": score['total']-score['correct']}
                 for s, score in section_scores.items()
             ])
-            fig = px.bar(df_scores, x="Section", y=["Correct", "Incorrect"],
-                        title="Score Distribution by Section",
-                        labels={"value": "Number of Questions"},
-                        color_discrete_map={"Correct": "#4CAF50", "Incorrect": "#F44336"},
-                        barmode='group')
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(section_score_chart(df_scores, "Score Distribution by Section"), use_container_width=True)
             
             # Time series for historical performance (if available)
             if 'quiz_history' in st.session_state:
                 st.subheader("Historical Performance")
-                history_df = pd.DataFrame(st.session_state.quiz_history)
+                history_df = history_frame(st.session_state.quiz_history)
                 if not history_df.empty:
                     fig = px.line(history_df, x='date', y='percentage', 
                                  title='Your Accuracy Over Time',
@@ -497,17 +369,14 @@ def show_results_page(mcqs, user_answers, topic, model_name):
             badge(type="udemy", name="")
             badge(type="kaggle", name="")
             
-        # Save to history
+        # Save to history, once per submission (the page re-runs on every interaction)
         if 'quiz_history' not in st.session_state:
-            st.session_state.quiz_history = []
+            st.session_state.quiz_history = collections.deque(maxlen=HISTORY_LIMIT)
             
-        st.session_state.quiz_history.append({
-            'topic': topic,
-            'date': datetime.datetime.now(),
-            'score': total_correct,
-            'total': total_questions,
-            'percentage': overall_score
-        })
+        if not st.session_state.get('result_recorded'):
+            st.session_state.quiz_history.append(
+                (topic, datetime.datetime.now(), total_correct, total_questions, overall_score))
+            st.session_state['result_recorded'] = True
         
     except Exception as e:
         st.error(f"Error showing results: {str(e)}")
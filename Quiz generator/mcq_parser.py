@@ -0,0 +1,141 @@
+import re
+
+from profiling import profiled
+
+
+SECTIONS = ["Basic Concepts", "Advanced Concepts", "Current Trends"]
+
+SECTION_RE = re.compile(r'^#{1,3}\s*(Basic\s*Concepts|Advanced\s*Concepts|Current\s*Trends)\b', re.IGNORECASE)
+QUESTION_RE = re.compile(r'^(?:Q\s*\d+[:.)]|Question\s*\d+:?|\[Q\d+\])\s*(.+)', re.IGNORECASE)
+OPTION_RE = re.compile(r'^\s*([a-dA-D]|[1-4])[).\s]\s*(.*?)(?:\s*\[?\b(?:CORRECT|RIGHT|ANSWER)\b\]?)?\s*$', re.IGNORECASE)
+MARKER_RE = re.compile(r'\[?\b(?:CORRECT|RIGHT|ANSWER)\b\]?', re.IGNORECASE)
+EXPLANATION_RE = re.compile(r'^(?:Explanation|Exp|Reason|Answer)[:.]?\s*(.+)', re.IGNORECASE)
+
+
+def question_problem(q):
+    """Return why a parsed question is invalid, or None if it is usable"""
+    if not isinstance(q, dict):
+        return "Invalid question format: Not a dictionary"
+    if not q.get('question', '').strip():
+        return "Invalid question: Missing question text"
+    if len(q.get('options', [])) != 4:
+        return f"Invalid question: Expected 4 options, got {len(q.get('options', []))}"
+    if q.get('correct') is None or not 0 <= q['correct'] < 4:
+        return f"Invalid question: Correct answer index out of range (0-3), got {q.get('correct')}"
+    if not q.get('explanation', '').strip():
+        return "Invalid question: Missing explanation"
+    if any(not opt.strip() for opt in q['options']):
+        return "Invalid question: Empty option found"
+    return None
+
+
+def normalize_text(text):
+    """Line-split model output the way the parser sees it"""
+    text = re.sub(r'\r\n', '\n', text)
+    text = re.sub(r'`{3}.*?`{3}', '', text, flags=re.DOTALL)
+    text = re.sub(r'^\s*-\s*', '', text, flags=re.MULTILINE)
+    return [line.strip() for line in text.split('\n') if line.strip()]
+
+
+@profiled("extract_mcqs")
+def extract_mcqs(text):
+    """Parse model output without any UI side effects.
+
+    Returns `(mcqs, rejected)`: `mcqs` maps each section to its valid questions
+    in order; `rejected` lists `(question, problem, position)` for every question
+    that failed validation, `position` being its index among all questions
+    written in that section. A question with more than one option marked
+    correct fails too: its answer key is ambiguous.
+    """
+    mcqs = {section: [] for section in SECTIONS}
+    rejected = []
+    written = {}
+
+    current_section = None
+    current_question = None
+    markers = 0
+
+    def close(q, markers):
+        problem = question_problem(q)
+        if problem is None and markers > 1:
+            problem = f"Invalid question: {markers} options marked correct, expected exactly one"
+        position = written.get(q['section'], 0)
+        written[q['section']] = position + 1
+        if problem:
+            rejected.append((q, problem, position))
+        else:
+            mcqs[q['section']].append(q)
+
+    for line in normalize_text(text):
+        section_match = SECTION_RE.match(line)
+        if section_match:
+            current_section = section_match.group(1).title()
+            continue
+
+        if not current_section:
+            continue
+
+        question_match = QUESTION_RE.match(line)
+        if question_match:
+            if current_question:
+                close(current_question, markers)
+            markers = 0
+            current_question = {
+                'question': question_match.group(1).strip(),
+                'options': [],
+                'correct': None,
+                'explanation': '',
+                'user_answer': None,
+                'section': current_section
+            }
+            continue
+
+        option_match = OPTION_RE.match(line)
+        if option_match and current_question and len(current_question['options']) < 4:
+            option_text = option_match.group(2).strip()
+            is_correct = bool(MARKER_RE.search(line))
+
+            if option_text:
+                current_question['options'].append(option_text)
+                if is_correct:
+                    markers += 1
+                    current_question['correct'] = len(current_question['options']) - 1
+            continue
+
+        explanation_match = EXPLANATION_RE.match(line)
+        if explanation_match and current_question:
+            current_question['explanation'] = explanation_match.group(1).strip()
+            continue
+
+        # Append to explanation if we're in a question context
+        if current_question and current_question.get('explanation'):
+            current_question['explanation'] += '\n' + line
+
+    if current_question:
+        close(current_question, markers)
+
+    return mcqs, rejected
+
+
+def complete_prefix(text):
+    """The part of a partial (still streaming) response whose questions are finished.
+
+    A question is complete once the next question or section header starts, so
+    this cuts `text` at the start of the last such line.
+    """
+    cut, offset = 0, 0
+    for line in text.splitlines(keepends=True):
+        stripped = re.sub(r'^\s*-\s*', '', line).strip()
+        if SECTION_RE.match(stripped) or QUESTION_RE.match(stripped):
+            cut = offset
+        offset += len(line)
+    return text[:cut]
+
+
+def last_section_header(text):
+    """The last section header line in `text` (ending in a newline), or "" if there is none"""
+    header = ""
+    for line in text.splitlines():
+        if SECTION_RE.match(re.sub(r'^\s*-\s*', '', line).strip()):
+            header = line + "\n"
+    return header
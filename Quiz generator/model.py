@@ -1,9 +1,14 @@
 
 import datetime
-import ollama
 import os
 from google import genai
 
+from backends import Router
+from ollama_manager import get_manager
+from profiling import profiled, span
+from prompt_builder import SYSTEM_PROMPTS, build_mcq_prompt
+from scheduler import AdmissionRejected, Scheduler
+
 client = genai.Client(api_key="")
 
 
@@ -12,88 +17,106 @@ def init_llama():
     return "llama3:instruct"
 
 def get_mcq_prompt(topic, difficulty="Intermediate", count=3, style="Conceptual", include_diagrams=False):
-    """Generate a prompt for MCQ generation with customizable parameters"""
-    prompt = f"""
-    Generate a multiple choice quiz about {topic} with these specifications:
-    - Difficulty level: {difficulty}
-    - Question style: {style}
-    - Questions per section: {count}
-    - Include diagram-based questions: {'Yes' if include_diagrams else 'No'}
-    
-    Create questions in these categories:
-    1. Basic Concepts
-    2. Advanced Concepts
-    3. Current Trends
-    
-    For each category, provide exactly {count} questions following this exact format:
-    
-    ### [Category Name]
-    Q1: [Question text]?
-    a) Option 1
-    b) Option 2 [CORRECT]
-    c) Option 3
-    d) Option 4
-    Explanation: [Detailed explanation of the correct answer]
-    
-    Important requirements:
-    - Each question must have exactly 4 options
-    - Mark the correct answer with [CORRECT]
-    - Provide clear, technical explanations
-    - Questions should match the {difficulty} difficulty level
-    - Use {style}-style questions
-    {'- Include at least one diagram description per section' if include_diagrams else ''}
-    
-    Example for {topic} ({difficulty} level):
-    
-    ### Basic Concepts
-    Q1: What is the primary purpose of a constructor in OOP?
-    a) To destroy objects [CORRECT]
-    b) To initialize object properties
-    c) To perform arithmetic operations
-    d) To handle exceptions
-    Explanation: Constructors are special methods called when an object is created...
+    """Generate a prompt for MCQ generation with customizable parameters.
+
+    Only the per-quiz settings are returned; the format instructions and
+    example are sent once as the system prompt (see prompt_builder).
     """
-    return prompt
-def get_model_response(model_name: str, prompt: str) -> str:
+    return build_mcq_prompt(topic, difficulty, count, style, include_diagrams)
+
+def llama_backend(prompt, request_class, system, on_text=None):
+    """Llama 3 via Ollama (kept warm by the ollama_manager pool); streams to `on_text` if given"""
+    print("Using Llama3 model for response generation")
+    start_time = datetime.datetime.now()
+    response = get_manager().chat(
+        model='llama3:instruct',
+        messages=[
+            {
+                "role": "system",
+                "content": system
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        request_class=request_class,
+        on_text=on_text
+    )
+    print(f"Response time for llama3:instruct: {datetime.datetime.now() - start_time}")
+    return response['message']['content']
+
+def gemini_backend(prompt, request_class, system, on_text=None):
+    """Gemini via the Google GenAI client; streams to `on_text` if given"""
+    print("Using Gemini model for response generation")
+    start_time = datetime.datetime.now()
+    if on_text is not None:
+        pieces = []
+        for chunk in client.models.generate_content_stream(
+            model="gemini-2.5-pro",
+            contents=prompt,
+            config={"system_instruction": system}
+        ):
+            if chunk.text:
+                pieces.append(chunk.text)
+                on_text(chunk.text)
+        print(f"Response time for gemini: {datetime.datetime.now() - start_time}")
+        return "".join(pieces)
+    response = client.models.generate_content(
+        model="gemini-2.5-pro",
+        contents=prompt,
+        config={"system_instruction": system}
+    )
+    print(f"Response time for gemini: {datetime.datetime.now() - start_time}")
+    return response.text
+
+# Backends selectable by name; "auto" lets the router pick (and hedge) by latency
+router = Router()
+router.register('llama3:instruct', llama_backend)
+router.register('gemini', gemini_backend)
+
+# Every model call is queued here so a bulk backlog can't starve live users;
+# size it to the concurrency the backends actually serve (OLLAMA_NUM_PARALLEL)
+scheduler = Scheduler(workers=int(os.environ.get("LLM_WORKERS", "4")))
+
+# Default priority class for each request class
+REQUEST_PRIORITIES = {"quiz": "interactive", "analysis": "analysis"}
+
+def _call_backend(model_name, prompt, request_class, system, validate, on_text):
+    with span(f"backend:{model_name}"):
+        if model_name == 'auto':
+            # Hedged requests race several backends, so there's no single stream to forward
+            name, text = router.route(prompt, request_class, system, validate)
+            print(f"Router selected {name}")
+            return text
+        if on_text is not None:
+            return router.call(model_name, prompt, request_class, system, validate, on_text=on_text)
+        return router.call(model_name, prompt, request_class, system, validate)
+
+@profiled("get_model_response")
+def get_model_response(model_name: str, prompt: str, request_class: str = "quiz", system: str = None,
+                       validate=None, priority: str = None, tenant: str = "anonymous", on_text=None) -> str:
     print(f"Using model: {model_name}")
     """
-    Generates a structured response using the given model and prompt via Ollama.
+    Generates a structured response using the given backend name, or "auto".
+    `request_class` ("quiz" or "analysis") selects the Ollama runtime options and
+    the default system prompt; pass `system` to override the latter. `validate`
+    rejects malformed responses (and, for "auto", picks the hedge that passes it).
+    The call is scheduled under `priority` ("interactive", "analysis" or "bulk";
+    derived from `request_class` by default) and fair-shared per `tenant`.
+    With `on_text`, named backends stream the reply to it piece by piece.
+    AdmissionRejected (busy or rate limited) propagates so callers can report
+    its retry_after; other failures come back as a "⚠️" message.
     """
+    if system is None:
+        system = SYSTEM_PROMPTS.get(request_class, SYSTEM_PROMPTS["quiz"])
+    if priority is None:
+        priority = REQUEST_PRIORITIES.get(request_class, "interactive")
     
-    if model_name == 'llama3:instruct':
-        # Use Ollama for the specified model
-        print("Using Llama3 model for response generation")
-        try:
-            start_time = datetime.datetime.now()
-            response = ollama.chat(
-                model='llama3:instruct',
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert quiz generator who crafts perfect MCQs with clear explanations."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            print(f"Response time for {model_name}: {datetime.datetime.now() - start_time}")
-            return response['message']['content']
-        except Exception as e:
-            return f"⚠️ Model generation failed: {str(e)}"
-        
-    if model_name == 'gemini':
-        # Use Ollama for the specified model
-        print("Using Gemini model for response generation")
-        try:
-            start_time = datetime.datetime.now()
-            response = client.models.generate_content(
-                model="gemini-2.5-pro",
-                contents=prompt
-            )
-            # print(response.text)
-            print(f"Response time for {model_name}: {datetime.datetime.now() - start_time}")
-            return response.text
-        except Exception as e:
-            return f"⚠️ Model generation failed: {str(e)}"
+    try:
+        return scheduler.run(_call_backend, model_name, prompt, request_class, system, validate, on_text,
+                             priority=priority, tenant=tenant)
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        return f"⚠️ Model generation failed: {str(e)}"
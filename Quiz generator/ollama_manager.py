@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+import ollama
+
+
+# Ollama keeps a model resident for this long after its last request.
+DEFAULT_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# How often the warm pool re-touches every resident model (seconds).
+DEFAULT_PING_INTERVAL = float(os.environ.get("OLLAMA_PING_INTERVAL", "600"))
+
+# A call whose load phase took longer than this is counted as cold (seconds).
+COLD_LOAD_THRESHOLD = 0.5
+
+# Options that shape the model runner. Ollama restarts the runner (a cold load)
+# whenever these change between requests, so every request class and the
+# keep-alive ping send the same values.
+RUNNER_OPTIONS = {"num_ctx": 4096, "num_thread": None}
+
+# Per-call options per request class. Quiz generation needs a generous output
+# budget; the results-page analysis replies are much shorter.
+REQUEST_CLASS_OPTIONS = {
+    "quiz": {"num_predict": 2048},
+    "analysis": {"num_predict": 768},
+}
+
+
+class OllamaManager:
+    """Keeps configured Ollama models warm and tracks cold vs. warm latency"""
+
+    def __init__(self, models=("llama3:instruct",), host=None,
+                 keep_alive=DEFAULT_KEEP_ALIVE, ping_interval=DEFAULT_PING_INTERVAL,
+                 class_options=None, runner_options=None):
+        self.models = list(models)
+        self.client = ollama.Client(host=host) if host else ollama.Client()
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.runner_options = dict(RUNNER_OPTIONS, **(runner_options or {}))
+        self.class_options = {k: dict(v) for k, v in REQUEST_CLASS_OPTIONS.items()}
+        for request_class, options in (class_options or {}).items():
+            self.class_options.setdefault(request_class, {}).update(options)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"cold": [], "warm": []}
+
+    def options_for(self, request_class=None):
+        """Ollama `options` for a request class (or just the runner's), with unset values dropped.
+
+        Runner options always win over class options, so no class can trigger a reload.
+        """
+        options = dict(self.class_options.get(request_class, self.class_options["quiz"])) if request_class else {}
+        options.update(self.runner_options)
+        return {k: v for k, v in options.items() if v is not None}
+
+    def chat(self, model, messages, request_class="quiz", on_text=None):
+        """Run a chat request with keep-alive and per-class options applied.
+
+        With `on_text` the reply is streamed: each piece of content is passed to
+        it as it arrives, and the return value is a dict shaped like a
+        non-streamed response.
+        """
+        start = time.perf_counter()
+        response = self.client.chat(
+            model=model,
+            messages=messages,
+            options=self.options_for(request_class),
+            keep_alive=self.keep_alive,
+            stream=on_text is not None,
+        )
+        if on_text is not None:
+            response = _collect_stream(response, on_text)
+        elapsed = time.perf_counter() - start
+        # load_duration is reported in nanoseconds; a large value means the
+        # model had been evicted and Ollama had to reload it.
+        load_seconds = (_field(response, "load_duration") or 0) / 1e9
+        kind = "cold" if load_seconds > COLD_LOAD_THRESHOLD else "warm"
+        with self._lock:
+            self._stats[kind].append(elapsed)
+        return response
+
+    def warm(self, model=None):
+        """Load a model (or all configured models) without generating anything"""
+        for name in [model] if model else self.models:
+            try:
+                # Same runner options as real requests, or the ping itself would reload the model
+                self.client.generate(model=name, prompt="", keep_alive=self.keep_alive, options=self.options_for())
+            except Exception as e:
+                print(f"Keep-alive ping failed for {name}: {str(e)}")
+
+    def start(self):
+        """Start the background keep-alive pinger (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._ping_loop, name="ollama-keepalive", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _ping_loop(self):
+        while not self._stop.is_set():
+            self.warm()
+            self._stop.wait(self.ping_interval)
+
+    def latency_stats(self):
+        """Count and mean/max latency (seconds) for cold and warm calls"""
+        with self._lock:
+            samples = {kind: list(values) for kind, values in self._stats.items()}
+        return {
+            kind: {
+                "count": len(values),
+                "mean": sum(values) / len(values) if values else 0.0,
+                "max": max(values) if values else 0.0,
+            }
+            for kind, values in samples.items()
+        }
+
+
+def _field(response, name):
+    # The client returns pydantic objects in newer releases and dicts in older ones
+    if isinstance(response, dict):
+        return response.get(name)
+    return getattr(response, name, None)
+
+
+def _collect_stream(chunks, on_text):
+    content, last = [], None
+    for chunk in chunks:
+        message = _field(chunk, "message")
+        piece = (message.get("content") if isinstance(message, dict) else getattr(message, "content", None)) or ""
+        if piece:
+            content.append(piece)
+            on_text(piece)
+        last = chunk
+    # Timings such as load_duration only arrive with the final chunk
+    return {"message": {"role": "assistant", "content": "".join(content)},
+            "load_duration": _field(last, "load_duration") if last is not None else None}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """Process-wide manager, started (with its keep-alive pinger) on first use.
+
+    The app and the service call this at startup, so the pinger's first warm()
+    loads the model before the first user request instead of during it.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = OllamaManager(host=os.environ.get("OLLAMA_HOST"))
+            _manager.start()
+        return _manager
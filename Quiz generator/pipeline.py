@@ -0,0 +1,164 @@
+import ast
+import os
+import threading
+import time
+
+from backends import looks_like_quiz
+from coalescing import SingleFlight, coalescing_key
+from mcq_parser import complete_prefix, extract_mcqs, last_section_header
+from model import get_mcq_prompt, get_model_response
+from profiling import profiled
+from prompt_builder import THEMES_SYSTEM_PROMPT, build_analysis_prompt, build_themes_prompt
+from repair import salvage_quiz
+from scheduler import AdmissionRejected
+from scoring import collect_wrong_answers
+from semantic_cache import SemanticCache
+
+# Process-wide: shared by every Streamlit session or HTTP request in this process
+flights = SingleFlight()
+# Cached quizzes expire after QUIZ_CACHE_TTL seconds so a popular topic gets new questions now and then
+quiz_cache = SemanticCache(threshold=float(os.environ.get("QUIZ_CACHE_THRESHOLD", "0.6")),
+                           ttl=float(os.environ.get("QUIZ_CACHE_TTL", "3600")) or None)
+
+
+class QuestionStream:
+    """Feeds streamed model text through the parser and reports each question once it is complete"""
+
+    def __init__(self, on_question):
+        self.on_question = on_question
+        # Text after the last finished question, and the section header it falls under
+        self._pending = ""
+        self._section = ""
+        self._emitted = set()
+        self._lock = threading.Lock()
+
+    def feed(self, piece):
+        with self._lock:
+            self._pending += piece
+            # A question can only finish when a new line starts; finished text is parsed once
+            if "\n" not in piece:
+                return
+            done = complete_prefix(self._pending)
+            if not done:
+                return
+            self._pending = self._pending[len(done):]
+            mcqs, _ = extract_mcqs(self._section + done)
+            self._section = last_section_header(done) or self._section
+            self._emit(mcqs)
+
+    def finish(self, mcqs):
+        """Report questions the stream didn't (repairs, cache hits, coalesced results)"""
+        with self._lock:
+            self._emit(mcqs or {})
+
+    def _emit(self, mcqs):
+        for section, questions in mcqs.items():
+            for q in questions:
+                key = (section, q['question'])
+                if key not in self._emitted:
+                    self._emitted.add(key)
+                    self.on_question(section, q)
+
+
+@profiled("generate_and_parse")
+def generate_and_parse(model_choice, prompt, settings, tenant="anonymous", on_text=None):
+    """Generate a quiz and parse it, re-asking only for broken or missing questions;
+    runs once per coalesced flight. Returns (raw response, mcqs or None, repair report)"""
+    start = time.perf_counter()
+    # "auto" hedges need a complete-looking quiz; a named backend's partial output is salvaged
+    validate = looks_like_quiz if model_choice == "auto" else None
+    result = get_model_response(model_choice, prompt, validate=validate, tenant=tenant, on_text=on_text)
+    elapsed = time.perf_counter() - start
+    try:
+        mcqs, report = salvage_quiz(
+            result,
+            lambda repair_prompt, system: get_model_response(model_choice, repair_prompt, system=system,
+                                                             tenant=tenant),
+            original_prompt=prompt,
+            original_seconds=elapsed,
+            **settings
+        )
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        print(f"Quiz repair failed: {str(e)}")
+        return result, None, None
+    print(f"Quiz repair: {report.as_dict()}")
+    return result, mcqs, report.as_dict()
+
+
+@profiled("generate_quiz")
+def generate_quiz(topic, difficulty="Intermediate", count=3, style="Conceptual", include_diagrams=False,
+                  model_choice="llama3:instruct", tenant="anonymous", use_cache=True, on_question=None,
+                  cancel_event=None):
+    """Cache lookup -> coalesced generation -> parse and repair -> cache store.
+
+    `on_question(section, question)` is called for each question as soon as it
+    is known: while the model streams for the request that started the
+    generation, otherwise all at once at the end. Returns a dict with `mcqs`
+    (None when no usable quiz came back), the raw `response`, `cached_topic` and
+    `similarity` for cache hits, and the `repair` report. Raises AdmissionRejected
+    when the scheduler turns the request away, and CoalescedCallCancelled once
+    `cancel_event` is set (the shared generation carries on for other callers).
+    """
+    stream = QuestionStream(on_question) if on_question else None
+    cache_settings = {
+        "model": model_choice,
+        "difficulty": difficulty,
+        "count": count,
+        "style": style,
+        "diagrams": include_diagrams
+    }
+    if use_cache:
+        cached = quiz_cache.lookup(topic, cache_settings)
+        if cached:
+            (result, mcqs), similarity, cached_topic = cached
+            print(f"Quiz cache hit: {topic!r} -> {cached_topic!r} (similarity {similarity:.2f})")
+            if stream:
+                stream.finish(mcqs)
+            return {"mcqs": mcqs, "response": result, "cached_topic": cached_topic, "similarity": similarity,
+                    "repair": None}
+
+    prompt = get_mcq_prompt(topic=topic, difficulty=difficulty, count=count, style=style,
+                            include_diagrams=include_diagrams)
+    settings = {"topic": topic, "difficulty": difficulty, "count": count, "style": style}
+    # Identical concurrent requests share one call; only the first one's stream is forwarded
+    key = coalescing_key(model_choice, prompt)
+    try:
+        result, mcqs, report = flights.do(key, generate_and_parse, model_choice, prompt, settings, tenant,
+                                          stream.feed if stream else None, cancel_event=cancel_event)
+    except AdmissionRejected as e:
+        # A flight is admitted as the tenant that started it. If that tenant was over its
+        # limit, the rejection isn't ours: ask again as ourselves, sharing only with our own tenant
+        if e.tenant in (None, tenant):
+            raise
+        result, mcqs, report = flights.do(f"{key}\x00{tenant}", generate_and_parse, model_choice, prompt, settings,
+                                          tenant, stream.feed if stream else None, cancel_event=cancel_event)
+    if stream:
+        stream.finish(mcqs)
+    if mcqs:
+        quiz_cache.store(topic, cache_settings, (result, mcqs))
+    return {"mcqs": mcqs, "response": result, "cached_topic": None, "similarity": None, "repair": report}
+
+
+def analyze_answers(mcqs, user_answers, topic, model_name, tenant="anonymous"):
+    """Personalized analysis of the wrong answers; same shape as helper_functions.analyze_wrong_answers"""
+    wrong_answers = collect_wrong_answers(mcqs, user_answers)
+    if not wrong_answers:
+        return {"analysis": "🎉 Excellent! You answered all questions correctly.", "wrong_answers": []}
+    analysis = get_model_response(model_name, build_analysis_prompt(wrong_answers, topic),
+                                  request_class="analysis", tenant=tenant)
+    return {"analysis": analysis, "wrong_answers": wrong_answers}
+
+
+def common_themes(wrong_answers, topic, model_name, tenant="anonymous"):
+    """Theme -> count for the wrong answers, or {} if the model's reply isn't a dict literal"""
+    if not wrong_answers:
+        return {}
+    response = get_model_response(model_name, build_themes_prompt(wrong_answers, topic),
+                                  request_class="analysis", system=THEMES_SYSTEM_PROMPT, tenant=tenant)
+    try:
+        themes = ast.literal_eval(response.strip())
+    except (ValueError, SyntaxError):
+        return {}
+    return themes if isinstance(themes, dict) else {}
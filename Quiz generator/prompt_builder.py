@@ -0,0 +1,153 @@
+import re
+import textwrap
+
+
+def _compact(template):
+    """Dedent a template and drop blank lines and trailing whitespace"""
+    lines = textwrap.dedent(template).strip().splitlines()
+    return "\n".join(line.rstrip() for line in lines if line.strip())
+
+
+# Static instructions live in the system prompt so every request shares the
+# same prefix; backends with prompt caching (Ollama's KV reuse, Gemini context
+# caching) can then skip re-processing it. Only per-request values go into the
+# user prompt.
+QUIZ_SYSTEM_PROMPT = _compact("""
+    You are an expert quiz generator who crafts perfect MCQs with clear explanations.
+    Write three sections in this order: Basic Concepts, Advanced Concepts, Current Trends.
+    Use exactly this format:
+    ### Basic Concepts
+    Q1: What is the primary purpose of a constructor in OOP?
+    a) To destroy objects
+    b) To initialize object properties [CORRECT]
+    c) To perform arithmetic operations
+    d) To handle exceptions
+    Explanation: Constructors run when an object is created and set up its state.
+    Rules: write the requested number of questions per section at the requested difficulty and style; exactly 4 options per question; mark exactly one option with [CORRECT]; give a clear, technical explanation.
+""")
+
+ANALYSIS_SYSTEM_PROMPT = _compact("""
+    You are a tutor analyzing a student's incorrect quiz answers.
+    Identify 3-5 specific technical areas that need improvement: misunderstood core concepts, patterns in the mistakes, knowledge gaps.
+    Use exactly this format:
+    🔍 Detailed Analysis for <topic>:
+    🎯 Focus Area 1: <Concept Name>
+    • Importance: <why it matters for the topic>
+    • Resources: <books/courses/articles>
+    • Related: <related topics to review>
+""")
+
+THEMES_SYSTEM_PROMPT = _compact("""
+    You identify the 3-5 most common technical themes/concepts behind a student's wrong answers.
+    Return ONLY a Python dictionary with concepts as keys and counts as values.
+    Example: {"Object-oriented programming": 3, "Database normalization": 2}
+""")
+
+REPAIR_SYSTEM_PROMPT = _compact("""
+    You write or fix single multiple choice questions. Return ONLY one question, no section header, in exactly this format:
+    Q1: <question text>
+    a) <option>
+    b) <option> [CORRECT]
+    c) <option>
+    d) <option>
+    Explanation: <clear, technical explanation>
+    Rules: exactly 4 options; exactly one option marked [CORRECT].
+""")
+
+SYSTEM_PROMPTS = {
+    "quiz": QUIZ_SYSTEM_PROMPT,
+    "analysis": ANALYSIS_SYSTEM_PROMPT,
+}
+
+# Default input budget for the serialized wrong answers
+WRONG_ANSWERS_TOKEN_BUDGET = 600
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Rough token count: words and punctuation marks, ~1.3 BPE tokens per word"""
+    return int(len(_TOKEN_RE.findall(text or "")) * 1.3)
+
+
+def build_mcq_prompt(topic, difficulty="Intermediate", count=3, style="Conceptual", include_diagrams=False):
+    """Per-request part of the quiz prompt; the format lives in QUIZ_SYSTEM_PROMPT"""
+    prompt = (
+        f"Topic: {topic}\n"
+        f"Difficulty: {difficulty}\n"
+        f"Style: {style}\n"
+        f"Questions per section: {count}"
+    )
+    if include_diagrams:
+        prompt += "\nInclude at least one diagram-description question per section."
+    return prompt
+
+
+def _clip(text, words):
+    parts = str(text).split()
+    return " ".join(parts[:words]) + (" …" if len(parts) > words else "")
+
+
+def serialize_wrong_answers(wrong_answers, token_budget=WRONG_ANSWERS_TOKEN_BUDGET):
+    """One line per wrong answer, shrunk until it fits `token_budget`.
+
+    Explanations are dropped first, then questions are clipped, then trailing
+    answers are replaced by a "(+N more)" marker.
+    """
+    def render(items, explanation_words, question_words):
+        lines = []
+        for n, w in enumerate(items, 1):
+            line = (f"{n}. [{w['section']}] {_clip(w['question'], question_words)}"
+                    f" | chose: {w['user_answer']} | correct: {w['correct_answer']}")
+            if explanation_words:
+                line += f" | why: {_clip(w['explanation'], explanation_words)}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    for explanation_words, question_words in ((40, 60), (15, 60), (0, 60), (0, 25)):
+        text = render(wrong_answers, explanation_words, question_words)
+        if estimate_tokens(text) <= token_budget:
+            return text
+
+    items = list(wrong_answers)
+    while len(items) > 1:
+        items.pop()
+        text = render(items, 0, 25) + f"\n(+{len(wrong_answers) - len(items)} more)"
+        if estimate_tokens(text) <= token_budget:
+            return text
+    return render(items, 0, 25)
+
+
+def build_analysis_prompt(wrong_answers, topic, token_budget=WRONG_ANSWERS_TOKEN_BUDGET):
+    """User prompt for analyze_wrong_answers (pairs with ANALYSIS_SYSTEM_PROMPT)"""
+    return f"Topic: {topic}\nIncorrect answers:\n{serialize_wrong_answers(wrong_answers, token_budget)}"
+
+
+def build_themes_prompt(wrong_answers, topic, token_budget=WRONG_ANSWERS_TOKEN_BUDGET):
+    """User prompt for identify_common_themes (pairs with THEMES_SYSTEM_PROMPT)"""
+    return f"Topic: {topic}\nWrong answers:\n{serialize_wrong_answers(wrong_answers, token_budget)}"
+
+
+def render_question(q):
+    """Render a (possibly broken) parsed question back into the quiz format"""
+    lines = [f"Q1: {q.get('question', '')}"]
+    for letter, option in zip("abcd", q.get('options', [])):
+        marker = " [CORRECT]" if q.get('correct') == "abcd".index(letter) else ""
+        lines.append(f"{letter}) {option}{marker}")
+    if q.get('explanation'):
+        lines.append(f"Explanation: {q['explanation']}")
+    return "\n".join(lines)
+
+
+def build_fix_prompt(q, problem, topic, difficulty, style):
+    """Ask for a corrected version of one broken question (pairs with REPAIR_SYSTEM_PROMPT)"""
+    return (f"Topic: {topic}\nSection: {q['section']}\nDifficulty: {difficulty}\nStyle: {style}\n"
+            f"Problem: {problem}\nFix this question, keeping its content:\n{render_question(q)}")
+
+
+def build_fill_prompt(section, topic, difficulty, style, avoid=()):
+    """Ask for one new question for an empty slot (pairs with REPAIR_SYSTEM_PROMPT)"""
+    prompt = f"Topic: {topic}\nSection: {section}\nDifficulty: {difficulty}\nStyle: {style}\nWrite one new question."
+    if avoid:
+        prompt += "\nDo not repeat these:\n" + "\n".join(f"- {_clip(text, 20)}" for text in avoid)
+    return prompt
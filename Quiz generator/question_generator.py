@@ -1,15 +1,28 @@
+import os
+import sys
 import streamlit as st
-from model import init_llama, get_mcq_prompt, get_model_response
+
+# profiling (shared with model_utils) lives at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model import init_llama, scheduler
+from ollama_manager import get_manager
 import datetime
+import json
 import re
-import pandas as pd
 import plotly.express as px
 from streamlit_extras.badges import badge
 import time
 import asyncio
+import collections
+import uuid
 
 
 from helper_functions import *
+import pipeline
+import profiling
+from scheduler import AdmissionRejected
+from quiz_store import quiz_store, unpack_answers
+import service_client
 
 # Initialize the model with enhanced caching and loading feedback
 @st.cache_resource(ttl="12h", show_spinner=False)
@@ -57,6 +70,9 @@ def load_model():
             progress_bar.progress(30)
             status_text.text("Initializing neural layers (60%)...")
             model = init_llama()  # Your original model initialization
+            if not service_client.SERVICE_URL:
+                # Start the keep-alive pool now so the first quiz finds llama3 already loaded
+                get_manager()
             
             progress_bar.progress(90)
             status_text.text("Finalizing setup (100%)...")
@@ -166,11 +182,15 @@ def main():
         st.session_state.app_initialized = False
         st.session_state.model_loaded = False
         st.session_state.show_results = False
-        st.session_state.current_mcqs = None
+        # The quiz itself lives in the shared quiz_store; the session keeps its handle and packed answers
+        st.session_state.current_quiz = None
         st.session_state.user_answers = None
         st.session_state.current_topic = None
         st.session_state.model_name = None
-        st.session_state.quiz_history = []
+        st.session_state.quiz_history = collections.deque(maxlen=HISTORY_LIMIT)
+    # Identifies this browser session to the scheduler's per-tenant fair share and rate limits
+    if 'tenant_id' not in st.session_state:
+        st.session_state.tenant_id = uuid.uuid4().hex
     
     # Initial loading screen
     if not st.session_state.app_initialized:
@@ -197,14 +217,27 @@ def main():
     st.markdown("Generate topic-specific quizzes with detailed performance analysis and personalized recommendations.")
     
     # Show results page if applicable
-    if st.session_state.show_results and st.session_state.current_mcqs:
+    current_mcqs = quiz_store.get(st.session_state.current_quiz)
+    if st.session_state.show_results and current_mcqs:
         show_results_page(
-            st.session_state.current_mcqs,
-            st.session_state.user_answers,
+            current_mcqs,
+            unpack_answers(current_mcqs, st.session_state.user_answers),
             st.session_state.current_topic,
             st.session_state.model_name
         )
         
+        with st.expander("👥 Class Report", expanded=False):
+            st.caption('Upload a JSON list of answer sets for this quiz, e.g. [{"Basic Concepts_1": 0, ...}, ...] '
+                       '(option indices 0-3, null for unanswered)')
+            uploaded = st.file_uploader("Class submissions", type="json")
+            if uploaded is not None:
+                try:
+                    submissions = json.load(uploaded)
+                except ValueError as e:
+                    st.error(f"Couldn't read submissions: {str(e)}")
+                else:
+                    show_cohort_report(current_mcqs, submissions)
+        
         if st.button("🔄 Take Another Quiz", type="primary"):
             st.session_state.show_results = False
             st.rerun()
@@ -222,8 +255,8 @@ def main():
             )
             model_choice = st.selectbox(
                 "🤖 Select AI Model",
-                options=["llama3:instruct", "gemini"],
-                help="Llama3 for complex topics, Mistral for faster generation"
+                options=["llama3:instruct", "gemini", "auto"],
+                help="Llama3 for complex topics, Gemini for faster generation; Auto picks the fastest healthy backend"
             )
         
         with col2:
@@ -255,6 +288,11 @@ def main():
                     value=False,
                     help="Questions involving visual analysis"
                 )
+                fresh_quiz = st.checkbox(
+                    "🔄 Fresh questions",
+                    value=False,
+                    help="Generate new questions instead of reusing a quiz made for a similar topic"
+                )
         
         submitted = st.form_submit_button(
             "✨ Generate Quiz",
@@ -267,15 +305,6 @@ def main():
             st.error("Please enter a topic.")
             return
         
-        # Prepare prompt
-        prompt = get_mcq_prompt(
-            topic=topic,
-            difficulty=difficulty,
-            count=questions_per_section,
-            style=question_style,
-            include_diagrams=include_diagrams
-        )
-        
         # Generate with async loading
         with st.spinner(f"Generating {questions_per_section * 3} {difficulty} level questions about {topic}..."):
             try:
@@ -286,13 +315,42 @@ def main():
                 status_text.text("Preparing question generation...")
                 progress_bar.progress(10)
                 
-                # Async generation
-                result = asyncio.run(async_get_model_response(model_choice, prompt))
+                # In-process, or through the HTTP service when QUIZ_SERVICE_URL is set; either way a
+                # quiz cached for a similar topic is reused and identical concurrent requests share one call
+                quiz_request = {
+                    "topic": topic,
+                    "difficulty": difficulty,
+                    "count": questions_per_section,
+                    "style": question_style,
+                    "include_diagrams": include_diagrams,
+                    "model": model_choice,
+                    "tenant": st.session_state.tenant_id,
+                    "use_cache": not fresh_quiz
+                }
+                if service_client.SERVICE_URL:
+                    received = []
+                    
+                    def on_status(status):
+                        if status["estimated_wait"] >= 1:
+                            status_text.text(f"Queued behind other requests (about {status['estimated_wait']:.0f}s)...")
+                    
+                    def on_question(section, question):
+                        received.append(question)
+                        status_text.text(f"Received {len(received)} of {questions_per_section * 3} questions...")
+                        progress_bar.progress(min(85, 10 + 75 * len(received) // (questions_per_section * 3)))
+                    
+                    generated = service_client.stream_quiz(quiz_request, on_question=on_question, on_status=on_status)
+                else:
+                    wait = scheduler.estimate_wait("interactive", st.session_state.tenant_id)
+                    if wait >= 1:
+                        status_text.text(f"Queued behind other requests (about {wait:.0f}s)...")
+                    else:
+                        status_text.text("Generating and parsing questions...")
+                    generated = asyncio.run(async_generate_quiz(quiz_request))
+                result, parsed_mcqs = generated["response"], generated["mcqs"]
+                if generated["cached_topic"]:
+                    status_text.text(f"Reusing questions generated for \"{generated['cached_topic']}\"...")
                 print(f"Model response: {result}")
-                progress_bar.progress(60)
-                status_text.text("Parsing generated questions...")
-                
-                parsed_mcqs = parse_mcqs(result)
                 progress_bar.progress(90)
                 
                 if not parsed_mcqs:
@@ -310,7 +368,7 @@ def main():
                     """)
                     return
                 
-                st.session_state.current_mcqs = parsed_mcqs
+                st.session_state.current_quiz = quiz_store.put(parsed_mcqs)
                 st.session_state.current_topic = topic
                 st.session_state.model_name = model_choice
                 progress_bar.progress(100)
@@ -326,6 +384,15 @@ def main():
                 {'**Includes:** Diagram-based questions' if include_diagrams else ''}
                 """)
                 
+            except AdmissionRejected as e:
+                progress_bar.empty()
+                status_text.empty()
+                wait = f"in about {e.retry_after:.0f} seconds" if e.retry_after is not None else "in a moment"
+                st.warning(f"""
+                ### ⏳ The quiz generator is busy
+                {e.reason}. Please try again {wait}.
+                """)
+                return
             except Exception as e:
                 st.error(f"""
                 ### Error generating questions
@@ -339,13 +406,13 @@ def main():
                 return
     
     # Display quiz if available
-    if st.session_state.current_mcqs:
-        display_quiz(st.session_state.current_mcqs)
+    if st.session_state.current_quiz:
+        display_quiz(quiz_store.get(st.session_state.current_quiz))
         
     # Display quiz history if available
     if st.session_state.quiz_history:
         with st.expander("📜 Quiz History", expanded=False):
-            history_df = pd.DataFrame(st.session_state.quiz_history)
+            history_df = history_frame(st.session_state.quiz_history)
             st.dataframe(
                 history_df.sort_values('date', ascending=False),
                 column_config={
@@ -376,10 +443,14 @@ def main():
                 fig.update_yaxes(tickformat=".0%", range=[0, 1])
                 st.plotly_chart(fig, use_container_width=True)
 
-# Async helper function
-async def async_get_model_response(model_choice, prompt):
-    """Run model response generation in a separate thread"""
-    return await asyncio.to_thread(get_model_response, model_choice, prompt)
+async def async_generate_quiz(quiz_request):
+    """Generate, parse and repair in a separate thread (see pipeline.generate_quiz)"""
+    kwargs = dict(quiz_request)
+    kwargs["model_choice"] = kwargs.pop("model")
+    return await asyncio.to_thread(pipeline.generate_quiz, **kwargs)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # With QUIZ_PROFILE_ALLOW_PARAM set, ?profile=1 (cProfile) or ?profile=pyinstrument profiles this run;
+    # QUIZ_PROFILE profiles every run
+    with profiling.request("streamlit", st.experimental_get_query_params().get("profile", [None])[0]):
+        main()
\ No newline at end of file
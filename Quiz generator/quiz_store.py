@@ -0,0 +1,131 @@
+import collections
+import hashlib
+import os
+import threading
+import weakref
+
+# Byte stored for an unanswered question in packed answers
+UNANSWERED = 255
+
+
+class Question:
+    """One stored question; shared by every session holding the same quiz, so never mutated"""
+
+    __slots__ = ("question", "options", "correct", "explanation")
+
+    def __init__(self, question, options, correct, explanation):
+        self.question = question
+        self.options = options
+        self.correct = correct
+        self.explanation = explanation
+
+    def as_dict(self, section):
+        """The mcq_parser shape, as a fresh dict callers may modify"""
+        return {
+            'question': self.question,
+            'options': list(self.options),
+            'correct': self.correct,
+            'explanation': self.explanation,
+            'user_answer': None,
+            'section': section,
+        }
+
+
+class QuizHandle:
+    """What a session keeps for its quiz; dropping the last handle to a quiz makes it evictable"""
+
+    __slots__ = ("quiz_id", "__weakref__")
+
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+
+
+def _content(mcqs):
+    return tuple((section, tuple((q['question'], tuple(q['options']), q['correct'], q.get('explanation', ''))
+                                 for q in questions))
+                 for section, questions in mcqs.items())
+
+
+class QuizStore:
+    """Quizzes interned by content hash and shared across sessions.
+
+    put() returns a QuizHandle; sessions keep the handle (and packed answers)
+    instead of the quiz itself, so N sessions holding the same quiz cost one
+    copy. A quiz stays while any handle to it is alive; once the last one is
+    garbage collected it joins an LRU of up to `max_unreferenced` quizzes,
+    which keeps recently finished quizzes cheap to re-put.
+    """
+
+    def __init__(self, max_unreferenced=256):
+        self.max_unreferenced = max_unreferenced
+        self._quizzes = {}
+        self._refs = {}
+        self._unreferenced = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Handle finalizers can run from the garbage collector while the lock
+        # is held, so they only queue the release; it is applied on the next call
+        self._released = collections.deque()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _apply_releases(self):
+        while self._released:
+            quiz_id = self._released.popleft()
+            self._refs[quiz_id] -= 1
+            if self._refs[quiz_id]:
+                continue
+            del self._refs[quiz_id]
+            self._unreferenced[quiz_id] = None
+        while len(self._unreferenced) > self.max_unreferenced:
+            evicted, _ = self._unreferenced.popitem(last=False)
+            del self._quizzes[evicted]
+            self._stats["evictions"] += 1
+
+    def put(self, mcqs):
+        content = _content(mcqs)
+        quiz_id = hashlib.blake2b(repr(content).encode(), digest_size=16).hexdigest()
+        with self._lock:
+            self._apply_releases()
+            if quiz_id in self._quizzes:
+                self._stats["hits"] += 1
+                self._unreferenced.pop(quiz_id, None)
+            else:
+                self._stats["misses"] += 1
+                self._quizzes[quiz_id] = tuple((section, tuple(Question(*q) for q in questions))
+                                               for section, questions in content)
+            self._refs[quiz_id] = self._refs.get(quiz_id, 0) + 1
+        handle = QuizHandle(quiz_id)
+        weakref.finalize(handle, self._released.append, quiz_id)
+        return handle
+
+    def get(self, handle):
+        """The quiz as a fresh mcqs dict, or None for no handle"""
+        if handle is None:
+            return None
+        with self._lock:
+            record = self._quizzes[handle.quiz_id]
+        return {section: [q.as_dict(section) for q in questions] for section, questions in record}
+
+    def __len__(self):
+        with self._lock:
+            self._apply_releases()
+            return len(self._quizzes)
+
+    def stats(self):
+        with self._lock:
+            self._apply_releases()
+            return dict(self._stats, quizzes=len(self._quizzes), unreferenced=len(self._unreferenced))
+
+
+quiz_store = QuizStore(int(os.environ.get("QUIZ_STORE_SIZE", "256")))
+
+
+def pack_answers(mcqs, user_answers):
+    """user_answers (keyed by f"{section}_{i}") as one byte per question in quiz order"""
+    return bytes(UNANSWERED if (choice := user_answers.get(f"{section}_{i}")) is None else choice
+                 for section, questions in mcqs.items() for i in range(1, len(questions) + 1))
+
+
+def unpack_answers(mcqs, packed):
+    """The user_answers dict back from pack_answers"""
+    ids = [f"{section}_{i}" for section, questions in mcqs.items() for i in range(1, len(questions) + 1)]
+    return {qid: choice for qid, choice in zip(ids, packed) if choice != UNANSWERED}
@@ -0,0 +1,195 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mcq_parser import SECTIONS, extract_mcqs
+from profiling import profiled
+from prompt_builder import (QUIZ_SYSTEM_PROMPT, REPAIR_SYSTEM_PROMPT, build_fill_prompt,
+                            build_fix_prompt, estimate_tokens)
+
+
+class Slot:
+    """One question position in a section: kept as-is, broken, or missing"""
+
+    __slots__ = ("section", "position", "question", "problem", "fragment")
+
+    def __init__(self, section, position, question=None, problem=None, fragment=None):
+        self.section = section
+        self.position = position
+        self.question = question
+        self.problem = problem
+        self.fragment = fragment
+
+    @property
+    def ok(self):
+        return self.question is not None
+
+
+def find_slots(text, count):
+    """Lay a model response out as `count` slots per section.
+
+    Valid questions keep their position; questions that failed validation become
+    broken slots carrying the fragment and the reason; sections that came back
+    short get missing slots at the end. Extra valid questions are kept too.
+    """
+    mcqs, rejected = extract_mcqs(text)
+    slots = {}
+    for section in SECTIONS:
+        broken = {position: (q, problem) for q, problem, position in rejected if q['section'] == section}
+        valid = iter(mcqs[section])
+        total = max(count, len(mcqs[section]) + len(broken))
+        section_slots = []
+        for position in range(total):
+            if position in broken:
+                q, problem = broken[position]
+                section_slots.append(Slot(section, position, problem=problem, fragment=q))
+                continue
+            q = next(valid, None)
+            if q is None:
+                section_slots.append(Slot(section, position, problem="Missing question"))
+            else:
+                section_slots.append(Slot(section, position, question=q))
+        # Broken fragments beyond the requested count aren't worth a repair call
+        while len(section_slots) > count and not section_slots[-1].ok:
+            section_slots.pop()
+        slots[section] = section_slots
+    return slots
+
+
+def _duplicate(question, section_slots):
+    text = " ".join(question['question'].split()).casefold()
+    return any(slot.ok and " ".join(slot.question['question'].split()).casefold() == text for slot in section_slots)
+
+
+def _parse_single(text, section):
+    mcqs, _ = extract_mcqs(f"### {section}\n{text}")
+    questions = mcqs[section]
+    return questions[0] if questions else None
+
+
+class RepairReport:
+    """What salvage kept and repaired, and what it cost compared with regenerating everything"""
+
+    def __init__(self):
+        self.kept = 0
+        self.repaired = 0
+        self.failed = 0
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.seconds = 0.0
+        self.full_tokens = 0
+        self.full_seconds = None
+        self.estimated_tokens = 0
+
+    def as_dict(self):
+        saved_tokens = self.full_tokens - (self.input_tokens + self.output_tokens)
+        return {
+            "kept": self.kept,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "repair_calls": self.calls,
+            "repair_tokens": self.input_tokens + self.output_tokens,
+            "repair_seconds": round(self.seconds, 3),
+            "estimated_repair_tokens": self.estimated_tokens,
+            "full_regeneration_tokens": self.full_tokens,
+            "full_regeneration_seconds": None if self.full_seconds is None else round(self.full_seconds, 3),
+            "tokens_saved": saved_tokens,
+            "seconds_saved": None if self.full_seconds is None else round(self.full_seconds - self.seconds, 3),
+        }
+
+
+@profiled("salvage_quiz")
+def salvage_quiz(text, generate, topic, difficulty="Intermediate", count=3, style="Conceptual",
+                 original_prompt="", original_seconds=None, max_attempts=2, max_workers=3, min_kept=1):
+    """Keep every valid question and regenerate only the broken or missing slots.
+
+    `generate(prompt, system)` calls the model. A repair call that raises only
+    fails its own slot. Returns `(mcqs, report)`; `mcqs` is None when fewer than
+    `min_kept` questions survived, when the repairs would cost at least as many
+    tokens as regenerating the whole quiz (a full regeneration is the better
+    deal then), or when a section is still empty after repair, in which case
+    the first repair error (e.g. AdmissionRejected), if any, is raised instead.
+    """
+    report = RepairReport()
+    slots = find_slots(text, count)
+    todo = [slot for section_slots in slots.values() for slot in section_slots if not slot.ok]
+    report.kept = sum(slot.ok for section_slots in slots.values() for slot in section_slots)
+    written = report.kept + sum(slot.fragment is not None for slot in todo)
+    question_tokens = estimate_tokens(text) / (written or count * len(SECTIONS))
+
+    # What regenerating the whole quiz would cost: a short response is no measure of a full one
+    report.full_tokens = (estimate_tokens(QUIZ_SYSTEM_PROMPT) + estimate_tokens(original_prompt)
+                          + max(estimate_tokens(text), round(question_tokens * count * len(SECTIONS))))
+    report.full_seconds = original_seconds
+
+    def repair_prompt(slot):
+        if slot.fragment is not None:
+            return build_fix_prompt(slot.fragment, slot.problem, topic, difficulty, style)
+        avoid = [s.question['question'] for s in slots[slot.section] if s.ok]
+        return build_fill_prompt(slot.section, topic, difficulty, style, avoid)
+
+    # One call per broken or missing slot, if each works first time
+    report.estimated_tokens = round(sum(estimate_tokens(REPAIR_SYSTEM_PROMPT) + estimate_tokens(repair_prompt(slot))
+                                        + question_tokens for slot in todo))
+    if report.kept < min_kept or report.estimated_tokens >= report.full_tokens:
+        report.failed = len(todo)
+        return None, report
+
+    def repair(slot):
+        usage = [0, 0, 0]
+        for _ in range(max_attempts):
+            prompt = repair_prompt(slot)
+            try:
+                response = generate(prompt, REPAIR_SYSTEM_PROMPT)
+            except Exception as e:
+                # Give up on this slot only; the questions already salvaged stay
+                print(f"Repair of {slot.section} question {slot.position + 1} failed: {str(e)}")
+                return None, usage, e
+            usage[0] += 1
+            usage[1] += estimate_tokens(REPAIR_SYSTEM_PROMPT) + estimate_tokens(prompt)
+            usage[2] += estimate_tokens(response)
+            question = _parse_single(response, slot.section)
+            if question is not None and not _duplicate(question, slots[slot.section]):
+                # Set right away so later fills in this section avoid it too
+                slot.question = question
+                return question, usage, None
+            # A fix that didn't parse (or repeats a question) falls back to asking for a fresh one
+            slot.fragment = None
+        return None, usage, None
+
+    def repair_section(section_todo):
+        return [repair(slot) for slot in section_todo]
+
+    start = time.perf_counter()
+    errors = []
+    if todo:
+        # Sections are repaired in parallel, but the slots of one section in turn:
+        # fills run side by side would all avoid the same questions and could
+        # come back with the same new one
+        groups = [[slot for slot in todo if slot.section == section] for section in SECTIONS]
+        groups = [group for group in groups if group]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Each section runs in its own copy of the caller's context (request-scoped state)
+            contexts = [contextvars.copy_context() for _ in groups]
+            section_results = pool.map(lambda context, group: context.run(repair_section, group), contexts, groups)
+            results = [result for group_results in section_results for result in group_results]
+        for slot, (question, (calls, tokens_in, tokens_out), error) in zip(todo, results):
+            if error is not None:
+                errors.append(error)
+            report.calls += calls
+            report.input_tokens += tokens_in
+            report.output_tokens += tokens_out
+            if question is None:
+                report.failed += 1
+            else:
+                report.repaired += 1
+    report.seconds = time.perf_counter() - start
+
+    # Slots that still failed are dropped; every section needs at least one question
+    mcqs = {section: [slot.question for slot in slots[section] if slot.ok] for section in SECTIONS}
+    if not all(mcqs.values()):
+        if errors:
+            raise errors[0]
+        return None, report
+    return mcqs, report
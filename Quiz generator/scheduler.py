@@ -0,0 +1,246 @@
+import collections
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+# Priority class -> fair-queuing weight, longest acceptable queue wait in seconds
+# (None queues regardless), share of the workers it may occupy at once, and the
+# per-tenant token bucket (requests/second, burst; None for no limit).
+# Quiz generation is interactive and may fan out into several repair calls;
+# bulk jobs never hold every worker, so a live user always finds one soon.
+PRIORITY_CLASSES = {
+    "interactive": {"weight": 16, "max_wait": 30.0, "max_share": 1.0, "rate": 1.0, "burst": 20},
+    "analysis": {"weight": 4, "max_wait": 60.0, "max_share": 0.75, "rate": 0.5, "burst": 10},
+    "bulk": {"weight": 1, "max_wait": None, "max_share": 0.75, "rate": None, "burst": None},
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised by submit when a request is rate limited or would wait too long; `tenant` is whose request it was"""
+
+    def __init__(self, reason, retry_after=None, tenant=None):
+        message = reason if retry_after is None else f"{reason}; retry in ~{retry_after:.0f}s"
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.tenant = tenant
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost, now):
+        """Take `cost` tokens; returns 0 on success, else seconds until they'd be available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "priority", "tenant", "start", "finish", "future", "queued_at",
+                 "started_at", "context")
+
+    def __init__(self, fn, args, kwargs, priority, tenant, start, finish, now):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.tenant = tenant
+        self.start = start
+        self.finish = finish
+        self.future = Future()
+        self.queued_at = now
+        self.started_at = None
+        # Run in the submitter's context so per-request state (e.g. profiling) follows the job
+        self.context = contextvars.copy_context()
+
+
+class Scheduler:
+    """Runs model calls on a fixed set of workers in priority-weighted fair order.
+
+    Each (priority class, tenant) pair is a flow in start-time fair queuing:
+    a job's finish tag is its flow's previous tag (or the current virtual time)
+    plus cost / class weight, and the lowest tag runs next. So interactive work
+    jumps ahead of a bulk backlog, while tenants within a class share evenly and
+    one tenant's burst can't starve the rest. Per-tenant token buckets cap
+    request rates, and admission control rejects a request whose estimated
+    queue wait exceeds its class's limit instead of letting it time out later.
+    """
+
+    def __init__(self, workers=4, classes=None, alpha=0.2, initial_service=2.0, clock=time.monotonic):
+        self.workers = workers
+        self.classes = {name: dict(config) for name, config in (classes or PRIORITY_CLASSES).items()}
+        self._alpha = alpha
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._virtual = 0.0
+        self._last_finish = {}
+        self._buckets = {}
+        self._running = []
+        self._closed = False
+        # EWMA service time per class, used for queue-time estimates
+        self._service = {name: initial_service for name in self.classes}
+        self._waits = {name: collections.deque(maxlen=1000) for name in self.classes}
+        self._counts = {name: collections.Counter() for name in self.classes}
+        self._threads = [threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, *args, priority="interactive", tenant="anonymous", cost=1.0, **kwargs):
+        """Queue fn(*args, **kwargs) and return its Future, or raise AdmissionRejected"""
+        config = self.classes.get(priority)
+        if config is None:
+            raise ValueError(f"Unknown priority class: {priority}")
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            now = self._clock()
+            counts = self._counts[priority]
+            counts["submitted"] += 1
+            start, finish = self._tags(priority, tenant, cost)
+
+            wait = self._estimate(priority, finish, now)
+            if config["max_wait"] is not None and wait > config["max_wait"]:
+                counts["rejected_busy"] += 1
+                raise AdmissionRejected(
+                    f"Server busy: estimated wait {wait:.0f}s exceeds {config['max_wait']:.0f}s for {priority} requests",
+                    wait - config["max_wait"], tenant)
+
+            if config["rate"] is not None:
+                bucket = self._buckets.get((priority, tenant))
+                if bucket is None:
+                    bucket = self._buckets[(priority, tenant)] = TokenBucket(config["rate"], config["burst"], now)
+                retry_after = bucket.take(cost, now)
+                if retry_after:
+                    counts["rejected_rate"] += 1
+                    raise AdmissionRejected(f"Rate limit reached for {priority} requests", retry_after, tenant)
+
+            if len(self._last_finish) > 4096:
+                self._prune(now)
+            self._last_finish[(priority, tenant)] = finish
+            job = _Job(fn, args, kwargs, priority, tenant, start, finish, now)
+            heapq.heappush(self._queue, (finish, next(self._sequence), job))
+            self._cond.notify()
+            return job.future
+
+    def run(self, fn, *args, priority="interactive", tenant="anonymous", cost=1.0, timeout=None, **kwargs):
+        """Blocking submit; returns fn's result or raises its exception"""
+        return self.submit(fn, *args, priority=priority, tenant=tenant, cost=cost, **kwargs).result(timeout)
+
+    def estimate_wait(self, priority="interactive", tenant="anonymous", cost=1.0):
+        """Seconds a request submitted now would likely spend queued"""
+        with self._cond:
+            _, finish = self._tags(priority, tenant, cost)
+            return self._estimate(priority, finish, self._clock())
+
+    def stats(self):
+        with self._cond:
+            now = self._clock()
+            snapshot = {}
+            for name in self.classes:
+                waits = sorted(self._waits[name])
+                _, finish = self._tags(name, None, 1.0)
+                snapshot[name] = {
+                    "queued": sum(1 for _, _, job in self._queue if job.priority == name),
+                    "running": sum(1 for job in self._running if job.priority == name),
+                    "service_seconds": round(self._service[name], 3),
+                    "estimated_wait": round(self._estimate(name, finish, now), 3),
+                    "wait_p50": round(waits[len(waits) // 2], 3) if waits else None,
+                    "wait_p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 3) if waits else None,
+                    **self._counts[name],
+                }
+            return snapshot
+
+    def shutdown(self, wait=True):
+        """Stop taking work; queued jobs still run"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _tags(self, priority, tenant, cost):
+        start = max(self._virtual, self._last_finish.get((priority, tenant), 0.0))
+        return start, start + cost / self.classes[priority]["weight"]
+
+    def _slots(self, priority):
+        return max(1, int(self.workers * self.classes[priority]["max_share"]))
+
+    def _estimate(self, priority, finish, now):
+        # Work queued ahead of us spreads over the workers our class may use;
+        # with none of those free we also wait for the earliest running job
+        ahead = sum(self._service[job.priority] for tag, _, job in self._queue if tag <= finish)
+        slots = self._slots(priority)
+        mine = sum(1 for job in self._running if job.priority == priority)
+        free_in = 0.0
+        if self._running and (len(self._running) >= self.workers or mine >= slots):
+            free_in = min(max(0.0, self._service[job.priority] - (now - job.started_at)) for job in self._running)
+        return free_in + ahead / slots
+
+    def _next_job(self):
+        # Lowest finish tag whose class still has a free slot
+        skipped, job = [], None
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            candidate = entry[2]
+            if sum(1 for running in self._running if running.priority == candidate.priority) < self._slots(candidate.priority):
+                job = candidate
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+        return job
+
+    def _prune(self, now):
+        # Flows whose tags the virtual clock has passed, and buckets that have refilled, hold no state
+        self._last_finish = {flow: tag for flow, tag in self._last_finish.items() if tag > self._virtual}
+        self._buckets = {key: bucket for key, bucket in self._buckets.items()
+                         if bucket.tokens + (now - bucket.updated) * bucket.rate < bucket.burst}
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._closed and not self._queue:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                self._virtual = max(self._virtual, job.start)
+                job.started_at = self._clock()
+                self._waits[job.priority].append(job.started_at - job.queued_at)
+                self._running.append(job)
+
+            try:
+                result = job.context.run(job.fn, *job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+                outcome = "failed"
+            else:
+                job.future.set_result(result)
+                outcome = "completed"
+
+            with self._cond:
+                elapsed = self._clock() - job.started_at
+                self._service[job.priority] += self._alpha * (elapsed - self._service[job.priority])
+                self._counts[job.priority][outcome] += 1
+                self._running.remove(job)
+                self._cond.notify_all()
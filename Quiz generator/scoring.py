@@ -0,0 +1,36 @@
+def score_quiz(mcqs, user_answers):
+    """Score one user's answers (keyed by f"{section}_{i}", 1-based)
+
+    Returns (section_scores, total_correct, total_questions, overall_score).
+    """
+    section_scores = {}
+    for section, questions in mcqs.items():
+        correct = sum(1 for i, q in enumerate(questions, 1)
+                      if user_answers.get(f"{section}_{i}") == q['correct'])
+        section_scores[section] = {
+            'correct': correct,
+            'total': len(questions),
+            'percentage': correct/len(questions) if len(questions) > 0 else 0
+        }
+
+    total_correct = sum(s['correct'] for s in section_scores.values())
+    total_questions = sum(s['total'] for s in section_scores.values())
+    overall_score = total_correct / total_questions if total_questions > 0 else 0
+    return section_scores, total_correct, total_questions, overall_score
+
+
+def collect_wrong_answers(mcqs, user_answers):
+    """Every answered-but-wrong question with its context, as fed to the analysis prompts"""
+    wrong_answers = []
+    for section, questions in mcqs.items():
+        for i, q in enumerate(questions, 1):
+            user_choice = user_answers.get(f"{section}_{i}")
+            if user_choice is not None and user_choice != q['correct']:
+                wrong_answers.append({
+                    'section': section,
+                    'question': q['question'],
+                    'user_answer': q['options'][user_choice] if user_choice is not None else "Not attempted",
+                    'correct_answer': q['options'][q['correct']],
+                    'explanation': q['explanation']
+                })
+    return wrong_answers
@@ -0,0 +1,234 @@
+import collections
+import copy
+import random
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# Spelled-out forms of abbreviations people type into the topic box, so
+# "Python OOP" and "object oriented programming in Python" share features
+ABBREVIATIONS = {
+    "oop": "object oriented programming",
+    "oops": "object oriented programming",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "dbms": "database management systems",
+    "db": "database",
+    "os": "operating systems",
+    "dsa": "data structures algorithms",
+    "js": "javascript",
+    "ts": "typescript",
+    "k8s": "kubernetes",
+    "cn": "computer networks",
+    "ww1": "world war 1",
+    "ww2": "world war 2",
+}
+
+# Words that don't change what a quiz is about
+STOPWORDS = {"a", "an", "the", "in", "of", "on", "for", "to", "and", "with", "about", "using", "basics",
+             "introduction", "intro", "fundamentals", "concepts", "quiz"}
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith(("xes", "sses", "shes")):
+        return word[:-2]
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _stem(word):
+    # Enough to pair "designing databases" with "database design"; not a general stemmer
+    return word[:-3] if len(word) > 6 and word.endswith("ing") else word
+
+
+def same_terms(normalized, other):
+    """Whether two normalized topics have the same terms, up to order and -ing forms.
+
+    Embeddings of long topics that differ in one distinguishing word ("design
+    patterns in Java" vs "in Python", "French" vs "Russian Revolution") stay
+    close to the threshold, so a hit also requires this.
+    """
+    return {_stem(word) for word in normalized.split()} == {_stem(word) for word in other.split()}
+
+
+# Expansions become single terms, so a shared "object oriented programming"
+# counts as one matching word rather than outweighing "Python" vs "Java"
+PHRASES = sorted({" ".join(_singular(w) for w in expansion.split()) for expansion in ABBREVIATIONS.values()
+                  if " " in expansion}, key=len, reverse=True)
+
+
+def normalize_topic(topic):
+    """Casefolded terms with abbreviations expanded and stopwords, punctuation and plurals dropped"""
+    words = []
+    for word in re.findall(r"[\w+#]+", topic.casefold()):
+        for part in ABBREVIATIONS.get(word, word).split():
+            if part not in STOPWORDS:
+                words.append(_singular(part))
+    text = f" {' '.join(words)} "
+    for phrase in PHRASES:
+        text = text.replace(f" {phrase} ", f" {phrase.replace(' ', '_')} ")
+    return text.strip()
+
+
+def embed(text, dim=512, ngram_range=(3, 4)):
+    """L2-normalized sum of per-term hashed features: the whole term plus its padded character n-grams.
+
+    Each term is normalized before summing so every term weighs the same and
+    word order doesn't matter; n-grams absorb spelling variants. crc32 keeps
+    vectors stable across runs.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.split():
+        term = np.zeros(dim, dtype=np.float32)
+        term[zlib.crc32(f"w:{word}".encode()) % dim] += 2.0
+        padded = f" {word} "
+        for n in range(ngram_range[0], ngram_range[1] + 1):
+            for i in range(len(padded) - n + 1):
+                term[zlib.crc32(padded[i:i + n].encode()) % dim] += 0.5
+        vector += term / np.linalg.norm(term)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Reuses a quiz generated for a similar topic with identical settings.
+
+    Settings (model, difficulty, count, style...) must match exactly; only the
+    topic is compared by cosine similarity of its embedding against an
+    in-memory matrix per settings combination. Entries expire `ttl` seconds
+    after they were stored (None keeps them) and are evicted least recently
+    used. A random sample of hits is kept for auditing; with a
+    `judge(query_topic, cached_topic)` callable the sample is also scored, and
+    the false-hit rate reported.
+    """
+
+    def __init__(self, threshold=0.6, max_entries=1000, dim=512, audit_rate=0.05, judge=None, audit_size=200,
+                 seed=None, ttl=None, clock=time.monotonic):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.dim = dim
+        self.audit_rate = audit_rate
+        self.judge = judge
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        # settings key -> OrderedDict(normalized topic -> (topic, vector, value, stored at)); order is recency
+        self._entries = collections.OrderedDict()
+        self._matrices = {}
+        self._count = 0
+        self.audits = collections.deque(maxlen=audit_size)
+        self._stats = collections.Counter()
+        self._lookup_seconds = collections.deque(maxlen=1000)
+
+    @staticmethod
+    def settings_key(settings):
+        return tuple(sorted(settings.items()))
+
+    def lookup(self, topic, settings):
+        """(value, similarity, cached_topic) for the nearest cached topic above the threshold, else None"""
+        start = time.perf_counter()
+        normalized = normalize_topic(topic)
+        key = self.settings_key(settings)
+        with self._lock:
+            try:
+                while True:
+                    match = self._nearest(key, normalized)
+                    if match is None:
+                        self._stats["misses"] += 1
+                        return None
+                    cached_normalized, similarity = match
+                    entries = self._entries[key]
+                    cached_topic, _, value, stored_at = entries[cached_normalized]
+                    if self.ttl is None or self.clock() - stored_at < self.ttl:
+                        break
+                    # Expired: drop it and look for the next nearest
+                    self._stats["expired"] += 1
+                    self._remove(key, cached_normalized)
+                entries.move_to_end(cached_normalized)
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                if cached_normalized != normalized and self._rng.random() < self.audit_rate:
+                    self._audit(topic, cached_topic, similarity)
+                return copy.deepcopy(value), similarity, cached_topic
+            finally:
+                self._lookup_seconds.append(time.perf_counter() - start)
+
+    def store(self, topic, settings, value):
+        normalized = normalize_topic(topic)
+        key = self.settings_key(settings)
+        with self._lock:
+            entries = self._entries.setdefault(key, collections.OrderedDict())
+            if normalized not in entries:
+                self._count += 1
+            entries[normalized] = (topic, embed(normalized, self.dim), copy.deepcopy(value), self.clock())
+            entries.move_to_end(normalized)
+            self._entries.move_to_end(key)
+            self._matrices.pop(key, None)
+            while self._count > self.max_entries:
+                self._evict()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            timings = sorted(self._lookup_seconds)
+            judged = self._stats["audit_judged"]
+            return {
+                "entries": self._count,
+                "lookups": lookups,
+                "hits": self._stats["hits"],
+                "hit_rate": self._stats["hits"] / lookups if lookups else None,
+                "expired": self._stats["expired"],
+                "threshold": self.threshold,
+                "audited": self._stats["audited"],
+                "false_hits": self._stats["false_hits"],
+                "false_hit_rate": self._stats["false_hits"] / judged if judged else None,
+                "lookup_p50_us": round(timings[len(timings) // 2] * 1e6, 1) if timings else None,
+                "lookup_p99_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6, 1)
+                if timings else None,
+            }
+
+    def _nearest(self, key, normalized):
+        entries = self._entries.get(key)
+        if not entries:
+            return None
+        if normalized in entries:
+            return normalized, 1.0
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            names = list(entries)
+            matrix = self._matrices[key] = (names, np.stack([entries[name][1] for name in names]))
+        names, vectors = matrix
+        similarities = vectors @ embed(normalized, self.dim)
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        for best in candidates[np.argsort(-similarities[candidates])]:
+            if same_terms(normalized, names[best]):
+                return names[best], round(float(similarities[best]), 4)
+        return None
+
+    def _audit(self, topic, cached_topic, similarity):
+        record = {"topic": topic, "cached_topic": cached_topic, "similarity": round(similarity, 3)}
+        self._stats["audited"] += 1
+        if self.judge is not None:
+            record["false_hit"] = not self.judge(topic, cached_topic)
+            self._stats["audit_judged"] += 1
+            self._stats["false_hits"] += record["false_hit"]
+        self.audits.append(record)
+
+    def _evict(self):
+        # Least recently used entry of the least recently used settings combination
+        key, entries = next(iter(self._entries.items()))
+        self._remove(key, next(iter(entries)))
+
+    def _remove(self, key, normalized):
+        entries = self._entries[key]
+        del entries[normalized]
+        self._count -= 1
+        self._matrices.pop(key, None)
+        if not entries:
+            del self._entries[key]
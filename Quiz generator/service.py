@@ -0,0 +1,292 @@
+"""HTTP inference service: quiz generation, answer analysis and the domain models.
+
+    python service.py --workers 4 --port 8000
+    QUIZ_SERVICE_URL=http://127.0.0.1:8000 streamlit run question_generator.py
+
+Endpoints (JSON in, JSON out):
+    POST /v1/quiz              generate, parse and repair a quiz
+    POST /v1/quiz/stream       same, as Server-Sent Events: `status`, one `question`
+                               event per question as soon as it is complete, then
+                               `quiz` (the final result) or `error`
+    POST /v1/analysis          personalized analysis of the wrong answers
+    POST /v1/themes            theme -> count for a list of wrong answers
+    POST /v1/cohort            class report for many students' answers to one quiz
+    GET  /v1/domain/models     models served by model_utils
+    POST /v1/domain/generate   model_utils.generate_response
+    GET  /healthz              scheduler, cache and coalescing stats
+
+Requests the scheduler turns away (busy or rate limited) get a 503 with a
+Retry-After header; on the stream they end with an `error` event carrying
+`retry_after`.
+
+With QUIZ_PROFILE_ALLOW_PARAM set, ?profile=1 (cProfile) or ?profile=pyinstrument
+on any request profiles it; QUIZ_PROFILE profiles all of them. See profiling.py
+(at the repository root) for the files written.
+
+Each worker process has its own scheduler, semantic cache and coalescing, so
+LLM_WORKERS is per worker.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import sys
+import threading
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# profiling and model_utils live at the repository root
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pipeline
+from coalescing import CoalescedCallCancelled
+from cohort import grade_cohort
+import profiling
+from model import scheduler
+from ollama_manager import get_manager
+from scheduler import AdmissionRejected
+
+# Local domain models are CPU/GPU bound; this many generations run at once per worker
+DOMAIN_CONCURRENCY = int(os.environ.get("DOMAIN_CONCURRENCY", "1"))
+
+_domain_slots = None
+
+
+class ProfilingMiddleware:
+    """Profiles a request end to end (including a streamed body) when it asks for ?profile=
+    and QUIZ_PROFILE_ALLOW_PARAM allows that, or when QUIZ_PROFILE is set"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode = parse_qs(scope.get("query_string", b"").decode()).get("profile", [None])[0]
+        with profiling.request(f"{scope['method']} {scope['path']}", mode):
+            await self.app(scope, receive, send)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Start the Ollama keep-alive pool with the worker, so its first ping (not the first request) pays the cold load
+    manager = get_manager()
+    yield
+    manager.stop()
+
+
+app = FastAPI(title="Smart MCQ Quiz Generator", lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, error):
+    # Busy or rate limited: tell the client when to come back
+    return JSONResponse(status_code=503, content={"detail": error.reason, "retry_after": error.retry_after},
+                        headers=_retry_after_header(error))
+
+
+def _retry_after_header(error):
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))} if error.retry_after is not None else {}
+
+
+class QuizRequest(BaseModel):
+    topic: str = Field(min_length=1)
+    difficulty: str = "Intermediate"
+    count: int = Field(3, ge=1, le=10)
+    style: str = "Conceptual"
+    include_diagrams: bool = False
+    model: str = "llama3:instruct"
+    tenant: str = "anonymous"
+    use_cache: bool = True
+
+
+class AnalysisRequest(BaseModel):
+    mcqs: dict
+    user_answers: dict
+    topic: str
+    model: str = "llama3:instruct"
+    tenant: str = "anonymous"
+
+
+class ThemesRequest(BaseModel):
+    wrong_answers: list
+    topic: str
+    model: str = "llama3:instruct"
+    tenant: str = "anonymous"
+
+
+class CohortRequest(BaseModel):
+    mcqs: dict
+    submissions: list
+
+
+class DomainOptions(BaseModel):
+    """The generate_response options a client may set; anything else is a 422"""
+    model_config = ConfigDict(extra="forbid")
+
+    max_new_tokens: int | None = Field(None, ge=1, le=1024)
+    questions_per_section: int | None = Field(None, ge=1, le=10)
+    constrained: bool = False
+    batch_size: int = Field(8, ge=1, le=32)
+
+
+class DomainRequest(BaseModel):
+    model: str
+    prompt: str = Field(min_length=1, max_length=100_000)
+    options: DomainOptions = Field(default_factory=DomainOptions)
+
+
+def _quiz_kwargs(request):
+    return {
+        "topic": request.topic,
+        "difficulty": request.difficulty,
+        "count": request.count,
+        "style": request.style,
+        "include_diagrams": request.include_diagrams,
+        "model_choice": request.model,
+        "tenant": request.tenant,
+        "use_cache": request.use_cache,
+    }
+
+
+def _quiz_error(result):
+    # Backend failures come back as a warning string (scheduler rejections raise AdmissionRejected)
+    if result["response"].startswith("⚠️"):
+        return 503, result["response"]
+    return 502, "Couldn't generate valid questions; try a more specific topic or another model"
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/healthz")
+async def healthz():
+    return {
+        "status": "ok",
+        "scheduler": scheduler.stats(),
+        "quiz_cache": pipeline.quiz_cache.stats(),
+        "coalescing": pipeline.flights.stats(),
+    }
+
+
+@app.post("/v1/quiz")
+async def quiz(request: QuizRequest):
+    result = await asyncio.to_thread(pipeline.generate_quiz, **_quiz_kwargs(request))
+    if not result["mcqs"]:
+        status, detail = _quiz_error(result)
+        raise HTTPException(status_code=status, detail=detail)
+    return result
+
+
+@app.post("/v1/quiz/stream")
+async def quiz_stream(request: QuizRequest):
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    cancel = threading.Event()
+
+    def on_question(section, question):
+        # Called from the generating thread
+        loop.call_soon_threadsafe(events.put_nowait, ("question", {"section": section, "question": question}))
+
+    async def generate():
+        try:
+            result = await asyncio.to_thread(pipeline.generate_quiz, on_question=on_question, cancel_event=cancel,
+                                             **_quiz_kwargs(request))
+            if result["mcqs"]:
+                await events.put(("quiz", result))
+            else:
+                status, detail = _quiz_error(result)
+                await events.put(("error", {"status": status, "detail": detail}))
+        except AdmissionRejected as e:
+            await events.put(("error", {"status": 503, "detail": e.reason, "retry_after": e.retry_after}))
+        except CoalescedCallCancelled:
+            pass  # nobody is listening any more
+        except Exception as e:
+            await events.put(("error", {"status": 500, "detail": str(e)}))
+        finally:
+            await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(generate())
+        try:
+            yield _sse("status", {"estimated_wait": scheduler.estimate_wait("interactive", request.tenant)})
+            while True:
+                item = await events.get()
+                if item is None:
+                    break
+                yield _sse(*item)
+            await task
+        finally:
+            # A client that disconnects stops waiting on the shared generation, freeing its worker thread
+            cancel.set()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/v1/analysis")
+async def analysis(request: AnalysisRequest):
+    return await asyncio.to_thread(pipeline.analyze_answers, request.mcqs, request.user_answers, request.topic,
+                                   request.model, request.tenant)
+
+
+@app.post("/v1/themes")
+async def themes(request: ThemesRequest):
+    return await asyncio.to_thread(pipeline.common_themes, request.wrong_answers, request.topic, request.model,
+                                   request.tenant)
+
+
+@app.post("/v1/cohort")
+async def cohort(request: CohortRequest):
+    try:
+        report = await asyncio.to_thread(grade_cohort, request.mcqs, request.submissions)
+    except (ValueError, TypeError, AttributeError, OverflowError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Couldn't grade these submissions: {str(e)}")
+    return report.as_dict()
+
+
+@app.get("/v1/domain/models")
+async def domain_models():
+    import model_utils
+    return {"models": sorted(model_utils.MODEL_HANDLERS)}
+
+
+@app.post("/v1/domain/generate")
+async def domain_generate(request: DomainRequest):
+    # Imported on first use so quiz-only deployments never load torch
+    import model_utils
+    global _domain_slots
+    if request.model not in model_utils.MODEL_HANDLERS:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {request.model}")
+    if _domain_slots is None:
+        _domain_slots = asyncio.Semaphore(DOMAIN_CONCURRENCY)
+    async with _domain_slots:
+        try:
+            # Only the options the client set, so a causal model is never handed Legal-BERT's batch_size
+            text = await asyncio.to_thread(model_utils.generate_response, request.model, request.prompt,
+                                           **request.options.model_dump(exclude_unset=True))
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return {"model": request.model, "text": text}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("QUIZ_SERVICE_WORKERS", "2")))
+    args = parser.parse_args()
+    uvicorn.run("service:app", host=args.host, port=args.port, workers=args.workers, app_dir=HERE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import json
+import os
+import urllib.error
+import urllib.request
+
+from scheduler import AdmissionRejected
+
+# Base URL of a running service.py (e.g. http://127.0.0.1:8000); when set the
+# Streamlit app sends generation and analysis there instead of running them in-process
+SERVICE_URL = os.environ.get("QUIZ_SERVICE_URL")
+
+
+class ServiceError(Exception):
+    """The service answered with an error; busy and rate-limited answers raise AdmissionRejected instead"""
+
+
+def _error(status, detail, retry_after=None):
+    if retry_after is not None:
+        return AdmissionRejected(detail, float(retry_after))
+    return ServiceError(f"{status}: {detail}")
+
+
+def _open(path, payload, base_url, timeout):
+    request = urllib.request.Request(
+        (base_url or SERVICE_URL).rstrip("/") + path,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        return urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        try:
+            detail = json.load(e).get("detail")
+        except ValueError:
+            detail = e.reason
+        raise _error(e.code, detail, e.headers.get("Retry-After")) from None
+
+
+def post(path, payload, base_url=None, timeout=600):
+    with _open(path, payload, base_url, timeout) as response:
+        return json.load(response)
+
+
+def iter_events(response):
+    """(event, data) pairs from a Server-Sent Events response"""
+    event, data = "message", []
+    for raw in response:
+        line = raw.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+def stream_quiz(payload, on_question=None, on_status=None, base_url=None, timeout=600):
+    """POST /v1/quiz/stream; calls on_question(section, question) as questions arrive and
+    returns the final result (same shape as pipeline.generate_quiz)"""
+    with _open("/v1/quiz/stream", payload, base_url, timeout) as response:
+        for event, data in iter_events(response):
+            if event == "question" and on_question:
+                on_question(data["section"], data["question"])
+            elif event == "status" and on_status:
+                on_status(data)
+            elif event == "quiz":
+                return data
+            elif event == "error":
+                raise _error(data["status"], data["detail"], data.get("retry_after"))
+    raise ServiceError("Stream ended without a result")
+
+
+def analyze(mcqs, user_answers, topic, model_name, tenant="anonymous", base_url=None):
+    return post("/v1/analysis", {"mcqs": mcqs, "user_answers": user_answers, "topic": topic, "model": model_name,
+                                 "tenant": tenant}, base_url)
+
+
+def themes(wrong_answers, topic, model_name, tenant="anonymous", base_url=None):
+    return post("/v1/themes", {"wrong_answers": wrong_answers, "topic": topic, "model": model_name,
+                               "tenant": tenant}, base_url)
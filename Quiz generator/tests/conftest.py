@@ -0,0 +1,11 @@
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The app modules, the shared modules at the repository root and the local fakes
+# in benchmarks/ are imported by name, as the app and benchmarks do
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.append(os.path.dirname(os.path.dirname(HERE)))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "benchmarks"))
+# The Gemini client refuses to construct without a key; no test calls it
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
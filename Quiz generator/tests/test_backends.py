@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from backends import BackendError, BackendStats, Router, looks_like_quiz
+from fake_ollama import CANNED_QUIZ
+
+GARBAGE = "Sure! Here are some questions about your topic..."
+
+
+class FakeBackend:
+    """Injected latency per call (a constant or a list consumed in order), optional errors and outputs"""
+
+    def __init__(self, delays, text=CANNED_QUIZ, error=False):
+        self.delays = delays
+        self.text = text
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, request_class, system):
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+        delay = self.delays[min(call, len(self.delays) - 1)] if isinstance(self.delays, list) else self.delays
+        time.sleep(delay)
+        if self.error:
+            raise RuntimeError("injected backend error")
+        return self.text
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def warm_up(router, name, calls=5):
+    for _ in range(calls):
+        router.call(name, "prompt", validate=looks_like_quiz)
+
+
+def test_error_rate_decays_once_from_last_update():
+    clock = Clock()
+    stats = BackendStats(alpha=0.5, half_life=60.0, clock=clock)
+    stats.record(1.0, ok=False)
+    assert stats.current_error_rate() == pytest.approx(0.5)
+    clock.now = 60.0
+    stats.record(1.0, ok=True)
+    # 0.5 halved over 60s, then weighted by (1 - alpha); no further decay at the same instant
+    assert stats.current_error_rate() == pytest.approx(0.125)
+    clock.now = 120.0
+    assert stats.current_error_rate() == pytest.approx(0.0625)
+
+
+def test_ranks_by_ewma_latency():
+    router = Router()
+    router.register("slow", FakeBackend(0.03))
+    router.register("fast", FakeBackend(0.005))
+    router.register("untried", FakeBackend(0.01))
+    warm_up(router, "slow")
+    warm_up(router, "fast")
+    # Untried backends are explored first, then by latency
+    assert router.ranked() == ["untried", "fast", "slow"]
+    assert router.route("prompt", validate=looks_like_quiz)[0] == "untried"
+    assert router.ranked() == ["fast", "untried", "slow"]
+
+
+def test_unhealthy_backend_is_excluded_then_recovers():
+    router = Router(half_life=0.2)
+    flaky = FakeBackend(0.001)
+    router.register("flaky", flaky)
+    router.register("steady", FakeBackend(0.02))
+    warm_up(router, "flaky")
+    warm_up(router, "steady")
+    assert router.ranked()[0] == "flaky"
+
+    flaky.error = True
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            router.call("flaky", "prompt")
+    assert router.ranked() == ["steady", "flaky"]
+    assert router.route("prompt", validate=looks_like_quiz)[0] == "steady"
+
+    # A few half-lives later the error rate has decayed and the faster backend is probed again
+    time.sleep(0.8)
+    assert router.ranked()[0] == "flaky"
+
+
+def test_hedge_fires_after_primary_p95():
+    router = Router()
+    primary = FakeBackend([0.01] * 5 + [1.0])
+    hedge = FakeBackend(0.05)
+    router.register("primary", primary)
+    router.register("hedge", hedge)
+    warm_up(router, "primary")
+    warm_up(router, "hedge")
+    hedge.calls = 0
+    p95 = router._stats["primary"].p95()
+
+    start = time.perf_counter()
+    name, text = router.route("prompt", validate=looks_like_quiz)
+    elapsed = time.perf_counter() - start
+    assert name == "hedge" and looks_like_quiz(text)
+    assert hedge.calls == 1
+    # Hedged at the primary's p95 rather than waiting out its 1s stall
+    assert p95 + 0.05 <= elapsed < 0.5
+
+
+def test_no_hedge_when_primary_is_within_p95():
+    router = Router()
+    hedge = FakeBackend(0.05)
+    router.register("primary", FakeBackend([0.02] * 5 + [0.001]))
+    router.register("hedge", hedge)
+    warm_up(router, "primary")
+    warm_up(router, "hedge")
+    hedge.calls = 0
+    assert router.route("prompt", validate=looks_like_quiz)[0] == "primary"
+    assert hedge.calls == 0
+
+
+def test_invalid_first_response_loses_to_valid_hedge():
+    router = Router()
+    primary = FakeBackend([0.01] * 5 + [0.2])
+    hedge = FakeBackend(0.4)
+    router.register("primary", primary)
+    router.register("hedge", hedge)
+    warm_up(router, "primary")
+    warm_up(router, "hedge", calls=1)
+    # The primary answers first (0.2s vs. hedge at ~0.01 + 0.4s), but with garbage
+    primary.text = GARBAGE
+    name, text = router.route("prompt", validate=looks_like_quiz)
+    assert name == "hedge" and text == CANNED_QUIZ
+
+
+def test_all_backends_failing_raises():
+    router = Router()
+    router.register("broken", FakeBackend(0.001, error=True))
+    router.register("garbage", FakeBackend(0.001, text=GARBAGE))
+    with pytest.raises(BackendError):
+        router.route("prompt", validate=looks_like_quiz)
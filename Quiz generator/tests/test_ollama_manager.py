@@ -0,0 +1,131 @@
+import time
+
+import pytest
+
+import ollama_manager
+from fake_ollama import FakeOllama
+from ollama_manager import OllamaManager
+
+MODEL = "llama3:instruct"
+MESSAGES = [{"role": "user", "content": "Generate a quiz about Python OOP"}]
+LOAD_DELAY = 0.3
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(ollama_manager, "COLD_LOAD_THRESHOLD", LOAD_DELAY / 2)
+    server = FakeOllama(load_delay=LOAD_DELAY, token_delay=0).start()
+    yield server
+    server.stop()
+
+
+def make_manager(fake, **kwargs):
+    return OllamaManager(models=(MODEL,), host=fake.host, **kwargs)
+
+
+def counts(manager):
+    stats = manager.latency_stats()
+    return stats["cold"]["count"], stats["warm"]["count"]
+
+
+def test_first_call_is_cold_and_repeat_is_warm(fake):
+    manager = make_manager(fake)
+    manager.chat(MODEL, MESSAGES)
+    manager.chat(MODEL, MESSAGES)
+    assert counts(manager) == (1, 1)
+    stats = manager.latency_stats()
+    assert stats["cold"]["mean"] >= LOAD_DELAY > stats["warm"]["max"]
+
+
+def test_call_after_eviction_is_cold(fake):
+    manager = make_manager(fake)
+    manager.chat(MODEL, MESSAGES)
+    fake.evict_all()
+    manager.chat(MODEL, MESSAGES)
+    assert counts(manager) == (2, 0)
+
+
+def test_streamed_call_is_classified_too(fake):
+    manager = make_manager(fake)
+    pieces = []
+    response = manager.chat(MODEL, MESSAGES, on_text=pieces.append)
+    manager.chat(MODEL, MESSAGES, on_text=pieces.append)
+    assert response["message"]["content"].startswith("### Basic Concepts")
+    assert counts(manager) == (1, 1)
+
+
+def test_class_options_are_passed_through(fake):
+    manager = make_manager(fake, runner_options={"num_thread": 8})
+    manager.chat(MODEL, MESSAGES, request_class="quiz")
+    manager.chat(MODEL, MESSAGES, request_class="analysis")
+    manager.warm()
+    (_, quiz), (_, analysis), (ping_path, ping) = fake.requests
+    assert quiz["options"] == {"num_ctx": 4096, "num_thread": 8, "num_predict": 2048}
+    assert analysis["options"] == {"num_ctx": 4096, "num_thread": 8, "num_predict": 768}
+    assert ping_path == "/api/generate"
+    assert ping["options"] == {"num_ctx": 4096, "num_thread": 8}
+    assert ping["keep_alive"] == quiz["keep_alive"] == manager.keep_alive
+
+
+def test_switching_request_class_does_not_reload(fake):
+    manager = make_manager(fake)
+    for request_class in ("quiz", "analysis", "quiz", "analysis"):
+        manager.chat(MODEL, MESSAGES, request_class=request_class)
+    assert fake.loads == 1
+    assert counts(manager) == (1, 3)
+
+
+def test_keep_alive_ping_does_not_reload(fake):
+    manager = make_manager(fake)
+    manager.chat(MODEL, MESSAGES)
+    manager.warm()
+    manager.chat(MODEL, MESSAGES)
+    assert fake.loads == 1
+    assert counts(manager) == (1, 1)
+
+
+def test_fake_reloads_when_runner_options_change(fake):
+    manager = make_manager(fake)
+    manager.chat(MODEL, MESSAGES)
+    # A client sending a different context size restarts the runner, as Ollama does
+    manager.runner_options["num_ctx"] = 8192
+    manager.chat(MODEL, MESSAGES)
+    assert fake.loads == 2
+    assert counts(manager) == (2, 0)
+
+
+def test_pinger_keeps_model_resident(fake):
+    manager = make_manager(fake, keep_alive="1s", ping_interval=0.2)
+    manager.start()
+    try:
+        # Well past keep_alive: only the pings keep the model loaded
+        time.sleep(LOAD_DELAY + 1.5)
+        manager.chat(MODEL, MESSAGES)
+    finally:
+        manager.stop()
+    assert counts(manager) == (0, 1)
+    assert fake.loads == 1
+
+
+def test_without_pinger_model_expires(fake):
+    manager = make_manager(fake, keep_alive="1s")
+    manager.chat(MODEL, MESSAGES)
+    time.sleep(1.2)
+    manager.chat(MODEL, MESSAGES)
+    assert counts(manager) == (2, 0)
+
+
+def test_manager_started_at_startup_loads_before_first_request(fake, monkeypatch):
+    monkeypatch.setenv("OLLAMA_HOST", fake.host)
+    monkeypatch.setattr(ollama_manager, "_manager", None)
+    manager = ollama_manager.get_manager()
+    try:
+        deadline = time.monotonic() + 5
+        # The pinger's first warm() runs right away; wait until it has loaded the model
+        while MODEL not in fake._runners and time.monotonic() < deadline:
+            time.sleep(0.01)
+        manager.chat(MODEL, MESSAGES)
+        assert fake.loads == 1
+        assert counts(manager) == (0, 1)
+    finally:
+        manager.stop()
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+import pipeline
+from fake_ollama import CANNED_QUIZ
+from scheduler import AdmissionRejected
+
+
+@pytest.fixture
+def generate(monkeypatch):
+    """generate_and_parse that rejects the tenant "noisy" (after a moment, so others can join its flight)"""
+    calls = []
+
+    def fake(model_choice, prompt, settings, tenant="anonymous", on_text=None):
+        calls.append(tenant)
+        time.sleep(0.2)
+        if tenant == "noisy":
+            raise AdmissionRejected("Rate limit reached for interactive requests", 3.0, tenant)
+        return CANNED_QUIZ, {"Basic Concepts": [{"question": "Q"}]}, None
+
+    monkeypatch.setattr(pipeline, "generate_and_parse", fake)
+    return calls
+
+
+def run_in_thread(tenant, results):
+    def run():
+        try:
+            results[tenant] = pipeline.generate_quiz("Shared topic", tenant=tenant, use_cache=False)
+        except AdmissionRejected as e:
+            results[tenant] = e
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_rejection_is_not_shared_with_other_tenants(generate):
+    results = {}
+    noisy = run_in_thread("noisy", results)
+    time.sleep(0.05)
+    polite = run_in_thread("polite", results)
+    noisy.join()
+    polite.join()
+    assert isinstance(results["noisy"], AdmissionRejected)
+    assert results["polite"]["mcqs"] is not None
+    assert generate == ["noisy", "polite"]
+
+
+def test_same_tenant_shares_its_rejection(generate):
+    results = {}
+    first = run_in_thread("noisy", results)
+    time.sleep(0.05)
+    results_second = {}
+    second = run_in_thread("noisy", results_second)
+    first.join()
+    second.join()
+    assert isinstance(results["noisy"], AdmissionRejected)
+    assert isinstance(results_second["noisy"], AdmissionRejected)
+    assert generate == ["noisy"]
@@ -0,0 +1,60 @@
+import contextvars
+import threading
+
+import pytest
+
+import profiling
+from fake_ollama import CANNED_QUIZ
+from mcq_parser import extract_mcqs
+from profiling import ProfileSession, profiled
+
+
+@profiled("work")
+def work():
+    return sum(range(1000))
+
+
+@profiled("outer")
+def outer():
+    # Hooked work in another thread, in the caller's context as the coalescing pool and the scheduler run it
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+    thread.start()
+    thread.join()
+    return work()
+
+
+def test_threads_in_one_session_are_timed_and_profiled(tmp_path):
+    with ProfileSession("threads", "cprofile", str(tmp_path)) as session:
+        outer()
+    timings = {name: calls for name, calls, *_ in session.summary()}
+    assert timings == {"outer": 1, "work": 2}
+    assert any(path.endswith(".prof") for path in session.files)
+    assert "Stack profile incomplete" not in session.summary_table()
+
+
+def test_profiler_that_cannot_start_leaves_timings(tmp_path, monkeypatch):
+    class Busy:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", Busy)
+    with ProfileSession("busy", "cprofile", str(tmp_path)) as session:
+        outer()
+    timings = {name: calls for name, calls, *_ in session.summary()}
+    assert timings == {"outer": 1, "work": 2}
+    assert not any(path.endswith(".prof") for path in session.files)
+    assert "Stack profile incomplete: Another profiling tool is already active" in session.summary_table()
+
+
+@pytest.mark.parametrize("allowed", [False, True])
+def test_query_opt_in_needs_allow_param(monkeypatch, allowed):
+    monkeypatch.setattr(profiling, "ENV_MODE", None)
+    monkeypatch.setattr(profiling, "ALLOW_OPT_IN", allowed)
+    assert isinstance(profiling.request("GET /", "1"), ProfileSession) is allowed
+
+
+def test_parser_is_hooked(tmp_path):
+    with ProfileSession("parse", "cprofile", str(tmp_path)) as session:
+        mcqs, _ = extract_mcqs(CANNED_QUIZ)
+    assert sum(map(len, mcqs.values())) == 3
+    assert [name for name, *_ in session.summary()] == ["extract_mcqs"]
@@ -0,0 +1,74 @@
+import pytest
+
+from fake_ollama import CANNED_QUIZ
+from repair import find_slots, salvage_quiz
+from run_suite import load_recordings
+from scheduler import AdmissionRejected
+
+RECORDINGS = load_recordings()
+
+FIXED_QUESTION = """Q1: Which statement about Python descriptors is accurate?
+a) They only work on instances
+b) They customise attribute access on the owning class [CORRECT]
+c) They replace metaclasses
+d) They are a Python 2 feature
+Explanation: Objects defining __get__/__set__ on a class control how its attributes are looked up and set."""
+
+
+def fixed(prompt, system):
+    return FIXED_QUESTION
+
+
+def rejecting(prompt, system):
+    raise AdmissionRejected("rate limited", retry_after=2.0)
+
+
+def test_failed_repairs_keep_the_salvaged_quiz():
+    # Cut off in Current Trends, which still has a complete question
+    mcqs, report = salvage_quiz(RECORDINGS["adv_truncated"], rejecting, "Python OOP", count=3)
+    assert [len(questions) for questions in mcqs.values()] == [3, 3, 1]
+    assert (report.kept, report.repaired, report.failed) == (7, 0, 2)
+
+
+def test_repair_error_is_raised_when_no_quiz_is_left():
+    with pytest.raises(AdmissionRejected):
+        salvage_quiz(RECORDINGS["adv_missing_section"], rejecting, "Python OOP", count=3)
+
+
+def test_one_broken_slot_is_repaired():
+    mcqs, report = salvage_quiz(RECORDINGS["adv_missing_correct"], fixed, "Python OOP", count=3)
+    assert (report.kept, report.repaired, report.calls) == (8, 1, 1)
+    assert report.estimated_tokens < report.full_tokens
+    assert sum(map(len, mcqs.values())) == 9
+
+
+def test_mostly_missing_quiz_is_left_to_a_full_regeneration():
+    calls = []
+    one_question = CANNED_QUIZ.split("### Advanced Concepts")[0]
+    mcqs, report = salvage_quiz(one_question, lambda prompt, system: calls.append(prompt), "Python OOP", count=10)
+    assert mcqs is None and not calls
+    assert (report.kept, report.failed) == (1, 29)
+    assert report.estimated_tokens >= report.full_tokens
+
+
+def test_fills_in_one_section_do_not_repeat_a_question():
+    # A model that keeps answering with the same question fills only one slot per section
+    mcqs, report = salvage_quiz(RECORDINGS["adv_missing_section"], fixed, "Python OOP", count=3)
+    assert mcqs is not None
+    for questions in mcqs.values():
+        texts = [q['question'] for q in questions]
+        assert len(texts) == len(set(texts))
+    assert [len(questions) for questions in mcqs.values()] == [3, 3, 1]
+    assert (report.repaired, report.failed) == (1, 2)
+
+
+def test_question_with_two_correct_markers_is_a_broken_slot():
+    # Q1 of Current Trends marks both "PEP 8" and "PEP 634" correct
+    text = RECORDINGS["adv_two_correct"]
+    slots = find_slots(text, 3)
+    broken = [slot for section_slots in slots.values() for slot in section_slots if not slot.ok]
+    assert [(slot.section, slot.position, slot.problem) for slot in broken] == [
+        ("Current Trends", 0, "Invalid question: 2 options marked correct, expected exactly one")]
+    mcqs, report = salvage_quiz(text, fixed, "Python OOP", count=3)
+    assert (report.kept, report.repaired) == (8, 1)
+    assert "PEP 634" not in [option for q in mcqs["Current Trends"] for option in q['options']]
@@ -0,0 +1,56 @@
+import pytest
+
+from semantic_cache import SemanticCache, embed, normalize_topic
+
+SETTINGS = {"model": "llama3:instruct", "difficulty": "Beginner", "count": 3}
+
+# Long topics that differ in the one word that decides what the quiz is about
+NEAR_MISSES = [
+    ("Object oriented design patterns in Java", "Object oriented design patterns in Python"),
+    ("French Revolution causes", "Russian Revolution causes"),
+    ("Relational database design in SQL", "Relational database design in NoSQL"),
+    ("World War 1", "World War 2"),
+    ("Operating Systems", "OS scheduling"),
+]
+
+SAME_TOPIC = [
+    ("Python OOP", "object oriented programming in python"),
+    ("causes of the French Revolution", "French Revolution causes"),
+    ("Database Design", "designing databases"),
+    ("SQL indexes", "SQL indexing"),
+    ("WW2", "World War 2"),
+]
+
+
+def similarity(topic, other):
+    return float(embed(normalize_topic(topic)) @ embed(normalize_topic(other)))
+
+
+@pytest.mark.parametrize("topic, cached_topic", NEAR_MISSES)
+def test_near_miss_is_not_served(topic, cached_topic):
+    cache = SemanticCache(threshold=0.6)
+    cache.store(cached_topic, SETTINGS, {"quiz": cached_topic})
+    assert cache.lookup(topic, SETTINGS) is None
+
+
+def test_near_misses_score_above_the_threshold():
+    # The embedding alone can't separate these; the term check has to
+    assert max(similarity(*pair) for pair in NEAR_MISSES) > 0.8
+
+
+@pytest.mark.parametrize("topic, cached_topic", SAME_TOPIC)
+def test_rewording_is_served(topic, cached_topic):
+    cache = SemanticCache(threshold=0.6)
+    cache.store(cached_topic, SETTINGS, {"quiz": cached_topic})
+    value, _, served = cache.lookup(topic, SETTINGS)
+    assert served == cached_topic and value == {"quiz": cached_topic}
+
+
+def test_skips_a_nearer_topic_with_other_terms():
+    cache = SemanticCache(threshold=0.6)
+    cache.store("relational databases in SQL", SETTINGS, {"quiz": "databases"})
+    cache.store("Relational database design in SQL", SETTINGS, {"quiz": "design"})
+    query = "designing relational databases in SQL"
+    assert similarity(query, "relational databases in SQL") > similarity(query, "Relational database design in SQL")
+    value, _, _ = cache.lookup(query, SETTINGS)
+    assert value == {"quiz": "design"}
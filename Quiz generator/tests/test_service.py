@@ -0,0 +1,39 @@
+import sys
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+import service
+
+
+@pytest.fixture
+def domain_calls(monkeypatch):
+    calls = []
+
+    def generate_response(model_name, prompt, **options):
+        calls.append(options)
+        return "summary"
+
+    fake = types.SimpleNamespace(MODEL_HANDLERS={"Legal-BERT": None}, generate_response=generate_response)
+    monkeypatch.setitem(sys.modules, "model_utils", fake)
+    return calls
+
+
+def test_domain_passes_only_the_options_set(domain_calls):
+    client = TestClient(service.app)
+    response = client.post("/v1/domain/generate", json={"model": "Legal-BERT", "prompt": "Contract text",
+                                                        "options": {"max_new_tokens": 64}})
+    assert response.json() == {"model": "Legal-BERT", "text": "summary"}
+    client.post("/v1/domain/generate", json={"model": "Legal-BERT", "prompt": "Contract text"})
+    assert domain_calls == [{"max_new_tokens": 64}, {}]
+
+
+@pytest.mark.parametrize("options", [{"streamer": "x"}, {"max_new_tokens": 10 ** 6}, {"batch_size": 0},
+                                     {"constrained": "sometimes"}])
+def test_domain_rejects_unknown_or_out_of_range_options(domain_calls, options):
+    client = TestClient(service.app)
+    response = client.post("/v1/domain/generate", json={"model": "Legal-BERT", "prompt": "Contract text",
+                                                        "options": options})
+    assert response.status_code == 422
+    assert domain_calls == []
@@ -0,0 +1,78 @@
+"""Valid-first-try rate and effective questions/sec: constrained vs. unconstrained MCQ sampling.
+
+    python benchmarks/bench_constrained.py --model DeepSeek-R1 --trials 10 --questions-per-section 1
+    python benchmarks/bench_constrained.py --checkpoint /path/to/local/gpt2 --json
+
+A generation counts as valid on the first try when the quiz parser finds every
+section filled with the requested number of questions; effective questions/sec
+only counts questions from valid quizzes, since anything else means a full
+regeneration.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Quiz generator"))
+
+import torch
+
+import model_utils
+from mcq_parser import extract_mcqs
+
+
+TOPICS = ["Python OOP", "Database normalization", "Computer networks", "Cell biology", "Contract law"]
+
+
+def run(model_name, constrained, trials, questions_per_section):
+    valid, questions, elapsed = 0, 0, 0.0
+    for n in range(trials):
+        torch.manual_seed(n)
+        start = time.perf_counter()
+        text = model_utils.generate_mcqs(model_name, TOPICS[n % len(TOPICS)],
+                                         questions_per_section=questions_per_section, constrained=constrained)
+        elapsed += time.perf_counter() - start
+        mcqs, _ = extract_mcqs(text)
+        if all(len(qs) == questions_per_section for qs in mcqs.values()):
+            valid += 1
+            questions += sum(len(qs) for qs in mcqs.values())
+    return {
+        "mode": "constrained" if constrained else "unconstrained",
+        "trials": trials,
+        "valid_first_try_rate": valid / trials,
+        "seconds_per_attempt": elapsed / trials,
+        "effective_questions_per_sec": questions / elapsed if elapsed else 0.0,
+        # Expected cost of one usable quiz when invalid output forces a retry
+        "expected_seconds_per_valid_quiz": (elapsed / valid) if valid else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="DeepSeek-R1", choices=["DeepSeek-R1", "BioGPT"])
+    parser.add_argument("--checkpoint", help="local checkpoint directory to use instead of the Hub")
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--questions-per-section", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.checkpoint:
+        model_utils.CHECKPOINTS[args.model] = ("causal", args.checkpoint)
+    model_utils.load_model(args.model)  # keep load time out of the measurements
+
+    rows = [run(args.model, constrained, args.trials, args.questions_per_section) for constrained in (False, True)]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for r in rows:
+        per_quiz = r["expected_seconds_per_valid_quiz"]
+        print(f"{r['mode']:>13}: valid first try {r['valid_first_try_rate']:.0%}, "
+              f"{r['seconds_per_attempt']:.2f}s/attempt, {r['effective_questions_per_sec']:.2f} valid q/s, "
+              f"{'n/a' if per_quiz is None else f'{per_quiz:.2f}s'} per valid quiz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Throughput and quality of the model_utils domain models across batch size, threads, dtype and engine.
+
+    python benchmarks/bench_domain_models.py --tiny --output results.json
+    python benchmarks/bench_domain_models.py --models BioGPT --batch-sizes 1 4 8 --threads 1 4 \\
+        --dtypes float32 bfloat16 --max-new-tokens 64 --compare results.json
+
+Every configuration runs in its own process, so load time and peak RSS are
+not skewed by models loaded earlier. The fixed prompt set for each model
+(benchmarks/data/domain_prompts.json) is sent through generate_response
+--batch-size prompts at a time, --runs times over. Per configuration:
+
+  load_s            load_model, tokenizer and weights (and the ONNX export on a cold ONNX_CACHE_DIR)
+  ttft_ms           median time from the call to the first generated token
+  tokens_per_sec    generated tokens (every row of the batch) over total call time
+  peak_rss_mb       peak resident memory of the process
+  perplexity        on the model's held-out text (benchmarks/data/heldout_*.txt),
+                    sliding --ppl-window tokens at half-window stride. Seq2seq
+                    models are scored on the second half of each window given
+                    the first half as encoder input, so their numbers only
+                    compare with other seq2seq runs.
+
+--threads sets torch.set_num_threads (and OMP_NUM_THREADS); ONNX Runtime sizes
+its own thread pool. --tiny swaps every checkpoint for a tiny random one
+(benchmarks/tiny_checkpoints.py) so the harness runs without network access.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "benchmarks", "data")
+
+HELDOUT = {
+    "DeepSeek-R1": "heldout_general.txt",
+    "BioGPT": "heldout_biomedical.txt",
+    "Legal-BERT": "heldout_legal.txt",
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _streamer_class():
+    from transformers.generation.streamers import BaseStreamer
+
+    class StepTimer(BaseStreamer):
+        """Timestamps for each generate step; the first put() is the prompt (or decoder start), not a new token"""
+
+        def __init__(self):
+            self.times = []
+
+        def put(self, value):
+            self.times.append(time.perf_counter())
+
+        def end(self):
+            pass
+
+        @property
+        def steps(self):
+            return max(len(self.times) - 1, 0)
+
+    return StepTimer
+
+
+def perplexity(model_utils, model_name, text, window):
+    import torch
+
+    tokenizer, model = model_utils.load_model(model_name)
+    architecture = model_utils.CHECKPOINTS[model_name][0]
+    ids = tokenizer(text, return_tensors="pt", return_token_type_ids=False)["input_ids"][0].to(model.device)
+    nll, count = 0.0, 0
+    with torch.no_grad():
+        if architecture == "causal":
+            scored_to = 0
+            for start in range(0, len(ids) - 1, window // 2):
+                chunk = ids[start:start + window][None]
+                logits = model(input_ids=chunk, attention_mask=torch.ones_like(chunk)).logits.float()
+                # Score only tokens no earlier window has scored, each with as much context as fits
+                first = max(scored_to - start, 0)
+                targets = chunk[0, first + 1:]
+                losses = torch.nn.functional.cross_entropy(logits[0, first:-1], targets, reduction="sum")
+                nll, count = nll + losses.item(), count + len(targets)
+                scored_to = start + chunk.shape[1] - 1
+                if start + window >= len(ids):
+                    break
+        else:
+            half = window // 2
+            start_id = model.config.decoder_start_token_id
+            for start in range(0, len(ids) - half, window):
+                source, labels = ids[start:start + half][None], ids[start + half:start + window][None]
+                decoder_input_ids = torch.cat([torch.full_like(labels[:, :1], start_id), labels[:, :-1]], dim=1)
+                logits = model(input_ids=source, attention_mask=torch.ones_like(source),
+                               decoder_input_ids=decoder_input_ids).logits.float()
+                nll += torch.nn.functional.cross_entropy(logits[0], labels[0], reduction="sum").item()
+                count += labels.shape[1]
+    return math.exp(nll / count) if count else None
+
+
+def worker(config):
+    """Run one configuration in this process and return its result row"""
+    import torch
+
+    torch.set_num_threads(config["threads"])
+    sys.path.insert(0, ROOT)
+    import model_utils
+
+    for name, (architecture, checkpoint) in model_utils.CHECKPOINTS.items():
+        model_utils.CHECKPOINTS[name] = (architecture, config["checkpoints"].get(architecture, checkpoint))
+    model_name, batch_size = config["model"], config["batch_size"]
+    model_utils.set_engine(model_name, config["engine"])
+    model_utils.DTYPE = config["dtype"]
+
+    start = time.perf_counter()
+    model_utils.load_model(model_name)
+    load = time.perf_counter() - start
+
+    with open(config["prompts"]) as f:
+        prompts = json.load(f)[model_name]
+    batches = [prompts[i:i + batch_size] for i in range(0, len(prompts), batch_size)]
+    generate = lambda batch, streamer=None: model_utils.generate_response(  # noqa: E731
+        model_name, batch, max_new_tokens=config["max_new_tokens"], streamer=streamer)
+    generate(batches[0])  # warm-up
+
+    StepTimer = _streamer_class()
+    ttfts, elapsed, tokens = [], 0.0, 0
+    for run in range(config["runs"]):
+        for batch in batches:
+            torch.manual_seed(run)
+            timer = StepTimer()
+            start = time.perf_counter()
+            generate(batch, timer)
+            end = time.perf_counter()
+            if timer.steps:
+                ttfts.append(timer.times[1] - start)
+            elapsed += end - start
+            tokens += timer.steps * len(batch)
+
+    with open(os.path.join(config["data"], HELDOUT[model_name]), encoding="utf-8") as f:
+        heldout = f.read()
+    ppl = perplexity(model_utils, model_name, heldout, config["ppl_window"])
+    return {
+        "model": model_name,
+        "checkpoint": model_utils.CHECKPOINTS[model_name][1],
+        "engine": config["engine"],
+        "dtype": config["dtype"],
+        "threads": config["threads"],
+        "batch_size": batch_size,
+        "max_new_tokens": config["max_new_tokens"],
+        "load_s": round(load, 3),
+        "ttft_ms": round(statistics.median(ttfts) * 1000, 1) if ttfts else None,
+        "tokens_per_sec": round(tokens / elapsed, 1) if elapsed else None,
+        "generated_tokens": tokens,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "perplexity": round(ppl, 3) if ppl is not None else None,
+    }
+
+
+def run_configuration(config):
+    env = dict(os.environ, OMP_NUM_THREADS=str(config["threads"]))
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(config)],
+                             capture_output=True, text=True, env=env)
+    if process.returncode != 0:
+        error = (process.stderr.strip().splitlines() or ["exit code %d" % process.returncode])[-1]
+        return {key: config[key] for key in ("model", "engine", "dtype", "threads", "batch_size")} | {"error": error}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def versions():
+    import torch
+    import transformers
+
+    found = {"torch": torch.__version__, "transformers": transformers.__version__}
+    try:
+        import onnxruntime
+        found["onnxruntime"] = onnxruntime.__version__
+    except ImportError:
+        pass
+    return found
+
+
+def config_key(row):
+    return tuple(row[key] for key in ("model", "engine", "dtype", "threads", "batch_size"))
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {config_key(r): r for r in json.load(f)["results"]}
+    print(f"\nvs {baseline_path}:")
+    for r in current["results"]:
+        old = baseline.get(config_key(r))
+        if not old or "error" in r or "error" in old:
+            continue
+        delta = 100 * (r["tokens_per_sec"] / old["tokens_per_sec"] - 1) if old["tokens_per_sec"] else 0
+        print(f"  {' '.join(map(str, config_key(r))):<44} {old['tokens_per_sec']:>8} -> {r['tokens_per_sec']:>8} tok/s "
+              f"({delta:+.1f}%)  ppl {old['perplexity']} -> {r['perplexity']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=list(HELDOUT))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count() or 1])
+    parser.add_argument("--dtypes", nargs="+", default=["float32"], help="float32, bfloat16 or float16")
+    parser.add_argument("--engines", nargs="+", default=["torch"], help="torch and/or onnx")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--runs", type=int, default=2, help="passes over the prompt set")
+    parser.add_argument("--ppl-window", type=int, default=256, help="tokens per perplexity window")
+    parser.add_argument("--data", default=DATA, help="directory with domain_prompts.json and heldout_*.txt")
+    parser.add_argument("--checkpoint", action="append", default=[], metavar="ARCHITECTURE=PATH",
+                        help="run every model of that architecture from a local checkpoint")
+    parser.add_argument("--tiny", action="store_true", help="use tiny random checkpoints (no network needed)")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(json.loads(args.worker))))
+        return
+
+    checkpoints = dict(item.split("=", 1) for item in args.checkpoint)
+    if args.tiny:
+        import tiny_checkpoints
+        checkpoints = {**tiny_checkpoints.build(), **checkpoints}
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "versions": versions(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "args": {key: value for key, value in vars(args).items() if key != "worker"},
+            "checkpoints": checkpoints,
+        },
+        "results": [],
+    }
+    print(f"  {'model':<12}{'engine':<7}{'dtype':<9}{'thr':>4}{'batch':>6}{'load s':>8}{'ttft ms':>9}"
+          f"{'tok/s':>9}{'rss MB':>9}{'ppl':>10}")
+    for model_name, engine, dtype, threads, batch_size in itertools.product(
+            args.models, args.engines, args.dtypes, args.threads, args.batch_sizes):
+        if engine == "onnx" and dtype != "float32":
+            continue  # the ONNX export is float32 only
+        row = run_configuration({
+            "model": model_name, "engine": engine, "dtype": dtype, "threads": threads, "batch_size": batch_size,
+            "max_new_tokens": args.max_new_tokens, "runs": args.runs, "ppl_window": args.ppl_window,
+            "checkpoints": checkpoints, "data": args.data,
+            "prompts": os.path.join(args.data, "domain_prompts.json"),
+        })
+        results["results"].append(row)
+        if "error" in row:
+            print(f"  {model_name:<12}{engine:<7}{dtype:<9}{threads:>4}{batch_size:>6}  failed: {row['error']}")
+            continue
+        print(f"  {model_name:<12}{engine:<7}{dtype:<9}{threads:>4}{batch_size:>6}{row['load_s']:>8}"
+              f"{row['ttft_ms']:>9}{row['tokens_per_sec']:>9}{row['peak_rss_mb']:>9}{row['perplexity']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Legal-BERT long-document summarization throughput against document length.
+
+    python benchmarks/bench_long_document.py --lengths 512 2048 8192 --batch-sizes 1 8
+    python benchmarks/bench_long_document.py --checkpoint /path/to/flan-t5 --engine onnx --json
+
+Each document is a synthetic contract of about the given number of tokens.
+"cold" runs start from an empty encoder cache; "warm" re-submits the same
+document, so its first-round chunks skip the encoder (later rounds summarize
+sampled text and differ from run to run). Throughput is input tokens/sec.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import torch
+
+import long_document
+import model_utils
+
+CLAUSES = [
+    "The Supplier shall deliver the Goods to the Delivery Address within thirty (30) days of the Purchase Order.",
+    "Risk in the Goods passes to the Buyer on delivery; title passes only on payment in full.",
+    "The Buyer shall pay each undisputed invoice within forty-five (45) days of receipt.",
+    "Either party may terminate this Agreement on ninety (90) days' written notice to the other party.",
+    "Neither party's liability under this Agreement shall exceed the total fees paid in the preceding twelve months.",
+    "Each party shall keep the other's Confidential Information secret and use it only to perform this Agreement.",
+    "This Agreement is governed by the laws of England and Wales, whose courts have exclusive jurisdiction.",
+    "Neither party is liable for delay caused by events beyond its reasonable control, including strikes and floods.",
+]
+
+
+def make_document(tokenizer, tokens):
+    sentences, n = [], 0
+    while True:
+        sentence = f"{len(sentences) + 1}. {CLAUSES[len(sentences) % len(CLAUSES)]}"
+        n += len(tokenizer.encode(sentence, add_special_tokens=False))
+        if n > tokens:
+            return " ".join(sentences) or sentence
+        sentences.append(sentence)
+
+
+def timed(document, batch_size):
+    torch.manual_seed(0)
+    start = time.perf_counter()
+    model_utils.generate_response("Legal-BERT", document, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[256, 512, 1024, 2048, 4096, 8192])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--checkpoint", help="local FLAN-T5 checkpoint instead of google/flan-t5-base")
+    parser.add_argument("--engine", choices=model_utils.ENGINES, default="torch")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.checkpoint:
+        model_utils.CHECKPOINTS["Legal-BERT"] = ("seq2seq", args.checkpoint)
+    model_utils.set_engine("Legal-BERT", args.engine)
+    tokenizer, _ = model_utils.load_model("Legal-BERT")
+    timed("A warm-up clause.", 1)
+
+    # First-round chunks: the window minus the prompt prefix and end-of-sequence token
+    room = model_utils.LEGAL_WINDOW - len(tokenizer.encode("summarize: ", add_special_tokens=False)) - 1
+    rows = []
+    for length in args.lengths:
+        document = make_document(tokenizer, length)
+        tokens = len(tokenizer.encode(document, add_special_tokens=False, verbose=False))
+        for batch_size in args.batch_sizes:
+            long_document.encoder_cache.clear()
+            cold = timed(document, batch_size)
+            warm = timed(document, batch_size)
+            rows.append({
+                "tokens": tokens,
+                "chunks": len(long_document.chunk_ids(list(range(tokens)), room, 64)),
+                "batch_size": batch_size,
+                "cold_s": round(cold, 2),
+                "warm_s": round(warm, 2),
+                "cold_tokens_per_sec": round(tokens / cold, 1),
+                "warm_tokens_per_sec": round(tokens / warm, 1),
+            })
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'tokens':>7} {'chunks':>6} {'batch':>5} {'cold s':>8} {'warm s':>8} {'cold tok/s':>11} {'warm tok/s':>11}")
+    for r in rows:
+        print(f"{r['tokens']:>7} {r['chunks']:>6} {r['batch_size']:>5} {r['cold_s']:>8} {r['warm_s']:>8} "
+              f"{r['cold_tokens_per_sec']:>11} {r['warm_tokens_per_sec']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Parity and speed of the ONNX Runtime engine against eager PyTorch for the domain models.
+
+    python benchmarks/bench_onnx.py --models DeepSeek-R1 Legal-BERT --new-tokens 64 --runs 5
+    python benchmarks/bench_onnx.py --checkpoint causal=/path/to/gpt2 --checkpoint seq2seq=/path/to/t5 --json
+
+Parity: the max absolute logit difference on one forward pass over the prompt,
+and whether greedy decoding of --new-tokens tokens picks the same tokens on
+both engines. Speed: load time (the first ONNX load includes the export, later
+ones read ONNX_CACHE_DIR), resident memory added by the load, and greedy
+generation latency and tokens/sec with the output length pinned so both
+engines do the same work.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import torch
+
+import model_utils
+
+PROMPT = model_utils.MCQ_PROMPT.format(topic="Contract law")
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def encode(model_name, tokenizer, model):
+    architecture = model_utils.CHECKPOINTS[model_name][0]
+    prompt = PROMPT if architecture == "causal" else "summarize: " + PROMPT
+    inputs = tokenizer(prompt, return_tensors="pt", return_token_type_ids=False).to(model.device)
+    return architecture, inputs
+
+
+@torch.no_grad()
+def logits(model_name, tokenizer, model):
+    architecture, inputs = encode(model_name, tokenizer, model)
+    if architecture == "causal":
+        return model(**inputs).logits.float().cpu()
+    start = torch.full((1, 1), model.config.decoder_start_token_id, dtype=torch.long, device=model.device)
+    return model(**inputs, decoder_input_ids=start).logits.float().cpu()
+
+
+@torch.no_grad()
+def greedy(model_name, tokenizer, model, new_tokens):
+    architecture, inputs = encode(model_name, tokenizer, model)
+    output = model.generate(**inputs, do_sample=False, max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id)
+    return output[0, inputs["input_ids"].shape[1]:] if architecture == "causal" else output[0]
+
+
+def run_engine(model_name, engine, new_tokens, runs):
+    model_utils._load.cache_clear()
+    before = rss_mb()
+    start = time.perf_counter()
+    tokenizer, model = model_utils.load_model(model_name, engine)
+    load = time.perf_counter() - start
+    added = rss_mb() - before
+    greedy(model_name, tokenizer, model, new_tokens)  # warm-up
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        tokens = greedy(model_name, tokenizer, model, new_tokens)
+        latencies.append(time.perf_counter() - start)
+    latency = statistics.median(latencies)
+    result = {
+        "model": model_name,
+        "engine": engine,
+        "load_s": round(load, 2),
+        "rss_added_mb": round(added, 1),
+        "latency_ms": round(latency * 1000, 1),
+        "tokens_per_sec": round(len(tokens) / latency, 1),
+    }
+    return result, logits(model_name, tokenizer, model), tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=["DeepSeek-R1", "Legal-BERT"])
+    parser.add_argument("--checkpoint", action="append", default=[], metavar="ARCHITECTURE=PATH",
+                        help="run every model of that architecture from a local checkpoint")
+    parser.add_argument("--new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    overrides = dict(item.split("=", 1) for item in args.checkpoint)
+    for name, (architecture, checkpoint) in model_utils.CHECKPOINTS.items():
+        model_utils.CHECKPOINTS[name] = (architecture, overrides.get(architecture, checkpoint))
+
+    rows = []
+    for model_name in args.models:
+        torch_row, torch_logits, torch_tokens = run_engine(model_name, "torch", args.new_tokens, args.runs)
+        onnx_row, onnx_logits, onnx_tokens = run_engine(model_name, "onnx", args.new_tokens, args.runs)
+        onnx_row["max_logit_diff"] = round((torch_logits - onnx_logits).abs().max().item(), 6)
+        onnx_row["greedy_tokens_match"] = torch.equal(torch_tokens.cpu(), onnx_tokens.cpu())
+        onnx_row["speedup"] = round(torch_row["latency_ms"] / onnx_row["latency_ms"], 2)
+        rows += [torch_row, onnx_row]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for r in rows:
+        line = (f"{r['model']:<12} {r['engine']:<6} load {r['load_s']:>6}s  +{r['rss_added_mb']:>7}MB  "
+                f"{r['latency_ms']:>8}ms  {r['tokens_per_sec']:>7} tok/s")
+        if r["engine"] == "onnx":
+            line += (f"  x{r['speedup']}  max |dlogit| {r['max_logit_diff']}  "
+                     f"greedy match {r['greedy_tokens_match']}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
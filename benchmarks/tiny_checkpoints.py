@@ -0,0 +1,66 @@
+"""Tiny randomly initialized GPT-2 and T5 checkpoints for running the benchmarks offline.
+
+    python benchmarks/tiny_checkpoints.py [--directory DIR]
+
+The tokenizer is a small byte-level BPE trained on the local benchmark data,
+so the checkpoints load through AutoTokenizer/AutoModel* (and export to ONNX)
+exactly like the real ones. Their outputs are noise: use them to check that a
+harness runs and to compare engines, dtypes and batch sizes, not quality.
+"""
+import argparse
+import glob
+import os
+import tempfile
+
+import torch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "tiny-domain-checkpoints")
+EOS = "<|endoftext|>"
+
+
+def _train_tokenizer():
+    from tokenizers import ByteLevelBPETokenizer
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(HERE, "data", "*"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator(texts, vocab_size=1000, min_frequency=1, special_tokens=[EOS])
+    return bpe
+
+
+def build(directory=DEFAULT_DIRECTORY):
+    """{"causal": path, "seq2seq": path}, built into `directory` on first use"""
+    from transformers import (GPT2Config, GPT2LMHeadModel, GPT2TokenizerFast, PreTrainedTokenizerFast, T5Config,
+                              T5ForConditionalGeneration)
+
+    paths = {"causal": os.path.join(directory, "gpt2"), "seq2seq": os.path.join(directory, "t5")}
+    if all(os.path.isfile(os.path.join(path, "config.json")) for path in paths.values()):
+        return paths
+    torch.manual_seed(0)
+    os.makedirs(directory, exist_ok=True)
+    tokenizer_file = os.path.join(directory, "tokenizer.json")
+    _train_tokenizer().save(tokenizer_file)
+
+    tokenizer = GPT2TokenizerFast(tokenizer_file=tokenizer_file, eos_token=EOS, bos_token=EOS, unk_token=EOS)
+    config = GPT2Config(vocab_size=len(tokenizer), n_layer=2, n_embd=64, n_head=2, n_positions=1024,
+                        bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id)
+    tokenizer.save_pretrained(paths["causal"])
+    GPT2LMHeadModel(config).save_pretrained(paths["causal"])
+
+    tokenizer = PreTrainedTokenizerFast(tokenizer_file=tokenizer_file, eos_token=EOS, pad_token=EOS, unk_token=EOS)
+    config = T5Config(vocab_size=len(tokenizer), d_model=64, d_kv=16, d_ff=128, num_layers=2, num_heads=4,
+                      eos_token_id=tokenizer.eos_token_id, pad_token_id=tokenizer.pad_token_id,
+                      decoder_start_token_id=tokenizer.pad_token_id)
+    tokenizer.save_pretrained(paths["seq2seq"])
+    T5ForConditionalGeneration(config).save_pretrained(paths["seq2seq"])
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    for architecture, path in build(parser.parse_args().directory).items():
+        print(f"{architecture:<8} {path}")
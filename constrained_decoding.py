@@ -0,0 +1,193 @@
+import torch
+from transformers.generation.logits_process import LogitsProcessor
+
+
+SECTIONS = ["Basic Concepts", "Advanced Concepts", "Current Trends"]
+MARKER = " [CORRECT]"
+
+# Characters that would let free text break the layout the quiz parser expects
+_LAYOUT_CHARS = ("\n", "\r", "[", "]", "#", "`")
+# Words the parser treats as a correct-answer marker anywhere on an option line
+_MARKER_WORDS = ("correct", "right", "answer")
+
+_vocab_cache = {}
+
+
+def _vocab_masks(tokenizer, vocab_size):
+    """Per-token boolean masks: banned in any free span, banned in option spans, blank"""
+    key = (id(tokenizer), vocab_size)
+    if key not in _vocab_cache:
+        banned = torch.ones(vocab_size, dtype=torch.bool)
+        option_banned = torch.ones(vocab_size, dtype=torch.bool)
+        blank = torch.ones(vocab_size, dtype=torch.bool)
+        special = set(tokenizer.all_special_ids)
+        for token_id in range(min(vocab_size, len(tokenizer))):
+            if token_id in special:
+                continue
+            text = tokenizer.decode([token_id])
+            bad = any(c in text for c in _LAYOUT_CHARS) or "�" in text or any(ord(c) < 32 for c in text)
+            banned[token_id] = bad
+            option_banned[token_id] = bad or any(w in text.lower() for w in _MARKER_WORDS)
+            blank[token_id] = not text.strip()
+        _vocab_cache[key] = (banned, option_banned, blank)
+    return _vocab_cache[key]
+
+
+class MCQLayout:
+    """Token-level state machine for the "### Section / Q1: / a) ... / Explanation:" layout.
+
+    Structural text is forced token by token; question, option and explanation
+    text is free but confined to one line. Every question gets exactly four
+    options and exactly one " [CORRECT]" marker: each option may end with the
+    marker until one has used it, and the last option must use it if none has.
+    """
+
+    def __init__(self, tokenizer, questions_per_section=1, sections=SECTIONS,
+                 min_span_tokens=2, max_span_tokens=40):
+        encode = lambda text: tokenizer.encode(text, add_special_tokens=False)
+        self.newline = encode("\n")
+        if len(self.newline) != 1 or tokenizer.decode(self.newline) != "\n":
+            raise ValueError("Constrained MCQ decoding needs a tokenizer with a newline token")
+        self.newline = self.newline[0]
+        self.marker = encode(MARKER)
+        self.eos = tokenizer.eos_token_id
+        self.min_span = min_span_tokens
+        self.max_span = max_span_tokens
+
+        # Program: ("force", ids) | ("free", kind), kind in line / option / last_option
+        self.steps = []
+        self.question_starts = set()
+        for section in sections:
+            self.steps.append(("force", encode(f"### {section}\n")))
+            for i in range(1, questions_per_section + 1):
+                self.question_starts.add(len(self.steps))
+                self.steps += [("force", encode(f"Q{i}:")), ("free", "line")]
+                for letter in "abc":
+                    self.steps += [("force", encode(f"{letter})")), ("free", "option")]
+                self.steps += [("force", encode("d)")), ("free", "last_option")]
+                self.steps += [("force", encode("Explanation:")), ("free", "line")]
+        self.reset()
+
+    def reset(self):
+        self.step = 0
+        self.offset = 0          # position inside a forced step
+        self.span = 0            # tokens generated in the current free span
+        self.pending = []        # forced tail after the model picked the marker
+        self.marker_used = False
+
+    @property
+    def done(self):
+        return self.step >= len(self.steps) and not self.pending
+
+    def max_tokens(self):
+        """Upper bound on generated tokens for the whole layout (plus EOS)"""
+        total = 1
+        for kind, value in self.steps:
+            total += len(value) if kind == "force" else self.max_span + len(self.marker) + 1
+        return total
+
+    def _enter(self, step):
+        self.step, self.offset, self.span = step, 0, 0
+        if step in self.question_starts:
+            self.marker_used = False
+
+    def terminators(self, kind):
+        """Tokens that may end the current free span"""
+        if kind == "line":
+            return [self.newline]
+        if self.marker_used:
+            return [self.newline]
+        if kind == "last_option":
+            return [self.marker[0]]
+        return [self.newline, self.marker[0]]
+
+    def allowed(self):
+        """("only", [ids]) or ("span", kind, terminators allowed, span length)"""
+        if self.pending:
+            return ("only", [self.pending[0]])
+        if self.step >= len(self.steps):
+            return ("only", [self.eos])
+        kind, value = self.steps[self.step]
+        if kind == "force":
+            return ("only", [value[self.offset]])
+        if self.span >= self.max_span:
+            return ("only", self.terminators(value))
+        return ("span", value, self.span >= self.min_span, self.span)
+
+    def advance(self, token_id):
+        if self.pending:
+            self.pending.pop(0)
+            if not self.pending:
+                self._enter(self.step + 1)
+            return
+        if self.step >= len(self.steps):
+            return
+        kind, value = self.steps[self.step]
+        if kind == "force":
+            self.offset += 1
+            if self.offset >= len(value):
+                self._enter(self.step + 1)
+            return
+        if token_id == self.newline and self.newline in self.terminators(value):
+            self._enter(self.step + 1)
+        elif token_id == self.marker[0] and self.marker[0] in self.terminators(value):
+            self.marker_used = True
+            self.pending = self.marker[1:] + [self.newline]
+        else:
+            self.span += 1
+
+
+class MCQLayoutProcessor(LogitsProcessor):
+    """Logits processor that keeps sampled text inside the MCQ layout.
+
+    Works with greedy decoding or sampling (one sequence per row); beam search
+    reorders rows between steps and is not supported.
+    """
+
+    def __init__(self, tokenizer, questions_per_section=1, **layout_kwargs):
+        self.tokenizer = tokenizer
+        self.questions_per_section = questions_per_section
+        self.layout_kwargs = layout_kwargs
+        self.layouts = None
+        self.prompt_length = None
+
+    def max_new_tokens(self):
+        """Token budget for a complete quiz"""
+        return MCQLayout(self.tokenizer, self.questions_per_section, **self.layout_kwargs).max_tokens()
+
+    def fit_context(self, room):
+        """Shorten free spans until a complete quiz fits in `room` new tokens"""
+        span = self.layout_kwargs.get("max_span_tokens", 40)
+        minimum = self.layout_kwargs.get("min_span_tokens", 2) + 1
+        while span > minimum and self.max_new_tokens() > room:
+            span -= 1
+            self.layout_kwargs["max_span_tokens"] = span
+        if self.max_new_tokens() > room:
+            raise ValueError(f"A {self.questions_per_section}-question-per-section quiz does not fit in {room} tokens")
+        return self.max_new_tokens()
+
+    def __call__(self, input_ids, scores):
+        batch, vocab_size = scores.shape
+        if self.layouts is None:
+            self.prompt_length = input_ids.shape[1]
+            self.layouts = [MCQLayout(self.tokenizer, self.questions_per_section, **self.layout_kwargs)
+                            for _ in range(batch)]
+        elif input_ids.shape[1] > self.prompt_length:
+            for row, layout in enumerate(self.layouts):
+                layout.advance(int(input_ids[row, -1]))
+
+        banned, option_banned, blank = (m.to(scores.device) for m in _vocab_masks(self.tokenizer, vocab_size))
+        mask = torch.ones_like(scores, dtype=torch.bool)
+        for row, layout in enumerate(self.layouts):
+            rule = layout.allowed()
+            if rule[0] == "only":
+                mask[row, [t for t in rule[1] if t is not None]] = False
+                continue
+            _, kind, can_end, span = rule
+            row_banned = option_banned if kind != "line" else banned
+            if span == 0:
+                row_banned = row_banned | blank
+            mask[row] = row_banned
+            if can_end:
+                mask[row, layout.terminators(kind)] = False
+        return scores.masked_fill(mask, float("-inf"))
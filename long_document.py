@@ -0,0 +1,136 @@
+import collections
+import hashlib
+import os
+import threading
+
+import torch
+from transformers.modeling_outputs import BaseModelOutput
+
+
+class EncoderCache:
+    """LRU of encoder outputs keyed by chunk hash, so a re-submitted document skips the encoder.
+
+    Each entry is one chunk's unpadded (length, hidden) tensor; a flan-t5-base
+    chunk of 512 tokens takes about 1.5MB.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+encoder_cache = EncoderCache(int(os.environ.get("ENCODER_CACHE_SIZE", "128")))
+
+
+def chunk_ids(ids, size, overlap):
+    """Windows of at most `size` token ids, each sharing `overlap` ids with the previous one"""
+    if len(ids) <= size:
+        return [ids]
+    step = size - overlap
+    return [ids[start:start + size] for start in range(0, len(ids) - overlap, step)]
+
+
+def _chunk_key(namespace, ids):
+    return hashlib.sha256(f"{namespace}\x00{','.join(map(str, ids))}".encode()).hexdigest()
+
+
+def _pad(rows, value, dtype, device):
+    width = max(len(row) for row in rows)
+    padded = torch.full((len(rows), width), value, dtype=dtype, device=device)
+    for i, row in enumerate(rows):
+        padded[i, :len(row)] = torch.tensor(row, dtype=dtype)
+    return padded
+
+
+@torch.no_grad()
+def encode(model, inputs, namespace, cache=encoder_cache):
+    """Encoder output per input id list; cached ones are reused, the rest are encoded in one padded batch.
+
+    `namespace` identifies the model weights (e.g. checkpoint and engine) so
+    different models never share entries.
+    """
+    keys = [_chunk_key(namespace, ids) for ids in inputs]
+    hidden = [cache.get(key) for key in keys]
+    missing = [i for i, h in enumerate(hidden) if h is None]
+    if missing:
+        rows = [inputs[i] for i in missing]
+        input_ids = _pad(rows, 0, torch.long, model.device)
+        attention_mask = _pad([[1] * len(row) for row in rows], 0, torch.long, model.device)
+        states = model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        for row, i in enumerate(missing):
+            # Right padding doesn't change the real positions' outputs, so each chunk is stored unpadded
+            hidden[i] = states[row, :len(inputs[i])].clone()
+            cache.put(keys[i], hidden[i])
+    return hidden
+
+
+@torch.no_grad()
+def generate_batch(tokenizer, model, inputs, namespace, cache=encoder_cache, **generate_options):
+    """Generate for a batch of input id lists from (cached) encoder outputs"""
+    hidden = encode(model, inputs, namespace, cache)
+    width = max(h.shape[0] for h in hidden)
+    states = torch.zeros((len(hidden), width, hidden[0].shape[1]), dtype=hidden[0].dtype, device=model.device)
+    attention_mask = torch.zeros((len(hidden), width), dtype=torch.long, device=model.device)
+    for i, h in enumerate(hidden):
+        states[i, :h.shape[0]] = h
+        attention_mask[i, :h.shape[0]] = 1
+    output = model.generate(encoder_outputs=BaseModelOutput(last_hidden_state=states), attention_mask=attention_mask,
+                            **generate_options)
+    return tokenizer.batch_decode(output, skip_special_tokens=True)
+
+
+def summarize(tokenizer, model, text, namespace, prefix="summarize: ", window=512, overlap=64, batch_size=8,
+              chunk_tokens=128, max_rounds=4, cache=encoder_cache, **generate_options):
+    """Map-reduce summary of a document longer than the encoder window.
+
+    The document is split into overlapping chunks that each fit the window
+    with the prefix; chunks are summarized `batch_size` at a time (up to
+    `chunk_tokens` new tokens each), the partial summaries are joined and the
+    process repeats until the text fits, then one final call summarizes it
+    with `generate_options` (e.g. max_length). After `max_rounds` rounds that
+    fail to fit, the remainder is truncated to the window.
+    """
+    prefix_ids = tokenizer.encode(prefix, add_special_tokens=False)
+    suffix = [tokenizer.eos_token_id] if tokenizer.eos_token_id is not None else []
+    room = window - len(prefix_ids) - len(suffix)
+    ids = tokenizer.encode(text, add_special_tokens=False, verbose=False)
+    for _ in range(max_rounds):
+        if len(ids) <= room:
+            break
+        chunks = [prefix_ids + chunk + suffix for chunk in chunk_ids(ids, room, overlap)]
+        partial_options = dict(generate_options, max_new_tokens=chunk_tokens)
+        partial_options.pop("max_length", None)
+        summaries = []
+        for start in range(0, len(chunks), batch_size):
+            summaries += generate_batch(tokenizer, model, chunks[start:start + batch_size], namespace, cache,
+                                        **partial_options)
+        ids = tokenizer.encode(" ".join(s.strip() for s in summaries), add_special_tokens=False, verbose=False)
+    return generate_batch(tokenizer, model, [prefix_ids + ids[:room] + suffix], namespace, cache,
+                          **generate_options)[0]
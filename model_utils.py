@@ -1,39 +1,239 @@
+import functools
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
 import torch
+from transformers.generation.logits_process import LogitsProcessorList
 from transformers.models.auto.tokenization_auto import AutoTokenizer
 from transformers.models.auto.modeling_auto import AutoModelForCausalLM, AutoModelForSeq2SeqLM
 
+import long_document
+from constrained_decoding import MCQLayoutProcessor
+from profiling import profiled, span, torch_trace
+
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# GPT-2 (as a general foundation model alternative)
-ds_tokenizer = AutoTokenizer.from_pretrained("gpt2")
-ds_model = AutoModelForCausalLM.from_pretrained("gpt2").to(device)
-
-# BioGPT (using a smaller biomedical model alternative)
-bio_tokenizer = AutoTokenizer.from_pretrained("gpt2")
-bio_model = AutoModelForCausalLM.from_pretrained("gpt2").to(device)
-
-# Legal-BERT (Proxy with FLAN-T5)
-legal_tokenizer = AutoTokenizer.from_pretrained("google/flan-t5-base")
-legal_model = AutoModelForSeq2SeqLM.from_pretrained("google/flan-t5-base").to(device)
-
-def generate_response(model_name, prompt):
-    if model_name == "DeepSeek-R1":
-        input_ids = ds_tokenizer.encode(prompt, return_tensors="pt").to(device)
-        output = ds_model.generate(input_ids, max_length=150, do_sample=True, temperature=0.8, pad_token_id=ds_tokenizer.eos_token_id)
-        return ds_tokenizer.decode(output[0], skip_special_tokens=True)
-
-    elif model_name == "BioGPT":
-        # Add biomedical context to the prompt
-        bio_prompt = f"As a medical AI assistant, please provide information about: {prompt}"
-        input_ids = bio_tokenizer.encode(bio_prompt, return_tensors="pt").to(device)
-        output = bio_model.generate(input_ids, max_length=150, do_sample=True, temperature=0.8)
-        return bio_tokenizer.decode(output[0], skip_special_tokens=True)
-
-    elif model_name == "Legal-BERT":
-        formatted = "summarize: " + prompt
-        input_ids = legal_tokenizer.encode(formatted, return_tensors="pt").to(device)
-        output = legal_model.generate(input_ids, max_length=150, do_sample=True, temperature=0.8)
-        return legal_tokenizer.decode(output[0], skip_special_tokens=True)
-    
-    else:
+# Model name -> (architecture, checkpoint). Point a checkpoint at a local
+# directory to run without the Hugging Face Hub.
+CHECKPOINTS = {
+    # GPT-2 (as a general foundation model alternative)
+    "DeepSeek-R1": ("causal", "gpt2"),
+    # BioGPT (using a smaller biomedical model alternative)
+    "BioGPT": ("causal", "gpt2"),
+    # Legal-BERT (Proxy with FLAN-T5)
+    "Legal-BERT": ("seq2seq", "google/flan-t5-base"),
+}
+
+# Execution engine per model: "torch" (eager PyTorch) or "onnx" (the model
+# exported once to ONNX and run on ONNX Runtime's CPU provider, with past-KV
+# inputs for incremental decoding and IO binding). DOMAIN_ENGINE sets the
+# default; DOMAIN_ENGINES overrides single models, e.g.
+# DOMAIN_ENGINES="DeepSeek-R1=onnx,Legal-BERT=onnx". See also set_engine().
+ENGINES = ("torch", "onnx")
+MODEL_ENGINES = dict.fromkeys(CHECKPOINTS, os.environ.get("DOMAIN_ENGINE", "torch"))
+MODEL_ENGINES.update(item.strip().split("=", 1) for item in os.environ.get("DOMAIN_ENGINES", "").split(",")
+                     if "=" in item)
+
+# Weight dtype for the torch engine ("float32", "bfloat16" or "float16"); the
+# onnx engine always runs the float32 export
+DTYPES = ("float32", "bfloat16", "float16")
+DTYPE = os.environ.get("DOMAIN_DTYPE", "float32")
+
+# Exported ONNX graphs, one directory per checkpoint, reused across processes
+ONNX_CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "domain-onnx"))
+
+# Few-shot layout used as the prompt for MCQ generation
+MCQ_PROMPT = """Multiple choice quiz about {topic}.
+
+### Basic Concepts
+Q1: What does a constructor do?
+a) Destroys objects
+b) Initializes object state [CORRECT]
+c) Performs arithmetic
+d) Handles exceptions
+Explanation: A constructor sets up a new object's attributes.
+
+Multiple choice quiz about {topic}.
+
+"""
+
+
+def _onnx_dir(architecture, checkpoint):
+    # Local checkpoints are keyed by absolute path so two "model" directories don't collide
+    source = os.path.abspath(checkpoint) if os.path.isdir(checkpoint) else checkpoint
+    digest = hashlib.sha256(f"{architecture}\x00{source}".encode()).hexdigest()[:12]
+    slug = re.sub(r"[^\w.-]+", "_", checkpoint.rstrip("/\\")).strip("_")[-40:]
+    return os.path.join(ONNX_CACHE_DIR, f"{slug}-{digest}")
+
+def _load_onnx(architecture, checkpoint):
+    try:
+        from optimum.onnxruntime import ORTModelForCausalLM, ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError("The onnx engine needs optimum[onnxruntime] (pip install \"optimum[onnxruntime]\")") from e
+    model_class = ORTModelForCausalLM if architecture == "causal" else ORTModelForSeq2SeqLM
+    options = {"use_cache": True, "use_io_binding": True, "provider": "CPUExecutionProvider"}
+    exported = _onnx_dir(architecture, checkpoint)
+    if os.path.isfile(os.path.join(exported, "config.json")):
+        return model_class.from_pretrained(exported, **options)
+    print(f"Exporting {checkpoint} to ONNX (cached in {exported})")
+    model = model_class.from_pretrained(checkpoint, export=True, **options)
+    # Export next to the cache and rename, so a concurrent loader never sees half a directory
+    os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=ONNX_CACHE_DIR)
+    try:
+        model.save_pretrained(staging)
+        os.replace(staging, exported)
+    except OSError:
+        # Another process got there first
+        shutil.rmtree(staging, ignore_errors=True)
+    return model
+
+@functools.lru_cache(maxsize=None)
+def _load(architecture, checkpoint, engine="torch", dtype="float32"):
+    tokenizer = AutoTokenizer.from_pretrained(checkpoint)
+    if engine == "onnx":
+        return tokenizer, _load_onnx(architecture, checkpoint)
+    model_class = AutoModelForCausalLM if architecture == "causal" else AutoModelForSeq2SeqLM
+    model = model_class.from_pretrained(checkpoint).to(device, getattr(torch, dtype))
+    model.eval()
+    return tokenizer, model
+
+def load_model(model_name, engine=None, dtype=None):
+    """(tokenizer, model) for a named model on its engine (or `engine`) in DTYPE (or `dtype`),
+    loaded on first use and shared by checkpoint"""
+    engine = engine or MODEL_ENGINES.get(model_name, "torch")
+    dtype = dtype or DTYPE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r} for {model_name}; expected one of {', '.join(ENGINES)}")
+    if dtype not in DTYPES or (engine == "onnx" and dtype != "float32"):
+        raise ValueError(f"Unsupported dtype {dtype!r} for the {engine} engine")
+    return _load(*CHECKPOINTS[model_name], engine, dtype)
+
+def set_engine(model_name, engine):
+    """Run a model on "torch" or "onnx" from the next call on"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    MODEL_ENGINES[model_name] = engine
+
+def _batch(prompt):
+    return [prompt] if isinstance(prompt, str) else list(prompt)
+
+def _length(max_new_tokens, default_max_length=150):
+    return {"max_new_tokens": max_new_tokens} if max_new_tokens else {"max_length": default_max_length}
+
+def _generate_causal(model_name, prompt, constrained=False, questions_per_section=None, max_new_tokens=None,
+                     streamer=None):
+    tokenizer, model = load_model(model_name)
+    prompts = _batch(prompt)
+    with span("tokenize"):
+        # Left padding keeps each prompt's last token next to its first generated one
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True, return_token_type_ids=False).to(model.device)
+    prompt_length = inputs["input_ids"].shape[1]
+    if questions_per_section is None and not constrained:
+        with torch_trace("generate"):
+            output = model.generate(**inputs, **_length(max_new_tokens), do_sample=True, temperature=0.8,
+                                    pad_token_id=tokenizer.eos_token_id, streamer=streamer)
+        with span("decode"):
+            texts = tokenizer.batch_decode(output, skip_special_tokens=True)
+        return texts[0] if isinstance(prompt, str) else texts
+
+    # MCQ mode: budget enough tokens for the whole quiz and return only the
+    # generated part, not the few-shot prompt. With `constrained` the layout is
+    # enforced token by token.
+    processor = MCQLayoutProcessor(tokenizer, questions_per_section or 1)
+    context = getattr(model.config, "n_positions", None) or model.config.max_position_embeddings
+    budget = processor.fit_context(context - prompt_length)
+    logits_processor = LogitsProcessorList([processor] if constrained else [])
+    with torch_trace("generate"):
+        output = model.generate(**inputs, max_new_tokens=min(budget, max_new_tokens or budget), do_sample=True,
+                                temperature=0.8, pad_token_id=tokenizer.eos_token_id,
+                                logits_processor=logits_processor, streamer=streamer)
+    with span("decode"):
+        texts = tokenizer.batch_decode(output[:, prompt_length:], skip_special_tokens=True)
+    return texts[0] if isinstance(prompt, str) else texts
+
+def _generate_deepseek(prompt, **options):
+    return _generate_causal("DeepSeek-R1", prompt, **options)
+
+def _generate_biogpt(prompt, **options):
+    # Add biomedical context to the prompt (the MCQ prompt already carries its own)
+    if options.get("questions_per_section") is None:
+        prefixed = [f"As a medical AI assistant, please provide information about: {p}" for p in _batch(prompt)]
+        prompt = prefixed[0] if isinstance(prompt, str) else prefixed
+    return _generate_causal("BioGPT", prompt, **options)
+
+# FLAN-T5 was trained on 512-token inputs; longer documents are summarized chunk
+# by chunk (long_document.summarize) instead of being silently truncated
+LEGAL_WINDOW = 512
+
+def _generate_legal(prompt, constrained=False, questions_per_section=None, batch_size=8, max_new_tokens=None,
+                    streamer=None):
+    if constrained or questions_per_section is not None:
+        # T5's vocabulary has no newline token, so it can't produce the line-based layout
+        raise ValueError("MCQ generation is only available for causal models")
+    legal_tokenizer, legal_model = load_model("Legal-BERT")
+    prompts = _batch(prompt)
+    formatted = ["summarize: " + p for p in prompts]
+    with span("tokenize"):
+        lengths = [len(legal_tokenizer.encode(f, verbose=False)) for f in formatted]
+    summaries = [None] * len(prompts)
+    for i, p in enumerate(prompts):
+        if lengths[i] > LEGAL_WINDOW:
+            # Encoder outputs are cached per chunk, keyed by the weights that produced them
+            namespace = f"{CHECKPOINTS['Legal-BERT'][1]}\x00{MODEL_ENGINES.get('Legal-BERT', 'torch')}"
+            with span("summarize_long_document"):
+                summaries[i] = long_document.summarize(legal_tokenizer, legal_model, p, namespace,
+                                                       window=LEGAL_WINDOW, batch_size=batch_size,
+                                                       **_length(max_new_tokens), do_sample=True, temperature=0.8)
+    short = [i for i, n in enumerate(lengths) if n <= LEGAL_WINDOW]
+    if short:
+        inputs = legal_tokenizer([formatted[i] for i in short], return_tensors="pt", padding=True,
+                                 return_token_type_ids=False).to(legal_model.device)
+        with torch_trace("generate"):
+            output = legal_model.generate(**inputs, **_length(max_new_tokens), do_sample=True, temperature=0.8,
+                                          streamer=streamer)
+        with span("decode"):
+            for i, text in zip(short, legal_tokenizer.batch_decode(output, skip_special_tokens=True)):
+                summaries[i] = text
+    return summaries[0] if isinstance(prompt, str) else summaries
+
+# Model name -> handler(prompt, **options) -> str; extend with register_model()
+MODEL_HANDLERS = {
+    "DeepSeek-R1": _generate_deepseek,
+    "BioGPT": _generate_biogpt,
+    "Legal-BERT": _generate_legal,
+}
+
+def register_model(model_name, handler):
+    MODEL_HANDLERS[model_name] = handler
+
+@profiled("generate_response")
+def generate_response(model_name, prompt, **options):
+    """Generate text with a named model.
+
+    For causal models, `questions_per_section` switches to MCQ mode (only the
+    generated quiz is returned) and `constrained=True` forces the layout the
+    quiz parser expects. Legal-BERT summarizes documents longer than its
+    encoder window by map-reduce over overlapping chunks, `batch_size` chunks
+    per call.
+
+    A list of prompts is generated as one padded batch and returns a list
+    (Legal-BERT's long documents are still summarized one at a time). `max_new_tokens` replaces the default 150-token
+    max_length and `streamer` is passed to model.generate.
+    """
+    handler = MODEL_HANDLERS.get(model_name)
+    if handler is None:
         return "Invalid model selected."
+    with span(f"model:{model_name}"):
+        return handler(prompt, **options)
+
+def generate_mcqs(model_name, topic, questions_per_section=1, constrained=True):
+    """Generate a quiz in the "### Section / Q1: / a) ... [CORRECT]" layout"""
+    return generate_response(model_name, MCQ_PROMPT.format(topic=topic), constrained=constrained,
+                             questions_per_section=questions_per_section)
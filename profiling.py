@@ -0,0 +1,321 @@
+import collections
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import itertools
+import json
+import os
+import pstats
+import re
+import threading
+import time
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+# Per-request output: <stamp>-<id>-<request>.prof (cProfile; snakeviz/flameprof),
+# .speedscope.json + .html (pyinstrument), .torch-*.json (chrome://tracing,
+# Perfetto) and .torch-*.folded (flamegraph.pl; see TORCH_STACKS), plus .summary.txt
+PROFILE_DIR = os.environ.get("QUIZ_PROFILE_DIR", "profiles")
+
+# Python stacks in torch traces (needed for the .folded files) record every
+# Python call during generation; post-processing a long MCQ generation with them
+# takes minutes, so they are opt-in
+TORCH_STACKS = os.environ.get("QUIZ_PROFILE_TORCH_STACKS", "") not in ("", "0")
+
+_session = contextvars.ContextVar("profile_session", default=None)
+# The stack profiler running in this thread, if any; only the outermost hooked call or span starts one
+_local = threading.local()
+_ids = itertools.count(1)
+_NULL = contextlib.nullcontext()
+
+
+def resolve_mode(value):
+    """"pyinstrument" -> "pyinstrument" (if installed), other truthy values -> "cprofile", falsy -> None"""
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    if value in ("", "0", "false", "off", "no"):
+        return None
+    if value == "pyinstrument":
+        if pyinstrument is None:
+            print("pyinstrument is not installed; profiling with cProfile")
+            return "cprofile"
+        return value
+    return "cprofile"
+
+
+# Set QUIZ_PROFILE to "cprofile" (or "1") or "pyinstrument" to profile every
+# request. Unset, nothing is profiled unless a request opts in with
+# ?profile=1 / ?profile=pyinstrument on the Streamlit app or the HTTP service,
+# which is only honored when QUIZ_PROFILE_ALLOW_PARAM is set: profiling costs
+# the server time and disk, so anonymous clients can't turn it on by default.
+ENV_MODE = resolve_mode(os.environ.get("QUIZ_PROFILE"))
+ALLOW_OPT_IN = os.environ.get("QUIZ_PROFILE_ALLOW_PARAM", "") not in ("", "0")
+
+
+class ProfileSession:
+    """Everything profiled for one request: hook timings, merged stacks and torch traces.
+
+    Stack profilers are per thread before Python 3.12. From 3.12 cProfile is a
+    process-wide monitoring tool: the session's first profiler already sees
+    every thread and starting a second one raises ValueError ("Another
+    profiling tool is already active"). A thread whose profiler can't start
+    is only timed, and if that's because another request is being profiled
+    the summary says the stacks are incomplete.
+    """
+
+    def __init__(self, name, mode="cprofile", directory=None):
+        self.name = name
+        self.mode = mode
+        self.directory = directory or PROFILE_DIR
+        slug = re.sub(r"[^\w.-]+", "_", name).strip("_")[:60] or "request"
+        self.base = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{next(_ids):04d}-{slug}")
+        self.files = []
+        self.wall = None
+        self._timings = {}
+        self._traces = []
+        self._torch_tables = []
+        self._cprofile_stats = None
+        self._pyinstrument_sessions = []
+        self._profilers = 0
+        self._skipped = []
+        self._torch_count = itertools.count()
+        self._lock = threading.Lock()
+        self._token = None
+        self._start = None
+
+    def __enter__(self):
+        self._token = _session.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._start
+        _session.reset(self._token)
+        try:
+            self._write()
+        except Exception as e:
+            print(f"Writing profile for {self.name} failed: {str(e)}")
+        return False
+
+    def record(self, name, elapsed):
+        with self._lock:
+            calls, total, longest = self._timings.get(name, (0, 0.0, 0.0))
+            self._timings[name] = (calls + 1, total + elapsed, max(longest, elapsed))
+
+    def call(self, name, fn, args, kwargs):
+        with self.span(name):
+            return fn(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Time a block; the outermost hooked call or span in each thread also runs under the stack profiler"""
+        profiler = self._start_profiler() if getattr(_local, "profiler", None) is None else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+            if profiler is not None:
+                self._stop_profiler(profiler)
+
+    @contextlib.contextmanager
+    def torch_trace(self, label):
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+
+        activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if torch.cuda.is_available() else [])
+        # torch's Python stack tracer and cProfile/pyinstrument can't share a thread
+        stack_profiler = getattr(_local, "profiler", None) if TORCH_STACKS else None
+        if stack_profiler is not None:
+            _pause(stack_profiler)
+        start = time.perf_counter()
+        try:
+            with profile(activities=activities, with_stack=TORCH_STACKS) as trace:
+                yield
+        finally:
+            self.record(f"torch:{label}", time.perf_counter() - start)
+            if stack_profiler is not None:
+                _resume(stack_profiler)
+        # Post-processing a trace takes far longer than the run itself; it happens in _write
+        with self._lock:
+            self._traces.append((f"{self.base}.torch-{label}-{next(self._torch_count)}", label, trace))
+
+    def summary(self):
+        """(hook, calls, total seconds, mean seconds, max seconds) sorted by total time"""
+        with self._lock:
+            rows = [(name, calls, total, total / calls, longest)
+                    for name, (calls, total, longest) in self._timings.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def summary_table(self):
+        lines = [f"Profile of {self.name} ({self.mode}): {self.wall:.3f}s wall", "",
+                 f"{'hook':<32}{'calls':>7}{'total s':>10}{'mean s':>10}{'max s':>10}{'% wall':>8}"]
+        for name, calls, total, mean, longest in self.summary():
+            share = 100 * total / self.wall if self.wall else 0.0
+            lines.append(f"{name:<32}{calls:>7}{total:>10.3f}{mean:>10.3f}{longest:>10.3f}{share:>7.1f}%")
+        for reason in self._skipped:
+            lines += ["", f"Stack profile incomplete: {reason}"]
+        if self._cprofile_stats is not None:
+            out = io.StringIO()
+            self._cprofile_stats.stream = out
+            self._cprofile_stats.sort_stats("cumulative").print_stats(15)
+            lines += ["", "Top functions by cumulative time:", out.getvalue().strip()]
+        for label, table in self._torch_tables:
+            lines += ["", f"torch.profiler ops: {label}", table]
+        lines += ["", "Files:"] + [f"  {path}" for path in self.files]
+        return "\n".join(lines)
+
+    def _start_profiler(self):
+        with self._lock:
+            try:
+                if self.mode == "pyinstrument":
+                    profiler = pyinstrument.Profiler(async_mode="disabled")
+                    profiler.start()
+                else:
+                    profiler = cProfile.Profile()
+                    profiler.enable()
+            except ValueError as e:
+                # Fine if it's this session's own profiler, which sees this thread too
+                if not self._profilers and str(e) not in self._skipped:
+                    self._skipped.append(str(e))
+                return None
+            self._profilers += 1
+        _local.profiler = profiler
+        return profiler
+
+    def _stop_profiler(self, profiler):
+        _local.profiler = None
+        if self.mode == "pyinstrument":
+            session = profiler.stop()
+            with self._lock:
+                self._profilers -= 1
+                self._pyinstrument_sessions.append(session)
+            return
+        profiler.disable()
+        with self._lock:
+            self._profilers -= 1
+            if self._cprofile_stats is None:
+                self._cprofile_stats = pstats.Stats(profiler)
+            else:
+                self._cprofile_stats.add(profiler)
+
+    def _write(self):
+        if not self._timings:
+            # Nothing hooked ran (e.g. a health check)
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self._cprofile_stats is not None:
+            self._cprofile_stats.dump_stats(f"{self.base}.prof")
+            self.files.insert(0, f"{self.base}.prof")
+        if self._pyinstrument_sessions:
+            from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+            from pyinstrument.session import Session
+
+            combined = functools.reduce(Session.combine, self._pyinstrument_sessions)
+            for suffix, renderer in ((".speedscope.json", SpeedscopeRenderer()), (".html", HTMLRenderer())):
+                with open(f"{self.base}{suffix}", "w") as f:
+                    f.write(renderer.render(combined))
+                self.files.insert(0, f"{self.base}{suffix}")
+        for path, label, trace in self._traces:
+            trace.export_chrome_trace(f"{path}.json")
+            self.files.append(f"{path}.json")
+            if TORCH_STACKS:
+                trace.export_stacks(f"{path}.folded", "self_cpu_time_total")
+                self.files.append(f"{path}.folded")
+            self._torch_tables.append((label, _op_table(f"{path}.json")))
+        table = self.summary_table()
+        with open(f"{self.base}.summary.txt", "w") as f:
+            f.write(table + "\n")
+        print(table)
+
+
+def _op_table(chrome_trace, rows=10):
+    """Top CPU ops by inclusive time, from an exported chrome trace (key_averages() takes
+    tens of seconds on a long generation; this takes about one)"""
+    with open(chrome_trace) as f:
+        events = json.load(f)["traceEvents"]
+    ops = collections.defaultdict(lambda: [0, 0.0])
+    for event in events:
+        if event.get("cat") == "cpu_op":
+            ops[event["name"]][0] += 1
+            ops[event["name"]][1] += event.get("dur", 0.0)
+    top = sorted(ops.items(), key=lambda item: item[1][1], reverse=True)[:rows]
+    lines = [f"{'op':<48}{'calls':>8}{'total ms':>11}"]
+    lines += [f"{name[:47]:<48}{calls:>8}{micros / 1000:>11.1f}" for name, (calls, micros) in top]
+    return "\n".join(lines)
+
+
+def _pause(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+
+
+def _resume(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.enable()
+    else:
+        # pyinstrument combines the samples of successive start/stop cycles
+        profiler.start()
+
+
+def current():
+    """The active ProfileSession, or None"""
+    return _session.get()
+
+
+def request(name, mode=None):
+    """Profile everything hooked inside this block as one request.
+
+    `mode` is the per-request opt-in (e.g. a ?profile= query value), ignored
+    unless QUIZ_PROFILE_ALLOW_PARAM is set; without it QUIZ_PROFILE decides. A
+    no-op when neither enables profiling or when a session is already active.
+    """
+    mode = (resolve_mode(mode) if ALLOW_OPT_IN else None) or ENV_MODE
+    if mode is None or _session.get() is not None:
+        return _NULL
+    return ProfileSession(name, mode)
+
+
+def profiled(name=None):
+    """Hook a function into per-request profiling.
+
+    Disabled, a call costs a context-variable lookup and an extra frame (well
+    under a microsecond). Inside a session the call is timed for the summary table (and
+    stack-profiled if it is the outermost hooked call in its thread); with
+    QUIZ_PROFILE set, an outermost call outside any session gets a session of
+    its own.
+    """
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            session = _session.get()
+            if session is None:
+                if ENV_MODE is None:
+                    return fn(*args, **kwargs)
+                with ProfileSession(label, ENV_MODE) as session:
+                    return session.call(label, fn, args, kwargs)
+            return session.call(label, fn, args, kwargs)
+        return wrapper
+    return decorate
+
+
+def span(name):
+    """Time (and stack-profile) a block like a hooked call when a session is active"""
+    session = _session.get()
+    return _NULL if session is None else session.span(name)
+
+
+def torch_trace(label):
+    """torch.profiler trace of a block (chrome trace, plus folded stacks with TORCH_STACKS) when a session is active"""
+    session = _session.get()
+    return _NULL if session is None else session.torch_trace(label)